@@ -3,19 +3,27 @@ import pandas as pd
 import base64
 import json
 import time
+import sys
 from openai import OpenAI
 from concurrent.futures import ThreadPoolExecutor
+from batch_runner import BatchJob, message_content
+from llm_gateway import LLMGateway
 
 # ================= CONFIGURACIÓN =================
 BASE_DIR = r"C:\img"
 SCRAP_DIR = r"C:\scrap"
 
+# --batch: trabajo offline vía Batch API (más barato, sin rate limit síncrono)
+MODO_LOTE = "--batch" in sys.argv
+
 try:
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 except:
     client = None
     print("⚠️ ADVERTENCIA: No se detectó API Key.")
 
+GATEWAY = LLMGateway(client) if client else None
+
 CACHE_FILE = os.path.join(BASE_DIR, "vision_hyper_rich_cache.json")
 if os.path.exists(CACHE_FILE):
     try:
@@ -67,18 +75,15 @@ def cargar_referencias_completas(nombre_csv, col_archivo, col_nombre, col_sku):
             print(f"   ⚠️ Error CSV: {e}")
     return refs
 
-def analizar_imagen_hyper_rich(ruta_img, nombre_ref):
-    """Usa IA para generar una descripción técnica visual detallada."""
-    if not client: return {}
-    
-    file_hash = f"{os.path.basename(ruta_img)}_{os.path.getsize(ruta_img)}_HYPER"
-    if file_hash in CACHE: return CACHE[file_hash]
+def clave_cache(ruta_img):
+    return f"{os.path.basename(ruta_img)}_{os.path.getsize(ruta_img)}_HYPER"
 
-    try:
-        with open(ruta_img, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode('utf-8')
+def construir_solicitud_hyper(ruta_img, nombre_ref):
+    """Argumentos de chat.completions para una imagen (llamada directa o lote)."""
+    with open(ruta_img, "rb") as f:
+        b64 = base64.b64encode(f.read()).decode('utf-8')
 
-        prompt = f"""
+    prompt = f"""
         Actúa como un Ingeniero Mecánico experto en Motopartes.
         Tienes la imagen de un producto llamado: "{nombre_ref}".
         
@@ -98,23 +103,57 @@ def analizar_imagen_hyper_rich(ruta_img, nombre_ref):
         }}
         """
 
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "Eres un ingeniero de autopartes. Responde JSON detallado."},
-                {"role": "user", "content": [{"type": "text", "text": prompt}, {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}]}
-            ],
-            max_tokens=600, # Más tokens para descripciones largas
-            response_format={"type": "json_object"}
-        )
+    return dict(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": "Eres un ingeniero de autopartes. Responde JSON detallado."},
+            {"role": "user", "content": [{"type": "text", "text": prompt}, {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}]}
+        ],
+        max_tokens=600, # Más tokens para descripciones largas
+        response_format={"type": "json_object"}
+    )
+
+def analizar_imagen_hyper_rich(ruta_img, nombre_ref):
+    """Usa IA para generar una descripción técnica visual detallada."""
+    if not client: return {}
+    
+    file_hash = clave_cache(ruta_img)
+    if file_hash in CACHE: return CACHE[file_hash]
+
+    try:
+        txt = GATEWAY.chat(caller="generador_v7_hyper_rich", validate=json.loads,
+                           **construir_solicitud_hyper(ruta_img, nombre_ref))
         
-        data = json.loads(resp.choices[0].message.content)
+        data = json.loads(txt)
         CACHE[file_hash] = data
         return data
 
     except: 
         return {}
 
+def prefetch_batch(pendientes):
+    """
+    Modo lote: envía todas las imágenes sin caché como un solo trabajo de la
+    Batch API, espera y vuelca las respuestas en CACHE (custom_id = clave de
+    caché). Lo que falle en el lote se resuelve luego por la vía síncrona.
+    pendientes: [(ruta_img, nombre_ref), ...]
+    """
+    job = BatchJob(client, os.path.join(BASE_DIR, "LOGS", "batch_hyper_rich"),
+                   description="catalogo DUNA hyper rich")
+    for ruta_img, nombre_ref in pendientes:
+        key = clave_cache(ruta_img)
+        if key not in CACHE:
+            job.add(key, construir_solicitud_hyper(ruta_img, nombre_ref))
+    if not len(job):
+        return
+    print(f"   📦 Modo lote: {len(job)} solicitudes")
+    for key, body in job.run().items():
+        try:
+            CACHE[key] = json.loads(message_content(body))
+        except ValueError:
+            pass
+    guardar_cache()
+
 # ================= CONFIGURACIÓN DUNA =================
 
 LOTE_DUNA = {
@@ -144,19 +183,18 @@ def procesar_duna_hyper():
 
     resultados = []
     
-    def worker(img_file):
-        ruta_completa = os.path.join(ruta_carpeta, img_file)
-        
+    def nombre_y_sku(img_file):
         datos_maestros = refs.get(img_file.lower())
-        
-        nombre_final = ""
-        sku_real = ""
-        
         if datos_maestros:
-            nombre_final = datos_maestros['nombre_real']
-            sku_real = datos_maestros['sku_real']
-        else:
-            nombre_final = os.path.splitext(img_file)[0].replace("-", " ").title()
+            return datos_maestros['nombre_real'], datos_maestros['sku_real']
+        return os.path.splitext(img_file)[0].replace("-", " ").title(), ""
+
+    if MODO_LOTE and client:
+        prefetch_batch([(os.path.join(ruta_carpeta, f), nombre_y_sku(f)[0]) for f in imagenes])
+
+    def worker(img_file):
+        ruta_completa = os.path.join(ruta_carpeta, img_file)
+        nombre_final, sku_real = nombre_y_sku(img_file)
 
         # IA HYPER RICH
         ia = analizar_imagen_hyper_rich(ruta_completa, nombre_final)
@@ -208,6 +246,7 @@ def procesar_duna_hyper():
         print(f"\n   ✅ Catálogo HYPER-RICH Generado: {os.path.basename(LOTE_DUNA['salida'])}")
     
     guardar_cache()
+    if GATEWAY: print(GATEWAY.summary())
 
 if __name__ == "__main__":
     procesar_duna_hyper()
\ No newline at end of file
@@ -7,6 +7,8 @@ import time
 import random 
 from openai import OpenAI
 from concurrent.futures import ThreadPoolExecutor
+from vision_cache import VisionCache
+from image_dedup import cluster_duplicates
 
 # ================= CONFIGURACIÓN =================
 BASE_DIR = r"C:\img"
@@ -21,19 +23,17 @@ except:
     print("❌ ERROR CRÍTICO: No hay API Key. Este script requiere IA.")
     exit()
 
-# Cache
-CACHE_FILE = os.path.join(BASE_DIR, "clasificacion_ia_cache.json")
-if os.path.exists(CACHE_FILE):
-    try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f: CACHE = json.load(f)
-    except: CACHE = {}
-else:
-    CACHE = {}
+# Cache Vision compartida (SQLite, clave = sha256 imagen + prompt + modelo)
+CACHE = VisionCache()
+MODELO_IA = "gpt-4o"
 
 def guardar_cache():
-    try:
-        with open(CACHE_FILE, "w", encoding="utf-8") as f: json.dump(CACHE, f, indent=2)
-    except: pass
+    # Las respuestas se guardan al recibirse; aquí solo se reporta
+    print(f"   💾 {CACHE.summary()}")
+
+# Deduplicación perceptual (una llamada IA por grupo de casi-duplicados)
+DEDUP_MAX_DIST = 6
+HASH_CACHE = os.path.join(BASE_DIR, "phash_cache.json")
 
 # Categorías Maestras
 CATEGORIAS = ["REPUESTOS", "HERRAMIENTAS", "LUJOS_ACCESORIOS", "EMBELLECIMIENTO", "BASURA"]
@@ -41,8 +41,22 @@ CATEGORIAS = ["REPUESTOS", "HERRAMIENTAS", "LUJOS_ACCESORIOS", "EMBELLECIMIENTO"
 # ================= UTILIDADES CON REINTENTO =================
 def analizar_imagen_con_retry(ruta_img):
     """Usa GPT-4o con reintentos automáticos si falla."""
-    file_hash = f"{os.path.basename(ruta_img)}_{os.path.getsize(ruta_img)}"
-    if file_hash in CACHE: return CACHE[file_hash]
+    prompt = f"""
+    Clasifica esta imagen en UNA de estas categorías exactas:
+    {CATEGORIAS}
+    
+    - REPUESTOS: Piezas mecánicas/eléctricas de moto.
+    - HERRAMIENTAS: Llaves, destornilladores, copas.
+    - LUJOS_ACCESORIOS: Cascos, guantes, stickers.
+    - EMBELLECIMIENTO: Shampoos, ceras.
+    - BASURA: Logos, personas, texto solo, borrosas.
+    
+    Responde SOLO la categoría.
+    """
+
+    file_hash = CACHE.hash_file(ruta_img)
+    cat = CACHE.get(file_hash, prompt, MODELO_IA)
+    if cat: return cat
 
     max_retries = 5
     base_wait = 2 # Segundos
@@ -52,21 +66,8 @@ def analizar_imagen_con_retry(ruta_img):
             with open(ruta_img, "rb") as f:
                 b64 = base64.b64encode(f.read()).decode('utf-8')
 
-            prompt = f"""
-            Clasifica esta imagen en UNA de estas categorías exactas:
-            {CATEGORIAS}
-            
-            - REPUESTOS: Piezas mecánicas/eléctricas de moto.
-            - HERRAMIENTAS: Llaves, destornilladores, copas.
-            - LUJOS_ACCESORIOS: Cascos, guantes, stickers.
-            - EMBELLECIMIENTO: Shampoos, ceras.
-            - BASURA: Logos, personas, texto solo, borrosas.
-            
-            Responde SOLO la categoría.
-            """
-
             resp = client.chat.completions.create(
-                model="gpt-4o",
+                model=MODELO_IA,
                 messages=[
                     {"role": "user", "content": [{"type": "text", "text": prompt}, {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}]}
                 ],
@@ -81,7 +82,7 @@ def analizar_imagen_con_retry(ruta_img):
             
             if cat not in CATEGORIAS: cat = "BASURA"
             
-            CACHE[file_hash] = cat
+            CACHE.put(file_hash, prompt, MODELO_IA, cat)
             return cat
 
         except Exception as e:
@@ -113,12 +114,25 @@ def clasificar_con_ia():
     
     registros_csv = [] # Lista para guardar resultados
     
+    # Dedup: img_file → archivo representante de su grupo
+    rutas = [os.path.join(CARPETA_ORIGEN, f) for f in imagenes]
+    rep_of = {os.path.basename(k): os.path.basename(v)
+              for k, v in cluster_duplicates(rutas, max_dist=DEDUP_MAX_DIST, cache_path=HASH_CACHE).items()}
+    reps = [f for f in imagenes if rep_of[f] == f]
+    duplicados = [f for f in imagenes if rep_of[f] != f]
+    print(f"🧬 Casi-duplicados: {len(duplicados)} (llamadas IA: {len(reps)})")
+    categorias = {}
+
     # Función Worker
     def worker(img_file):
         ruta_origen = os.path.join(CARPETA_ORIGEN, img_file)
         
-        # Clasificar
-        categoria = analizar_imagen_con_retry(ruta_origen)
+        # Clasificar (los duplicados heredan la categoría del representante)
+        if rep_of[img_file] != img_file:
+            categoria = categorias.get(rep_of[img_file], "ERROR_IA")
+        else:
+            categoria = analizar_imagen_con_retry(ruta_origen)
+            categorias[img_file] = categoria
         
         # Mover
         ruta_destino = os.path.join(CARPETA_DESTINO_RAIZ, categoria, img_file)
@@ -140,7 +154,8 @@ def clasificar_con_ia():
 
     # Ejecución Multihilo (Reducida a 3 hilos para estabilidad)
     with ThreadPoolExecutor(max_workers=3) as executor:
-        resultados = list(executor.map(worker, imagenes))
+        resultados = list(executor.map(worker, reps))
+        resultados += list(executor.map(worker, duplicados))
         
         # Filtrar Nones si hubo errores graves
         registros_csv = [r for r in resultados if r is not None]
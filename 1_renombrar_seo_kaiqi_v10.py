@@ -31,15 +31,18 @@ Requisitos:
 
 import os
 import re
+import sys
 import csv
 import json
-import base64
 import hashlib
 import unicodedata
 from typing import Dict, Any, List, Optional, Tuple
 
 import pandas as pd
 from openai import OpenAI
+from vision_image import image_content
+from batch_runner import BatchJob, message_content
+from llm_gateway import LLMGateway
 
 # ============================================================
 # CONFIGURACIÓN GENERAL
@@ -60,6 +63,9 @@ LOG_DIR = os.path.join(BASE_DIR, "LOGS")
 os.makedirs(LOG_DIR, exist_ok=True)
 LOG_CSV = os.path.join(LOG_DIR, "log_renombrado_seo_v10.csv")
 
+# --batch: las llamadas Vision se envían juntas como trabajo de la Batch API
+BATCH_MODE = "--batch" in sys.argv
+
 # Parámetros de heurística
 # Mínimo de tokens (palabras / códigos separados) para considerar un nombre "rico".
 MIN_RICH_TOKENS = 5
@@ -75,6 +81,7 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 client: Optional[OpenAI] = None
 if OPENAI_API_KEY:
     client = OpenAI(api_key=OPENAI_API_KEY)
+gateway: Optional[LLMGateway] = LLMGateway(client) if client is not None else None
 
 
 # ============================================================
@@ -98,9 +105,9 @@ def slugify(text: str) -> str:
     return text.strip("-")
 
 
-def encode_image(path: str) -> str:
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+def encode_image(path: str) -> Dict[str, Any]:
+    # Reducida al tamaño útil de detail="high" y recodificada (vision_image.py)
+    return image_content(path, task="identify")
 
 
 def file_hash(path: str) -> str:
@@ -436,74 +443,109 @@ Devuelve SOLO un JSON con este esquema EXACTO:
 """
 
 
+VISION_KEYS = [
+    "nombre_base_seo",
+    "componente",
+    "marca_moto",
+    "modelo_moto",
+    "cilindraje",
+    "es_motocarguero",
+    "numeros_molde",
+]
+
+# Respuestas obtenidas en modo lote (--batch), por ruta de imagen
+VISION_PREFETCH: Dict[str, Dict[str, Any]] = {}
+
+
+def vision_vacia() -> Dict[str, Any]:
+    return {k: ("" if k != "es_motocarguero" else False) for k in VISION_KEYS}
+
+
+def solicitud_vision(path: str, nombre_sin_ext: str) -> Dict[str, Any]:
+    """Argumentos de chat.completions (llamada directa o línea de lote)."""
+    img_content = encode_image(path)
+    return dict(
+        model="gpt-4o",
+        temperature=0.0,
+        max_tokens=300,
+        messages=[
+            {
+                "role": "system",
+                "content": "Eres un experto en repuestos. Respondes SOLO JSON válido."
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": VISION_PROMPT + f"\nNombre de archivo: {nombre_sin_ext}"
+                    },
+                    img_content,
+                ],
+            },
+        ],
+    )
+
+
+def parse_vision(txt: str) -> Dict[str, Any]:
+    txt = txt.strip()
+    txt = txt.replace("```json", "").replace("```", "").strip()
+    data = json.loads(txt)
+    for k in VISION_KEYS:
+        if k not in data:
+            data[k] = "" if k != "es_motocarguero" else False
+    return data
+
+
 def analizar_con_vision(path: str, nombre_sin_ext: str) -> Dict[str, Any]:
     """Llama a Vision 4o SOLO si hay API key; si no, devuelve estructura vacía."""
+    if path in VISION_PREFETCH:
+        return VISION_PREFETCH[path]
     if client is None:
-        return {
-            "nombre_base_seo": "",
-            "componente": "",
-            "marca_moto": "",
-            "modelo_moto": "",
-            "cilindraje": "",
-            "es_motocarguero": False,
-            "numeros_molde": "",
-        }
+        return vision_vacia()
 
-    img64 = encode_image(path)
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.0,
-            max_tokens=300,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres un experto en repuestos. Respondes SOLO JSON válido."
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": VISION_PROMPT + f"\nNombre de archivo: {nombre_sin_ext}"
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{img64}",
-                                "detail": "high",
-                            },
-                        },
-                    ],
-                },
-            ],
-        )
-        txt = resp.choices[0].message.content.strip()
-        txt = txt.replace("```json", "").replace("```", "").strip()
-        data = json.loads(txt)
-        for k in [
-            "nombre_base_seo",
-            "componente",
-            "marca_moto",
-            "modelo_moto",
-            "cilindraje",
-            "es_motocarguero",
-            "numeros_molde",
-        ]:
-            if k not in data:
-                data[k] = "" if k != "es_motocarguero" else False
-        return data
+        txt = gateway.chat(caller="renombrar_seo_v10.vision", validate=parse_vision,
+                           **solicitud_vision(path, nombre_sin_ext))
+        return parse_vision(txt)
     except Exception as e:
         print(f"[IA ERROR] {os.path.basename(path)} -> {e}")
-        return {
-            "nombre_base_seo": "",
-            "componente": "",
-            "marca_moto": "",
-            "modelo_moto": "",
-            "cilindraje": "",
-            "es_motocarguero": False,
-            "numeros_molde": "",
-        }
+        return vision_vacia()
+
+
+def prefetch_vision_batch(paths: List[str], catalogos: "Catalogos") -> None:
+    """
+    Modo lote (--batch): recorre los archivos con la misma regla que main()
+    (nombre pobre + sin match local → IA_SOLO), envía esas imágenes como un
+    solo trabajo de la Batch API y deja las respuestas en VISION_PREFETCH.
+    Las que falten (error en el lote) se resuelven luego por la vía síncrona.
+    """
+    job = BatchJob(client, os.path.join(LOG_DIR, "batch_renombrar_v10"),
+                   description="renombrar seo v10 vision")
+    ids: Dict[str, str] = {}
+    for path in paths:
+        nombre_sin_ext = os.path.splitext(os.path.basename(path))[0]
+        if es_nombre_rico(nombre_sin_ext):
+            continue
+        if catalogos.buscar_por_tokens(extraer_tokens_crudos(nombre_sin_ext)) is not None:
+            continue
+        try:
+            cid = file_hash(path)
+        except Exception:
+            continue
+        ids[path] = cid
+        job.add(cid, solicitud_vision(path, nombre_sin_ext))
+
+    print(f"📦 Modo lote: {len(job)} imágenes para Vision")
+    respuestas = job.run()
+    for path, cid in ids.items():
+        body = respuestas.get(cid)
+        if body is None:
+            continue
+        try:
+            VISION_PREFETCH[path] = parse_vision(message_content(body))
+        except Exception as e:
+            print(f"[IA ERROR] {os.path.basename(path)} -> {e}")
 
 
 # ============================================================
@@ -563,6 +605,9 @@ def main() -> None:
 
     print(f"📸 Imágenes detectadas en IMAGENES_KAIQI_MAESTRAS: {len(files)}\n")
 
+    if BATCH_MODE and client is not None:
+        prefetch_vision_batch([os.path.join(IMAGE_DIR, f) for f in files], catalogos)
+
     used_slugs: Dict[str, int] = {}
     hash_seen: Dict[str, str] = {}
     log_rows: List[List[Any]] = []
@@ -743,6 +788,8 @@ def main() -> None:
 
     print("\n✅ Renombrado SEO v10 finalizado.")
     print(f"   → Log: {LOG_CSV}")
+    if gateway is not None:
+        print(gateway.summary())
 
 
 if __name__ == "__main__":
@@ -13,6 +13,9 @@ import hashlib
 import pandas as pd
 from openai import OpenAI
 
+from batch_runner import BatchJob, message_content
+from llm_gateway import LLMGateway
+
 # ============================================================
 # CARGAR CONFIG
 # ============================================================
@@ -29,12 +32,16 @@ IMAGE_DIR       = cfg["image_dir"]
 CSV_SHOPIFY     = cfg["shopify_csv"]
 JSON_PIM        = cfg["pim_json"]
 MODEL           = cfg["model"]
+BATCH_MODE      = cfg.get("batch_mode", False)
+BATCH_DIR       = cfg.get("batch_dir", "batch_pim_v7")
 
 RATE_LIMIT = 20
 CACHE_SIMILARITY = {}
 LAST_CALLS = []
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Caché persistente + coalescencia + métricas compartidas con los demás scripts
+gateway = LLMGateway(client)
 
 
 # ============================================================
@@ -70,6 +77,52 @@ def encode_image(path):
 # IA MATCHING (DESCRIPCIÓN INVENTARIO ↔ IMAGEN)
 # ============================================================
 
+def match_key(descripcion, image_path):
+    return hashlib.md5((descripcion + "||" + image_path).encode()).hexdigest()
+
+
+def solicitud_match(descripcion, img64):
+    """Argumentos de chat.completions (llamada directa o línea de lote)."""
+
+    prompt = f"""
+Evalúa qué tan probable es que la imagen corresponda a esta descripción de inventario:
+
+DESCRIPCIÓN INVENTARIO:
+{descripcion}
+
+Devuelve SOLO JSON así:
+{{"match_conf": 0.0 a 1.0}}
+"""
+
+    return dict(
+        model=MODEL,
+        temperature=0,
+        max_tokens=50,
+        messages=[
+            {"role": "system", "content": "Responde únicamente JSON válido."},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{img64}",
+                            "detail": "low"
+                        }
+                    }
+                ]
+            }
+        ]
+    )
+
+
+def parse_match(content):
+    raw = content.replace("```json", "").replace("```", "").strip()
+    js = json.loads(raw)
+    return float(js.get("match_conf", 0))
+
+
 def ia_match_confidence(descripcion, image_path):
     """Devuelve un score 0–1 indicando similitud inventario ↔ foto."""
 
@@ -77,7 +130,7 @@ def ia_match_confidence(descripcion, image_path):
         return 0.0
 
     # Cache key
-    key = hashlib.md5((descripcion + "||" + image_path).encode()).hexdigest()
+    key = match_key(descripcion, image_path)
     if key in CACHE_SIMILARITY:
         return CACHE_SIMILARITY[key]
 
@@ -85,42 +138,10 @@ def ia_match_confidence(descripcion, image_path):
     if not img64:
         return 0.0
 
-    prompt = f"""
-Evalúa qué tan probable es que la imagen corresponda a esta descripción de inventario:
-
-DESCRIPCIÓN INVENTARIO:
-{descripcion}
-
-Devuelve SOLO JSON así:
-{{"match_conf": 0.0 a 1.0}}
-"""
-
     try:
         rate_limit()
-        r = client.chat.completions.create(
-            model=MODEL,
-            temperature=0,
-            max_tokens=50,
-            messages=[
-                {"role": "system", "content": "Responde únicamente JSON válido."},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{img64}",
-                                "detail": "low"
-                            }
-                        }
-                    ]
-                }
-            ]
-        )
-        raw = r.choices[0].message.content.replace("```json", "").replace("```", "").strip()
-        js = json.loads(raw)
-        conf = float(js.get("match_conf", 0))
+        conf = parse_match(gateway.chat(caller="pim_v7.ia_match_confidence", validate=parse_match,
+                                        **solicitud_match(descripcion, img64)))
 
     except:
         conf = 0.0
@@ -129,6 +150,38 @@ Devuelve SOLO JSON así:
     return conf
 
 
+# ============================================================
+# MODO LOTE (Batch API)
+# ============================================================
+
+def prefetch_match_batch(descripciones, image_paths):
+    """
+    Envía todos los pares descripción × imagen como un trabajo de la
+    Batch API (sin rate_limit()), espera y vuelca los scores en
+    CACHE_SIMILARITY. Los pares que fallen en el lote se resuelven luego
+    por la vía síncrona.
+    """
+    job = BatchJob(client, BATCH_DIR, description="pim v7 match_conf")
+    descripciones = list(dict.fromkeys(descripciones))
+    for pimg in image_paths:
+        img64 = encode_image(pimg)  # una vez por imagen, no por par
+        if not img64:
+            continue
+        for desc in descripciones:
+            key = match_key(desc, pimg)
+            if key not in CACHE_SIMILARITY:
+                job.add(key, solicitud_match(desc, img64))
+
+    print(f"📦 Modo lote: {len(job)} pares descripción ↔ imagen")
+    for key, body in job.run().items():
+        if body is None:
+            continue
+        try:
+            CACHE_SIMILARITY[key] = parse_match(message_content(body))
+        except Exception:
+            CACHE_SIMILARITY[key] = 0.0
+
+
 # ============================================================
 # PROCESAR PIM
 # ============================================================
@@ -165,6 +218,9 @@ def main():
 
     print(f"Total imágenes detectadas: {len(imagenes)}\n")
 
+    if BATCH_MODE:
+        prefetch_match_batch(df["DESC_FULL"], [os.path.join(IMAGE_DIR, img) for img in imagenes])
+
     # -------------------------------------------------------
     # 3. Matching IA — EMPAREJAR MEJOR IMAGEN PARA CADA ITEM
     # -------------------------------------------------------
@@ -233,6 +289,7 @@ def main():
         json.dump(pim_json_list, f, ensure_ascii=False, indent=2)
 
     print("\n🎯 PIM v7 COMPLETADO")
+    print(gateway.summary())
     print(f"CSV Shopify: {CSV_SHOPIFY}")
     print(f"PIM JSON:    {JSON_PIM}")
 
@@ -1,10 +1,11 @@
 import os
 import re
 import pandas as pd
-from pdf2image import convert_from_path
 from PIL import Image
 import pytesseract
 
+from pdf_pages import iter_pdf_pages
+
 # ================================================
 # CONFIGURACIONES
 # ================================================
@@ -12,6 +13,10 @@ BASE_DIR = r"C:\scrap"
 PDF_FILE = "CATALOGO NOVIEMBRE V01-2025 NF.pdf"
 OUTPUT_DIR = os.path.join(BASE_DIR, "EXTRA_ARMOTOS")
 
+# Rasterizado en streaming: páginas por ventana y ventanas adelantadas en hilos
+PAGE_WINDOW = 4
+RENDER_WORKERS = 2
+
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -34,22 +39,7 @@ def limpiar_precio(p):
         return None
 
 # ================================================
-# PROCESAR PDF → IMÁGENES
-# ================================================
-print("📄 Convirtiendo PDF a imágenes...")
-pages = convert_from_path(os.path.join(BASE_DIR, PDF_FILE), dpi=200)
-
-page_paths = []
-
-for i, page in enumerate(pages):
-    out_path = os.path.join(OUTPUT_DIR, "pages", f"page_{i+1}.png")
-    page.save(out_path, "PNG")
-    page_paths.append(out_path)
-
-print(f"✔ {len(page_paths)} páginas convertidas.")
-
-# ================================================
-# EXTRAER TEXTO + BLOQUES
+# PDF → IMÁGENES (streaming) + EXTRAER TEXTO + BLOQUES
 # ================================================
 productos = []
 variantes = []
@@ -62,11 +52,19 @@ def procesar_bloque(bloque):
     for pr in bloque["productos"]:
         productos.append(pr)
 
-for page_num, img_path in enumerate(page_paths, start=1):
+print("📄 Convirtiendo PDF a imágenes (página a página)...")
+page_paths = []
+
+for page_num, img in iter_pdf_pages(os.path.join(BASE_DIR, PDF_FILE), dpi=200,
+                                    window=PAGE_WINDOW, workers=RENDER_WORKERS):
+    out_path = os.path.join(OUTPUT_DIR, "pages", f"page_{page_num}.png")
+    img.save(out_path, "PNG")
+    page_paths.append(out_path)
+
     print(f"🔍 OCR página {page_num}...")
 
-    img = Image.open(img_path)
     texto = pytesseract.image_to_string(img, lang="spa")
+    img.close()
 
     lineas = [l.strip() for l in texto.split("\n") if l.strip()]
 
@@ -121,6 +119,8 @@ for page_num, img_path in enumerate(page_paths, start=1):
     for pr in productos_pagina:
         productos.append(pr)
 
+print(f"✔ {len(page_paths)} páginas convertidas.")
+
 # ================================================
 # GUARDAR CSV
 # ================================================
@@ -18,6 +18,8 @@ import csv
 import html
 from collections import defaultdict
 
+from run_metrics import add_profile_args, profiler_from_args
+
 # -------- Utilidades de introspección --------
 
 def list_tables(conn):
@@ -126,6 +128,7 @@ def parse_args():
     ap.add_argument("--days", type=int, default=3, help="Días hacia atrás a evaluar (por fecha real)")
     ap.add_argument("--topk", type=int, default=15, help="Top-K de candidatos a considerar")
     ap.add_argument("--outdir", default=".", help="Carpeta de salida para CSV/HTML")
+    add_profile_args(ap)
     return ap.parse_args()
 
 def as_date(s):
@@ -253,7 +256,8 @@ def find_latest_run_before(runs, when_dt):
         return runs[0] if runs else (None, None)
     return sorted(candidates, key=lambda x: x[1], reverse=True)[0]
 
-def analyze(conn, days, topk):
+def analyze(conn, days, topk, prof=None):
+    if prof: prof.lap("load")
     run_table, rc_table = discover_run_tables(conn)
     if not run_table or not rc_table:
         raise RuntimeError("No pude descubrir tablas de runs/candidatos. ¿Guardas los runs en la DB?")
@@ -271,6 +275,8 @@ def analyze(conn, days, topk):
     winners = load_latest_winners(conn, days, result_tables)
     if not winners:
         raise RuntimeError("No encontré ganadores en la ventana solicitada.")
+    if prof: prof.add_rows(len(runs) + len(winners))
+    if prof: prof.lap("score")
 
     records = []
     total = len(winners)
@@ -313,6 +319,9 @@ def analyze(conn, days, topk):
             "rank": ("" if pos is None else pos)
         })
 
+    if prof:
+        prof.add_rows(len(records))
+        prof.lap(None)
     hit_rate = hit_count/total if total else 0.0
     mrr = rr_sum/total if total else 0.0
 
@@ -378,14 +387,16 @@ def main():
     if not os.path.exists(args.outdir):
         os.makedirs(args.outdir, exist_ok=True)
 
-    with sqlite3.connect(args.db) as conn:
-        conn.row_factory = sqlite3.Row
-        records, summary = analyze(conn, args.days, args.topk)
+    with profiler_from_args("analyze_multi_days", args) as prof:
+        with sqlite3.connect(args.db) as conn:
+            conn.row_factory = sqlite3.Row
+            records, summary = analyze(conn, args.days, args.topk, prof=prof)
 
-    csv_path = os.path.join(args.outdir, "analisis_multidias.csv")
-    html_path = os.path.join(args.outdir, "analisis_multidias.html")
-    write_csv(csv_path, records, summary)
-    write_html(html_path, records, summary)
+        csv_path = os.path.join(args.outdir, "analisis_multidias.csv")
+        html_path = os.path.join(args.outdir, "analisis_multidias.html")
+        with prof.phase("export"):
+            write_csv(csv_path, records, summary)
+            write_html(html_path, records, summary)
 
     # Resumen a consola
     print("=== RESUMEN MULTI-DÍAS ===")
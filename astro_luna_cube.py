@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+astro_luna_cube.py
+Cubo precalculado signo × posición × dígito para Astro Luna, con particiones por mes.
+
+Proporciona:
+- ensure_schema(cnx)
+- refresh(cnx, rebuild=False) -> dict con {"mode", "added", "n_draws"}
+- matrix_total(cnx, signo=None) -> {(signo, pos, digito): freq}
+- matrix_last_n(cnx, n, signo=None) -> {(signo, pos, digito): freq}
+- matrix_rows(counts) -> [{"signo","pos","digito","freq"}, ...] ordenado
+
+Tablas (en la misma radar_premios.db):
+- astro_luna_cube(part, signo, pos, digito, freq)   -- conteos por partición (YYYY-MM)
+- astro_luna_cube_parts(part, n_draws, min_fecha, max_fecha)
+- astro_luna_cube_log(fecha, numero, signo, part)    -- sorteos ya contados
+- astro_luna_cube_meta(key, value)                   -- watermark (max_fecha, n_src, n_draws)
+
+Diseño:
+- refresh() solo lee de astro_luna los sorteos con fecha > watermark y suma sus
+  conteos a la partición del mes. Si la historia cambió (astro_luna se recrea
+  con to_sql y el conteo hasta el watermark ya no coincide), reconstruye todo.
+- matrix_last_n() suma las particiones recientes completas directamente del
+  cubo y solo recorta la partición frontera desde el log (a lo sumo un mes de
+  sorteos), sin volver a escanear astro_luna.
+- pos: 0=um, 1=c, 2=d, 3=u.
+
+CLI:
+  python astro_luna_cube.py --db "C:\\RadarPremios\\radar_premios.db" [--rebuild] [--last 100] [--out matriz.csv]
+"""
+
+import argparse
+import csv
+import os
+import re
+import sqlite3
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+CUBE_VERSION = "1"
+POS_LABELS = ("um", "c", "d", "u")
+
+Key = Tuple[str, int, int]
+
+# ---------------- Esquema ----------------
+
+def ensure_schema(cnx: sqlite3.Connection) -> None:
+    cnx.executescript("""
+    CREATE TABLE IF NOT EXISTS astro_luna_cube (
+        part   TEXT    NOT NULL,
+        signo  TEXT    NOT NULL,
+        pos    INTEGER NOT NULL,
+        digito INTEGER NOT NULL,
+        freq   INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (part, signo, pos, digito)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS astro_luna_cube_parts (
+        part      TEXT PRIMARY KEY,
+        n_draws   INTEGER NOT NULL DEFAULT 0,
+        min_fecha TEXT,
+        max_fecha TEXT
+    );
+    CREATE TABLE IF NOT EXISTS astro_luna_cube_log (
+        fecha  TEXT NOT NULL,
+        numero TEXT NOT NULL,
+        signo  TEXT NOT NULL,
+        part   TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_astro_cube_log_part ON astro_luna_cube_log(part, fecha);
+    CREATE TABLE IF NOT EXISTS astro_luna_cube_meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """)
+
+def _meta_get(cnx: sqlite3.Connection, key: str) -> Optional[str]:
+    row = cnx.execute("SELECT value FROM astro_luna_cube_meta WHERE key=?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _meta_set(cnx: sqlite3.Connection, key: str, value) -> None:
+    cnx.execute("INSERT OR REPLACE INTO astro_luna_cube_meta(key, value) VALUES (?, ?)", (key, str(value)))
+
+# ---------------- Normalización ----------------
+
+def _num4(x) -> Optional[str]:
+    s = re.sub(r"\D+", "", str(x if x is not None else "").strip())
+    if not s:
+        return None
+    v = int(s)
+    return f"{v:04d}" if 0 <= v <= 9999 else None
+
+def _signo(x) -> str:
+    return str(x if x is not None else "").strip().lower()
+
+def _part_of(fecha: str) -> str:
+    # fecha ISO (YYYY-MM-DD...) -> YYYY-MM
+    return str(fecha)[:7]
+
+# ---------------- Carga incremental ----------------
+
+def _source_columns(cnx: sqlite3.Connection) -> List[str]:
+    return [r[1] for r in cnx.execute("PRAGMA table_info(astro_luna)")]
+
+def _apply(cnx: sqlite3.Connection, rows) -> Tuple[int, int, Optional[str]]:
+    """
+    Suma al cubo los sorteos (fecha, numero, signo) dados.
+    Retorna (# aplicados, # filas leídas de la fuente, max fecha leída).
+    """
+    deltas: Counter = Counter()
+    parts: Dict[str, List] = {}
+    log = []
+    seen = 0
+    max_seen = None
+    for fecha, numero, signo in rows:
+        if fecha is None:
+            continue
+        seen += 1
+        if max_seen is None or str(fecha) > max_seen:
+            max_seen = str(fecha)
+        n4 = _num4(numero)
+        if n4 is None:
+            continue
+        fecha = str(fecha)
+        sg = _signo(signo)
+        part = _part_of(fecha)
+        for pos in range(4):
+            deltas[(part, sg, pos, ord(n4[pos]) - 48)] += 1
+        p = parts.setdefault(part, [0, fecha, fecha])
+        p[0] += 1
+        if fecha < p[1]: p[1] = fecha
+        if fecha > p[2]: p[2] = fecha
+        log.append((fecha, n4, sg, part))
+
+    cnx.executemany(
+        "INSERT INTO astro_luna_cube(part, signo, pos, digito, freq) VALUES (?,?,?,?,?) "
+        "ON CONFLICT(part, signo, pos, digito) DO UPDATE SET freq = freq + excluded.freq",
+        [(k[0], k[1], k[2], k[3], v) for k, v in deltas.items()]
+    )
+    cnx.executemany(
+        "INSERT INTO astro_luna_cube_parts(part, n_draws, min_fecha, max_fecha) VALUES (?,?,?,?) "
+        "ON CONFLICT(part) DO UPDATE SET n_draws = n_draws + excluded.n_draws, "
+        "min_fecha = MIN(min_fecha, excluded.min_fecha), max_fecha = MAX(max_fecha, excluded.max_fecha)",
+        [(k, v[0], v[1], v[2]) for k, v in parts.items()]
+    )
+    cnx.executemany("INSERT INTO astro_luna_cube_log(fecha, numero, signo, part) VALUES (?,?,?,?)", log)
+    return len(log), seen, max_seen
+
+def _clear(cnx: sqlite3.Connection) -> None:
+    for t in ("astro_luna_cube", "astro_luna_cube_parts", "astro_luna_cube_log", "astro_luna_cube_meta"):
+        cnx.execute(f"DELETE FROM {t}")
+
+def refresh(cnx: sqlite3.Connection, rebuild: bool = False) -> Dict:
+    """
+    Actualiza el cubo con los sorteos nuevos de astro_luna (o lo reconstruye).
+    Lanza RuntimeError si astro_luna no tiene fecha/numero/signo.
+    """
+    cols = set(_source_columns(cnx))
+    if not {"fecha", "numero", "signo"}.issubset(cols):
+        raise RuntimeError(f"astro_luna sin columnas requeridas fecha,numero,signo (tiene {sorted(cols)}).")
+    ensure_schema(cnx)
+
+    wm = _meta_get(cnx, "max_fecha")
+    n_src_seen = int(_meta_get(cnx, "n_src") or 0)
+    if _meta_get(cnx, "version") != CUBE_VERSION:
+        rebuild = True
+    if not rebuild and wm is not None:
+        # la historia hasta el watermark debe seguir intacta (ni borrados ni backfill)
+        n_src = cnx.execute(
+            "SELECT COUNT(*) FROM astro_luna WHERE fecha IS NOT NULL AND fecha <= ?", (wm,)
+        ).fetchone()[0]
+        if n_src != n_src_seen:
+            rebuild = True
+
+    with cnx:
+        if rebuild or wm is None:
+            _clear(cnx)
+            mode = "rebuild"
+            cur = cnx.execute("SELECT fecha, numero, signo FROM astro_luna WHERE fecha IS NOT NULL ORDER BY fecha")
+        else:
+            mode = "incremental"
+            cur = cnx.execute(
+                "SELECT fecha, numero, signo FROM astro_luna WHERE fecha > ? ORDER BY fecha", (wm,)
+            )
+        added, seen, max_seen = _apply(cnx, cur)
+        n_src_seen = seen if mode == "rebuild" else n_src_seen + seen
+        total = cnx.execute("SELECT COUNT(*) FROM astro_luna_cube_log").fetchone()[0]
+        max_f = max_seen if mode == "rebuild" else (max_seen or wm)
+        _meta_set(cnx, "version", CUBE_VERSION)
+        _meta_set(cnx, "n_draws", total)
+        _meta_set(cnx, "n_src", n_src_seen)
+        if max_f is not None:
+            _meta_set(cnx, "max_fecha", max_f)
+    return {"mode": mode, "added": added, "n_draws": total}
+
+# ---------------- Consultas ----------------
+
+def _sum_parts(cnx: sqlite3.Connection, min_part: Optional[str], signo: Optional[str]) -> Counter:
+    q = "SELECT signo, pos, digito, SUM(freq) FROM astro_luna_cube WHERE 1=1"
+    params: List = []
+    if min_part is not None:
+        q += " AND part >= ?"; params.append(min_part)
+    if signo is not None:
+        q += " AND signo = ?"; params.append(_signo(signo))
+    q += " GROUP BY signo, pos, digito"
+    out: Counter = Counter()
+    for sg, pos, dg, f in cnx.execute(q, params):
+        out[(sg, int(pos), int(dg))] += int(f or 0)
+    return out
+
+def matrix_total(cnx: sqlite3.Connection, signo: Optional[str] = None) -> Counter:
+    return _sum_parts(cnx, None, signo)
+
+def matrix_last_n(cnx: sqlite3.Connection, n: int, signo: Optional[str] = None) -> Counter:
+    """
+    Matriz de los últimos n sorteos: particiones completas desde el cubo +
+    recorte de la partición frontera desde el log.
+    """
+    parts = cnx.execute("SELECT part, n_draws FROM astro_luna_cube_parts ORDER BY part DESC").fetchall()
+    remaining = max(0, int(n))
+    full_from = None
+    boundary = None
+    for part, nd in parts:
+        if remaining <= 0:
+            break
+        if nd <= remaining:
+            full_from = part
+            remaining -= nd
+        else:
+            boundary = part
+            break
+
+    out: Counter = _sum_parts(cnx, full_from, signo) if full_from is not None else Counter()
+    if boundary is not None and remaining > 0:
+        q = "SELECT numero, signo FROM astro_luna_cube_log WHERE part = ? ORDER BY fecha DESC, rowid DESC LIMIT ?"
+        for numero, sg in cnx.execute(q, (boundary, remaining)):
+            if signo is not None and sg != _signo(signo):
+                continue
+            for pos in range(4):
+                out[(sg, pos, ord(numero[pos]) - 48)] += 1
+    return out
+
+def matrix_rows(counts: Dict[Key, int]) -> List[Dict]:
+    rows = []
+    for (sg, pos, dg), f in counts.items():
+        if f:
+            rows.append({"signo": sg, "pos": POS_LABELS[pos], "digito": dg, "freq": f})
+    rows.sort(key=lambda r: (r["signo"], POS_LABELS.index(r["pos"]), r["digito"]))
+    return rows
+
+def write_matrix_csv(path: str, counts: Dict[Key, int]) -> int:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rows = matrix_rows(counts)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=["signo", "pos", "digito", "freq"])
+        w.writeheader()
+        w.writerows(rows)
+    return len(rows)
+
+# ---------------- CLI ----------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Cubo signo×posición×dígito de Astro Luna")
+    ap.add_argument("--db", required=True, help="Ruta a radar_premios.db")
+    ap.add_argument("--rebuild", action="store_true", help="Reconstruye el cubo completo")
+    ap.add_argument("--last", type=int, default=0, help="Matriz de los últimos N sorteos (0 = todos)")
+    ap.add_argument("--signo", help="Filtra por signo")
+    ap.add_argument("--out", help="CSV de salida (signo,pos,digito,freq)")
+    args = ap.parse_args()
+
+    cnx = sqlite3.connect(args.db)
+    st = refresh(cnx, rebuild=args.rebuild)
+    print(f"[OK] astro_luna_cube {st['mode']}: +{st['added']} sorteos (total {st['n_draws']})")
+    if args.out:
+        counts = matrix_last_n(cnx, args.last, args.signo) if args.last > 0 else matrix_total(cnx, args.signo)
+        n = write_matrix_csv(args.out, counts)
+        print(f"[OK] Matriz -> {args.out} ({n} filas)")
+    cnx.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
-import json
 import pandas as pd
 import os
 import re
 from collections import Counter
 from thefuzz import fuzz
 
+from json_stream import iter_json_file
+
 INPUT_JSON = r"C:\adsi\EXTRACTOR_V4\output\productos_llm_semantic.json"
 OUT_REPORT = r"C:\adsi\EXTRACTOR_V4\output\armotos_auditoria_report.txt"
 OUT_DETALLADO = r"C:\adsi\EXTRACTOR_V4\output\armotos_auditoria_detallada.csv"
@@ -15,23 +16,8 @@ def load_json_safely(path):
     if not os.path.exists(path):
         print("❌ Archivo no existe:", path)
         return []
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        # Cargar fallback
-        with open(path, "r", encoding="utf-8") as f:
-            txt = f.read()
-        objs = []
-        current = ""
-        for line in txt.splitlines():
-            if "{" in line:
-                current = ""
-            current += line
-            if "}" in line:
-                try: objs.append(json.loads(current))
-                except: pass
-        return objs
+    # Lista JSON, NDJSON o fragmentos dañados: se leen por bloques y se reparan
+    return list(iter_json_file(path))
 
 def normalize(x):
     if not isinstance(x, str):
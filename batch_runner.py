@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from types import SimpleNamespace
+
+
+ENDPOINT = "/v1/chat/completions"
+
+# Límites de la Batch API por archivo de entrada
+MAX_REQUESTS = 50000
+MAX_BYTES = 190 * 1024 * 1024
+
+FINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchJob:
+    """
+    Modo batch (asíncrono) de OpenAI para trabajos offline grandes.
+
+        job = BatchJob(client, "C:/img/LOGS/batch_hyper_rich")
+        for ...:
+            job.add(custom_id, body)        # body = kwargs de chat.completions.create
+        respuestas = job.run()              # {custom_id: body de la respuesta | None}
+
+    - Las solicitudes se escriben a JSONL y se parten en varios lotes si
+      superan los límites de la API (cantidad / tamaño)
+    - El estado (ids de lote) se persiste en state.json: si el script se
+      reinicia, retoma el sondeo del lote ya enviado en vez de pagarlo de nuevo
+    - Solo cuentan las partes de las solicitudes actuales: lotes de corridas
+      anteriores con otros prompts (aunque repitan custom_id) se ignoran
+    - Los resultados descargados quedan en disco (results_<batch_id>.jsonl)
+
+    Sin rate limit síncrono: el proveedor procesa el lote en su ventana
+    (completion_window) a menor costo.
+    """
+
+    def __init__(self, client, workdir, endpoint=ENDPOINT, completion_window="24h",
+                 poll_interval=30, description=""):
+        self.client = client
+        self.workdir = workdir
+        self.endpoint = endpoint
+        self.completion_window = completion_window
+        self.poll_interval = poll_interval
+        self.description = description
+        self.requests = {}
+        self._digests = None  # partes de esta corrida (tras submit)
+        os.makedirs(workdir, exist_ok=True)
+        self.state_path = os.path.join(workdir, "state.json")
+        self.state = {"parts": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def _save_state(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_path)
+
+    # --------------------------------------------------------
+    # Construcción
+    # --------------------------------------------------------
+    def add(self, custom_id, body):
+        self.requests[str(custom_id)] = body
+        self._digests = None
+
+    def __len__(self):
+        return len(self.requests)
+
+    def _write_parts(self):
+        """
+        Escribe los JSONL de entrada (orden estable por custom_id) y
+        devuelve [(digest, ruta), ...].
+        """
+        parts, lines, size = [], [], 0
+
+        def flush():
+            data = "".join(lines).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            path = os.path.join(self.workdir, f"requests_{digest}.jsonl")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(data)
+            parts.append((digest, path))
+
+        for cid in sorted(self.requests):
+            line = json.dumps({"custom_id": cid, "method": "POST", "url": self.endpoint,
+                               "body": self.requests[cid]}, ensure_ascii=False) + "\n"
+            n = len(line.encode("utf-8"))
+            if lines and (len(lines) >= MAX_REQUESTS or size + n > MAX_BYTES):
+                flush()
+                lines, size = [], 0
+            lines.append(line)
+            size += n
+        if lines:
+            flush()
+        return parts
+
+    def _current_parts(self):
+        """
+        [(digest, parte del estado)] de las solicitudes actuales que ya
+        tienen lote enviado.
+        """
+        if self._digests is None:
+            self._digests = [digest for digest, _ in self._write_parts()]
+        return [(d, self.state["parts"][d]) for d in self._digests if d in self.state["parts"]]
+
+    # --------------------------------------------------------
+    # Envío / sondeo / descarga
+    # --------------------------------------------------------
+    def submit(self):
+        parts = self._write_parts()
+        self._digests = [digest for digest, _ in parts]
+        for digest, path in parts:
+            part = self.state["parts"].get(digest)
+            if part and part.get("status") not in ("failed", "cancelled"):
+                continue  # ya enviado en una corrida anterior
+            if part:
+                # Reenvío: los resultados del lote fallido ya no sirven
+                old = self._results_path(part)
+                if os.path.exists(old):
+                    os.remove(old)
+            with open(path, "rb") as f:
+                up = self.client.files.create(file=f, purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=up.id,
+                endpoint=self.endpoint,
+                completion_window=self.completion_window,
+                metadata={"description": self.description} if self.description else None,
+            )
+            self.state["parts"][digest] = {"batch_id": batch.id, "status": batch.status, "input": path}
+            self._save_state()
+            print(f"[BATCH] Enviado {os.path.basename(path)} → {batch.id}")
+
+    def wait(self):
+        while True:
+            pending = 0
+            for digest, part in self._current_parts():
+                if part["status"] in FINAL_STATES:
+                    continue
+                b = self.client.batches.retrieve(part["batch_id"])
+                part["status"] = b.status
+                part["output_file_id"] = b.output_file_id
+                part["error_file_id"] = b.error_file_id
+                rc = b.request_counts
+                if rc is not None:
+                    print(f"[BATCH] {part['batch_id']}: {b.status} "
+                          f"({rc.completed}/{rc.total}, fallidas {rc.failed})")
+                if b.status not in FINAL_STATES:
+                    pending += 1
+            self._save_state()
+            if not pending:
+                return
+            time.sleep(self.poll_interval)
+
+    def _results_path(self, part):
+        return os.path.join(self.workdir, f"results_{part['batch_id']}.jsonl")
+
+    def _download(self, part):
+        path = self._results_path(part)
+        if not os.path.exists(path):
+            chunks = []
+            for key in ("output_file_id", "error_file_id"):
+                if part.get(key):
+                    chunks.append(self.client.files.content(part[key]).text)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("\n".join(c.strip("\n") for c in chunks if c))
+            os.replace(tmp, path)
+        return path
+
+    def results(self):
+        """
+        {custom_id: body de la respuesta (dict de chat.completion) | None}.
+        None = la solicitud falló o el lote expiró sin procesarla.
+        """
+        out = {cid: None for cid in self.requests}
+        for _, part in self._current_parts():
+            if part["status"] not in FINAL_STATES:
+                continue
+            with open(self._download(part), "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    resp = rec.get("response") or {}
+                    if rec.get("error") or resp.get("status_code") != 200:
+                        continue
+                    if rec["custom_id"] in out:
+                        out[rec["custom_id"]] = resp.get("body")
+        fails = sum(1 for v in out.values() if v is None)
+        if fails:
+            print(f"[WARN] {fails} solicitudes del lote sin respuesta válida")
+        return out
+
+    def run(self):
+        if not self.requests:
+            return {}
+        self.submit()
+        self.wait()
+        return self.results()
+
+
+def message_content(body):
+    """
+    Texto de la primera elección de un body de chat.completion (o "").
+    """
+    try:
+        return body["choices"][0]["message"]["content"] or ""
+    except (TypeError, KeyError, IndexError):
+        return ""
+
+
+# ------------------------------------------------------------
+# Servidor de lotes falso (pruebas locales, sin red ni costo)
+# ------------------------------------------------------------
+class FakeBatchClient:
+    """
+    Imita client.files / client.batches de la SDK de OpenAI en memoria.
+    Cada solicitud se resuelve con responder(body) → texto de respuesta.
+
+        job = BatchJob(FakeBatchClient(lambda body: '{"ok": true}'), "tmp/batch")
+
+    fail_ids    : custom_ids que vuelven con error dentro de un lote completado
+    fail_batches: cantidad de lotes iniciales que terminan en "failed" sin salida
+    """
+
+    def __init__(self, responder, fail_ids=(), fail_batches=0):
+        self.responder = responder
+        self.fail_ids = set(fail_ids)
+        self.fail_batches = fail_batches
+        self._files = {}
+        self._batches = {}
+        self.files = SimpleNamespace(create=self._file_create, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._batch_create, retrieve=self._batch_retrieve)
+
+    def _file_create(self, file, purpose):
+        fid = "file-" + uuid.uuid4().hex[:12]
+        self._files[fid] = file.read().decode("utf-8")
+        return SimpleNamespace(id=fid)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self._files[file_id])
+
+    def _batch_create(self, input_file_id, endpoint, completion_window, metadata=None):
+        bid = "batch_" + uuid.uuid4().hex[:12]
+        if self.fail_batches > 0:
+            self.fail_batches -= 1
+            total = len(self._files[input_file_id].splitlines())
+            self._batches[bid] = SimpleNamespace(
+                id=bid, status="failed", output_file_id=None, error_file_id=None,
+                request_counts=SimpleNamespace(total=total, completed=0, failed=0),
+            )
+            return SimpleNamespace(id=bid, status="validating")
+
+        out, err, total = [], [], 0
+        for line in self._files[input_file_id].splitlines():
+            req = json.loads(line)
+            total += 1
+            cid = req["custom_id"]
+            if cid in self.fail_ids:
+                err.append(json.dumps({"custom_id": cid, "response": None,
+                                       "error": {"code": "fake_error", "message": "falla simulada"}}))
+                continue
+            body = {"choices": [{"index": 0, "message": {"role": "assistant",
+                                                        "content": self.responder(req["body"])}}]}
+            out.append(json.dumps({"custom_id": cid, "error": None,
+                                   "response": {"status_code": 200, "body": body}}))
+        ids = []
+        for lines in (out, err):
+            fid = "file-" + uuid.uuid4().hex[:12]
+            self._files[fid] = "\n".join(lines)
+            ids.append(fid if lines else None)
+        self._batches[bid] = SimpleNamespace(
+            id=bid, status="completed", output_file_id=ids[0], error_file_id=ids[1],
+            request_counts=SimpleNamespace(total=total, completed=len(out), failed=len(err)),
+        )
+        return SimpleNamespace(id=bid, status="validating")
+
+    def _batch_retrieve(self, batch_id):
+        return self._batches[batch_id]
@@ -0,0 +1,200 @@
+from bisect import bisect_left
+
+
+class GridIndex:
+    """
+    Índice espacial por rejilla uniforme para bounding boxes (x, y, w, h).
+
+    Cada caja se registra en todas las celdas de rejilla que toca, así una
+    consulta por punto o rectángulo solo revisa las cajas de su vecindad
+    en lugar de recorrer la lista completa.
+    """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = max(1, int(cell_size))
+        self.buckets = {}
+        self.items = []
+        self.grid_bounds = None  # (gx_min, gy_min, gx_max, gy_max) de las celdas ocupadas
+
+    # --------------------------------------------------------
+    # Construcción
+    # --------------------------------------------------------
+    def _span(self, x, y, w, h):
+        cs = self.cell_size
+        return (int(x) // cs, int(y) // cs,
+                int(x + max(w, 1) - 1) // cs, int(y + max(h, 1) - 1) // cs)
+
+    def _cells(self, x, y, w, h):
+        gx0, gy0, gx1, gy1 = self._span(x, y, w, h)
+        for gx in range(gx0, gx1 + 1):
+            for gy in range(gy0, gy1 + 1):
+                yield gx, gy
+
+    def insert(self, bbox, payload=None):
+        """
+        Registra una caja y devuelve su id (posición de inserción).
+        """
+        idx = len(self.items)
+        self.items.append((tuple(bbox), payload))
+        for key in self._cells(*bbox):
+            self.buckets.setdefault(key, []).append(idx)
+        gx0, gy0, gx1, gy1 = self._span(*bbox)
+        if self.grid_bounds is None:
+            self.grid_bounds = (gx0, gy0, gx1, gy1)
+        else:
+            bx0, by0, bx1, by1 = self.grid_bounds
+            self.grid_bounds = (min(bx0, gx0), min(by0, gy0), max(bx1, gx1), max(by1, gy1))
+        return idx
+
+    @classmethod
+    def from_boxes(cls, boxes, cell_size=128):
+        index = cls(cell_size)
+        for b in boxes:
+            index.insert(b)
+        return index
+
+    # --------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------
+    def query_point(self, px, py):
+        """
+        Ids de las cajas que contienen el punto (px, py).
+        """
+        cs = self.cell_size
+        out = []
+        for idx in self.buckets.get((int(px) // cs, int(py) // cs), ()):
+            x, y, w, h = self.items[idx][0]
+            if x <= px < x + w and y <= py < y + h:
+                out.append(idx)
+        return out
+
+    def query_rect(self, bbox):
+        """
+        Ids de las cajas que se solapan con bbox (sin repetidos, en orden de id).
+        """
+        qx, qy, qw, qh = bbox
+        seen = set()
+        for key in self._cells(qx, qy, qw, qh):
+            for idx in self.buckets.get(key, ()):
+                if idx in seen:
+                    continue
+                x, y, w, h = self.items[idx][0]
+                if x < qx + qw and qx < x + w and y < qy + qh and qy < y + h:
+                    seen.add(idx)
+        return sorted(seen)
+
+    def nearest(self, px, py):
+        """
+        Id de la caja más cercana al punto (distancia punto–rectángulo,
+        0 si lo contiene); empates por menor id. None si el índice está vacío.
+
+        Recorre anillos de celdas alrededor del punto y se detiene cuando
+        ninguna celda sin visitar puede contener una caja más cercana.
+        """
+        if not self.items:
+            return None
+        cs = self.cell_size
+        cx, cy = int(px) // cs, int(py) // cs
+        gx0, gy0, gx1, gy1 = self.grid_bounds
+        max_ring = max(abs(cx - gx0), abs(cx - gx1), abs(cy - gy0), abs(cy - gy1))
+
+        best = None
+        seen = set()
+        for r in range(max_ring + 1):
+            for gx in range(cx - r, cx + r + 1):
+                for gy in (range(cy - r, cy + r + 1) if abs(gx - cx) == r else (cy - r, cy + r)):
+                    for idx in self.buckets.get((gx, gy), ()):
+                        if idx in seen:
+                            continue
+                        seen.add(idx)
+                        cand = (point_rect_distance(px, py, self.items[idx][0]), idx)
+                        if best is None or cand < best:
+                            best = cand
+            # Las celdas del anillo r+1 están a >= r*cs del punto
+            if best is not None and best[0] <= r * cs:
+                break
+        return best[1]
+
+    def bbox(self, idx):
+        return self.items[idx][0]
+
+    def payload(self, idx):
+        return self.items[idx][1]
+
+    def __len__(self):
+        return len(self.items)
+
+
+def area(bbox):
+    return max(0, bbox[2]) * max(0, bbox[3])
+
+
+def center(bbox):
+    x, y, w, h = bbox
+    return x + w / 2.0, y + h / 2.0
+
+
+def point_rect_distance(px, py, bbox):
+    x, y, w, h = bbox
+    dx = max(x - px, 0, px - (x + w))
+    dy = max(y - py, 0, py - (y + h))
+    return (dx * dx + dy * dy) ** 0.5
+
+
+# ------------------------------------------------------------
+# Agrupamiento 1D por barrido ordenado (O(n log n))
+# ------------------------------------------------------------
+def group_by_anchor(items, key, threshold):
+    """
+    Recorre items en orden de `key` y los agrega al primer grupo cuyo
+    primer elemento (ancla) esté a <= threshold; si no hay, abre grupo.
+    Las anclas quedan ordenadas, así la búsqueda es una bisección.
+    """
+    groups, anchors = [], []
+    for it in items:
+        v = key(it)
+        pos = bisect_left(anchors, v - threshold)
+        if pos < len(anchors) and abs(v - anchors[pos]) <= threshold:
+            groups[pos].append(it)
+        else:
+            groups.append([it])
+            anchors.append(v)
+    return groups
+
+
+def group_by_gap(items, key, threshold):
+    """
+    Recorre items en orden de `key` y corta grupo cuando la distancia con
+    el elemento anterior es >= threshold (encadenamiento).
+    """
+    groups = []
+    prev = None
+    for it in items:
+        v = key(it)
+        if prev is None or abs(v - prev) >= threshold:
+            groups.append([it])
+        else:
+            groups[-1].append(it)
+        prev = v
+    return groups
+
+
+def nearest_1d(sorted_pairs, value):
+    """
+    sorted_pairs: [(coordenada, id), ...] ordenado. Devuelve el id con
+    coordenada más cercana a value (empates por menor id) o None.
+    """
+    if not sorted_pairs:
+        return None
+    pos = bisect_left(sorted_pairs, (value, -1))
+    best = None
+    for j in (pos - 1, pos):
+        if 0 <= j < len(sorted_pairs):
+            coord = sorted_pairs[j][0]
+            d = abs(coord - value)
+            # todos los ids con esa misma coordenada: el menor queda primero
+            k = bisect_left(sorted_pairs, (coord, -1))
+            cand = (d, sorted_pairs[k][1])
+            if best is None or cand < best:
+                best = cand
+    return best[1]
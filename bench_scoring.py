@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+bench_scoring.py
+Benchmark reproducible (sin radar_premios.db de producción) para los motores
+de scoring y reportes de RadarPremios.
+
+Qué hace:
+- Genera bases SQLite sintéticas de N loterías 4D × M años de sorteos, con las
+  vistas que esperan std_source.py y los scripts:
+    astro_luna (+ astro_luna_std), {boyaca,huila,...}_std,
+    baloto_n5sb_std, revancha_n5sb_std, all_n5sb_std,
+    baloto_resultados_std, revancha_resultados_std,
+    n5sb_top_tier_by_draw, v_4d_pos_expanded, v_4d_pos_expanded_win
+- Ejecuta cada scorer/reporte en un subproceso por escala y repetición.
+- Emite JSON con latencia (min/mediana/máx), throughput (sorteos/s) y memoria
+  pico (RSS del subproceso, si la plataforma lo permite).
+
+Uso:
+  python bench_scoring.py --scales 1x1,3x5,7x20 --repeat 3 --out bench.json
+  python bench_scoring.py --scales 2x2 --only score_markov_4d,report_n5sb
+
+Escala "NxM": N loterías 4D (máx 7: astro_luna + 6 regionales) y M años.
+Las 4D sortean a diario; Baloto/Revancha dos veces por semana.
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import runpy
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOTS_4D = ["astro_luna", "boyaca", "huila", "manizales", "medellin", "quindio", "tolima"]
+SIGNOS = ["aries", "tauro", "geminis", "cancer", "leo", "virgo",
+          "libra", "escorpio", "sagitario", "capricornio", "acuario", "piscis"]
+
+# ---------------- Base sintética ----------------
+
+def parse_scales(spec: str) -> List[Tuple[int, int]]:
+    out = []
+    for tok in (spec or "").split(","):
+        tok = tok.strip().lower()
+        if not tok:
+            continue
+        try:
+            n, m = tok.split("x")
+            out.append((max(1, min(len(LOTS_4D), int(n))), max(1, int(m))))
+        except Exception:
+            raise SystemExit(f"Escala inválida: {tok!r} (usa NxM, p.ej. 3x5)")
+    return out
+
+def _dates(years: int, end: dt.date, step_days: int = 1) -> List[str]:
+    start = end - dt.timedelta(days=365 * years)
+    out = []
+    d = start
+    while d <= end:
+        out.append(d.isoformat())
+        d += dt.timedelta(days=step_days)
+    return out
+
+def _n5sb_dates(years: int, end: dt.date) -> List[str]:
+    # miércoles y sábado
+    return [f for f in _dates(years, end) if dt.date.fromisoformat(f).weekday() in (2, 5)]
+
+def make_synthetic_db(path: str, n_lots: int, years: int, seed: int = 12345) -> Dict:
+    """
+    Crea una base sintética en `path`. Retorna conteos por objeto.
+    """
+    rnd = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    end = dt.date(2025, 12, 31)
+    cnx = sqlite3.connect(path)
+    counts: Dict[str, int] = {}
+    lots = LOTS_4D[:n_lots]
+    days = _dates(years, end)
+
+    # --- 4D ---
+    cnx.execute("CREATE TABLE loterias_4d (lot TEXT, draw_id INTEGER, fecha TEXT, numero TEXT)")
+    draw_id = 0
+    rows4d = []
+    for lot in lots:
+        for f in days:
+            draw_id += 1
+            rows4d.append((lot, draw_id, f, f"{rnd.randint(0, 9999):04d}"))
+    cnx.executemany("INSERT INTO loterias_4d VALUES (?,?,?,?)", rows4d)
+    cnx.execute("CREATE INDEX idx_lot4d ON loterias_4d(lot, fecha)")
+    for lot in lots:
+        if lot == "astro_luna":
+            cnx.execute("CREATE TABLE astro_luna (fecha TEXT, numero TEXT, signo TEXT)")
+            cnx.executemany("INSERT INTO astro_luna VALUES (?,?,?)",
+                            [(f, n, rnd.choice(SIGNOS)) for (l, _, f, n) in rows4d if l == lot])
+            cnx.execute("CREATE VIEW astro_luna_std AS SELECT fecha, numero, signo FROM astro_luna")
+        else:
+            cnx.execute(f"CREATE VIEW {lot}_std AS SELECT fecha, numero FROM loterias_4d WHERE lot='{lot}'")
+        counts[lot] = len(days)
+    cnx.execute("""
+        CREATE VIEW v_4d_pos_expanded AS
+        SELECT lot, draw_id, 0 AS pos, CAST(substr(numero,1,1) AS INTEGER) AS digit FROM loterias_4d
+        UNION ALL SELECT lot, draw_id, 1, CAST(substr(numero,2,1) AS INTEGER) FROM loterias_4d
+        UNION ALL SELECT lot, draw_id, 2, CAST(substr(numero,3,1) AS INTEGER) FROM loterias_4d
+        UNION ALL SELECT lot, draw_id, 3, CAST(substr(numero,4,1) AS INTEGER) FROM loterias_4d
+    """)
+    cnx.execute("""
+        CREATE VIEW v_4d_pos_expanded_win AS
+        SELECT e.lot, e.draw_id, e.pos, e.digit, r.rn
+        FROM v_4d_pos_expanded e
+        JOIN (SELECT draw_id, ROW_NUMBER() OVER (PARTITION BY lot ORDER BY fecha DESC) AS rn
+              FROM loterias_4d) r ON r.draw_id = e.draw_id
+    """)
+
+    # --- N5+SB ---
+    n5_days = _n5sb_dates(years, end)
+    for game in ("baloto", "revancha"):
+        rows = []
+        for i, f in enumerate(n5_days, 1):
+            five = sorted(rnd.sample(range(1, 44), 5))
+            rows.append((f, i, *five, rnd.randint(1, 16)))
+        cnx.execute(f"CREATE TABLE {game}_resultados (fecha TEXT, sorteo INTEGER, n1 INTEGER, n2 INTEGER, "
+                    f"n3 INTEGER, n4 INTEGER, n5 INTEGER, sb INTEGER)")
+        cnx.executemany(f"INSERT INTO {game}_resultados VALUES (?,?,?,?,?,?,?,?)", rows)
+        cnx.execute(f"CREATE VIEW {game}_n5sb_std AS SELECT fecha, n1, n2, n3, n4, n5, sb FROM {game}_resultados")
+        cnx.execute(f"CREATE VIEW {game}_resultados_std AS "
+                    f"SELECT fecha, sorteo, n1, n2, n3, n4, n5, sb AS super FROM {game}_resultados")
+        counts[game] = len(rows)
+    cnx.execute("""
+        CREATE VIEW all_n5sb_std AS
+        SELECT fecha, n1, n2, n3, n4, n5, sb FROM baloto_n5sb_std
+        UNION ALL SELECT fecha, n1, n2, n3, n4, n5, sb FROM revancha_n5sb_std
+    """)
+    cnx.execute("""CREATE TABLE n5sb_top_tier_by_draw (game TEXT, sorteo INTEGER, fecha TEXT,
+                   ganadores_5sb INTEGER, premio_total_5sb REAL, premio_ind_5sb REAL)""")
+    tier = []
+    for game in ("baloto", "revancha"):
+        pozo = 4e9
+        for i, f in enumerate(n5_days, 1):
+            hit = 1 if rnd.random() < 0.03 else 0
+            tier.append((game, i, f, hit, pozo, pozo if hit else 0.0))
+            pozo = 4e9 if hit else pozo + 2.5e8
+    cnx.executemany("INSERT INTO n5sb_top_tier_by_draw VALUES (?,?,?,?,?,?)", tier)
+    cnx.commit()
+    cnx.close()
+    return counts
+
+# ---------------- Ejecución ----------------
+
+def _child_main(argv: List[str]) -> int:
+    """
+    Modo hijo: ejecuta un script como __main__ y reporta memoria pico en stderr
+    como línea '__BENCH__ {json}'.
+    """
+    script, args = argv[0], argv[1:]
+    sys.argv = [script] + args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    rc = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    peak_kb = None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_kb = peak // 1024 if sys.platform == "darwin" else peak
+    except Exception:
+        try:
+            import psutil
+            mi = psutil.Process().memory_info()
+            peak_kb = int(getattr(mi, "peak_wset", mi.rss)) // 1024
+        except Exception:
+            peak_kb = None
+    sys.stderr.write("__BENCH__ " + json.dumps({"rc": rc, "peak_rss_kb": peak_kb}) + "\n")
+    return rc
+
+def run_once(script: str, args: List[str], cwd: str) -> Dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--_child", os.path.join(HERE, script)] + args
+    t0 = time.perf_counter()
+    p = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    elapsed = time.perf_counter() - t0
+    info = {"rc": p.returncode, "peak_rss_kb": None}
+    for line in p.stderr.splitlines():
+        if line.startswith("__BENCH__ "):
+            try:
+                info.update(json.loads(line[len("__BENCH__ "):]))
+            except Exception:
+                pass
+    info["seconds"] = elapsed
+    if info["rc"] != 0:
+        info["stderr_tail"] = p.stderr.strip().splitlines()[-5:]
+    return info
+
+def bench_cases(db: str, root: str, lots: List[str]) -> Dict[str, Tuple[str, List[str], str]]:
+    """
+    nombre -> (script, args, clave de conteo para throughput).
+    Cada caso escribe en root/<nombre>.
+    """
+    regionales = [l for l in lots if l != "astro_luna"]
+    out = "{out}"
+    cases = {
+        "score_markov_4d": ("score_markov.py",
+                            ["--db", db, "--game", lots[0], "--seed", "1",
+                             "--export", os.path.join(out, "sm4d_top.csv"),
+                             "--export-all", os.path.join(out, "sm4d_all.csv")], lots[0]),
+        "score_markov_n5sb": ("score_markov.py",
+                              ["--db", db, "--game", "baloto", "--seed", "1", "--gen", "20000",
+                               "--export", os.path.join(out, "smn5_top.csv"),
+                               "--export-all", os.path.join(out, "smn5_all.csv")], "baloto"),
+        "score_n5sb": ("score_n5sb.py",
+                       ["--db", db, "--game", "baloto", "--seed", "1",
+                        "--export", os.path.join(out, "sn5_top.csv"),
+                        "--export-all", os.path.join(out, "sn5_all.csv"),
+                        "--report", os.path.join(out, "sn5.html")], "baloto"),
+        "light_bal_rev": ("light_bal_rev.py", ["--db", db, "--reports", out], "baloto+revancha"),
+        "report_n5sb": ("report_n5sb.py", ["--db", db, "--out", out], "baloto+revancha"),
+        "advanced_4d": ("advanced_4d.py",
+                        ["--db", db, "--reports", out, "--lot-window", "0",
+                         "--only-lots", ",".join(regionales or lots)], "+".join(regionales or lots)),
+    }
+    resolved = {}
+    for name, (script, cargs, key) in cases.items():
+        case_out = os.path.join(root, name)
+        resolved[name] = (script, [a.replace(out, case_out) for a in cargs], key)
+    return resolved
+
+def _draws_for(key: str, counts: Dict[str, int]) -> int:
+    return sum(counts.get(k, 0) for k in key.split("+"))
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--_child":
+        raise SystemExit(_child_main(sys.argv[2:]))
+
+    ap = argparse.ArgumentParser(description="Benchmark sintético de scoring/reportes RadarPremios")
+    ap.add_argument("--scales", default="1x1,3x5,7x20", help="Lista NxM (loterías 4D × años)")
+    ap.add_argument("--repeat", type=int, default=3, help="Repeticiones por caso")
+    ap.add_argument("--seed", type=int, default=12345, help="Semilla de la base sintética")
+    ap.add_argument("--only", help="Casos a ejecutar (coma): " + ",".join(bench_cases("", "", ["x"]).keys()))
+    ap.add_argument("--workdir", help="Carpeta de trabajo (por defecto temporal, se borra)")
+    ap.add_argument("--keep", action="store_true", help="No borrar la carpeta de trabajo")
+    ap.add_argument("--out", help="Archivo JSON de salida (por defecto stdout)")
+    args = ap.parse_args()
+
+    only = {x.strip() for x in (args.only or "").split(",") if x.strip()}
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rp_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    result = {
+        "generated_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "scales": [],
+    }
+    try:
+        for n_lots, years in parse_scales(args.scales):
+            tag = f"{n_lots}x{years}"
+            db = os.path.join(workdir, f"synthetic_{tag}.db")
+            t0 = time.perf_counter()
+            counts = make_synthetic_db(db, n_lots, years, seed=args.seed)
+            gen_s = time.perf_counter() - t0
+            print(f"[INFO] {tag}: base sintética {counts} ({gen_s:.2f}s)", file=sys.stderr)
+            scale = {"scale": tag, "lotteries_4d": n_lots, "years": years, "draws": counts,
+                     "db_bytes": os.path.getsize(db), "gen_seconds": round(gen_s, 3), "cases": {}}
+            root = os.path.join(workdir, tag)
+            for name, (script, cargs, key) in bench_cases(db, root, LOTS_4D[:n_lots]).items():
+                if only and name not in only:
+                    continue
+                out = os.path.join(root, name)
+                os.makedirs(out, exist_ok=True)
+                runs = [run_once(script, cargs, cwd=out) for _ in range(max(1, args.repeat))]
+                secs = [r["seconds"] for r in runs]
+                mems = [r["peak_rss_kb"] for r in runs if r.get("peak_rss_kb")]
+                draws = _draws_for(key, counts)
+                med = statistics.median(secs)
+                case = {
+                    "script": script,
+                    "ok": all(r["rc"] == 0 for r in runs),
+                    "draws_in": draws,
+                    "latency_s": {"min": round(min(secs), 4), "median": round(med, 4), "max": round(max(secs), 4)},
+                    "throughput_draws_per_s": round(draws / med, 1) if med > 0 else None,
+                    "peak_rss_kb": max(mems) if mems else None,
+                }
+                errs = [r["stderr_tail"] for r in runs if r.get("stderr_tail")]
+                if errs:
+                    case["errors"] = errs[0]
+                scale["cases"][name] = case
+                print(f"[INFO] {tag} {name}: median {med:.3f}s ok={case['ok']}", file=sys.stderr)
+            result["scales"].append(scale)
+    finally:
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    txt = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(txt)
+        print(f"[OK] Benchmark -> {args.out}", file=sys.stderr)
+    else:
+        print(txt)
+
+if __name__ == "__main__":
+    main()
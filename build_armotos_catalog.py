@@ -19,11 +19,12 @@ No modifica el pipeline ni los módulos V5.
 """
 
 import os
-import json
 import csv
 import shutil
 from collections import defaultdict
 
+from json_stream import JsonObjectStream, iter_json_file
+
 # --------------------------------------------------------------------
 # RUTAS BASE (ajusta si algo cambia en tu máquina)
 # --------------------------------------------------------------------
@@ -76,14 +77,17 @@ def load_llm_json(path):
     if not os.path.exists(path):
         raise FileNotFoundError(f"No se encontró productos_llm.json en: {path}")
 
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    # Se lee en streaming (un fragmento a la vez): los volcados del LLM
+    # pueden pesar cientos de MB
+    stream = JsonObjectStream()
 
-    if not isinstance(data, list):
-        raise ValueError("El JSON esperado debe ser una lista de objetos.")
+    def fragments():
+        yield from iter_json_file(path, stream=stream)
+        total = stream.stats["ok"] + stream.stats["repaired"]
+        print(f"[INFO] Fragmentos totales en JSON LLM: {total} "
+              f"(reparados {stream.stats['repaired']}, descartados {stream.stats['dropped']})")
 
-    print(f"[INFO] Fragmentos totales en JSON LLM: {len(data)}")
-    return data
+    return fragments()
 
 
 # --------------------------------------------------------------------
@@ -1,12 +1,14 @@
 import os
 import json
-import base64
+import hashlib
 import unicodedata
 import csv
 import threading
 import queue
 
 from openai import OpenAI
+from vision_image import image_content
+from image_dedup import cluster_duplicates, representatives
 
 # ====================================================
 # 🔧 CONFIGURACIÓN
@@ -17,10 +19,22 @@ OUTPUT_DIR = r"C:\img"
 
 CATALOGO_360_CSV = os.path.join(OUTPUT_DIR, "catalogo_360_kaiqi_v4.csv")
 DIR_LOGS         = os.path.join(OUTPUT_DIR, "LOGS")
+# Diario NDJSON: cada ficha se escribe al recibirse; al reanudar se
+# omiten las imágenes (por sha256) que ya tienen ficha
+CATALOGO_360_NDJSON = os.path.join(DIR_LOGS, "catalogo_360_kaiqi_v4.ndjson")
 
 NUM_WORKERS = 4
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+API_KEY = os.getenv("OPENAI_API_KEY")
+_local = threading.local()
+
+
+def get_client() -> OpenAI:
+    """Un cliente por hilo: reutiliza su pool de conexiones HTTP."""
+    c = getattr(_local, "client", None)
+    if c is None:
+        c = _local.client = OpenAI(api_key=API_KEY)
+    return c
 
 TAXONOMIA_PATH = os.path.join(OUTPUT_DIR, "taxonomia_kaiqi.json")
 
@@ -32,13 +46,52 @@ TAXONOMIA_PATH = os.path.join(OUTPUT_DIR, "taxonomia_kaiqi.json")
 def ensure_dirs():
     os.makedirs(DIR_LOGS, exist_ok=True)
 
-def encode_image(path: str) -> str | None:
+def encode_image(path: str) -> dict | None:
+    # Reducida al tamaño útil de detail="high" y recodificada (vision_image.py)
     try:
-        with open(path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        return image_content(path, task="identify")
     except Exception:
         return None
 
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ResultadosNDJSON:
+    """
+    Diario de fichas 360 (una línea JSON por imagen, flush inmediato).
+    Las fichas con error no cuentan como hechas: se reintentan.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hechos = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # línea cortada por la caída
+                    if not rec.get("error"):
+                        self.hechos[rec["sha256"]] = rec
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def write(self, rec: dict):
+        with self._lock:
+            self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._fh.flush()
+            if not rec.get("error"):
+                self.hechos[rec["sha256"]] = rec
+
+    def close(self):
+        self._fh.close()
+
 def load_taxonomia():
     if os.path.exists(TAXONOMIA_PATH):
         try:
@@ -158,14 +211,14 @@ REGLAS FINALES:
 
 
 def pedir_analisis_360(img_path: str) -> dict | None:
-    img64 = encode_image(img_path)
-    if not img64:
+    img_content = encode_image(img_path)
+    if not img_content:
         return None
 
     filename = os.path.basename(img_path)
 
     try:
-        resp = client.chat.completions.create(
+        resp = get_client().chat.completions.create(
             model="gpt-4o",
             temperature=0.0,
             max_tokens=900,
@@ -181,13 +234,7 @@ def pedir_analisis_360(img_path: str) -> dict | None:
                             "type": "text",
                             "text": PROMPT_360 + f"\n\nNombre del archivo (ya renombrado SEO): {filename}\nRecuerda: SOLO JSON."
                         },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{img64}",
-                                "detail": "high"
-                            }
-                        }
+                        img_content
                     ]
                 }
             ]
@@ -205,10 +252,10 @@ def pedir_analisis_360(img_path: str) -> dict | None:
 # 🧵 MULTIHILO 360
 # ====================================================
 
-def worker_360(q: queue.Queue, resultados: list, taxonomia: dict):
+def worker_360(q: queue.Queue, resultados: list, taxonomia: dict, journal: ResultadosNDJSON):
     while True:
         try:
-            img_path = q.get_nowait()
+            img_path, sha = q.get_nowait()
         except queue.Empty:
             break
 
@@ -216,14 +263,17 @@ def worker_360(q: queue.Queue, resultados: list, taxonomia: dict):
         data = pedir_analisis_360(img_path)
 
         if not data:
-            resultados.append({
+            rec = {
                 "filename": filename,
+                "sha256": sha,
                 "error": "IA_sin_respuesta",
                 "raw_json": "{}",
                 "componente_estandar": "",
                 "codigo_new": "",
                 "product_type": ""
-            })
+            }
+            journal.write(rec)
+            resultados.append(rec)
             print(f"[IA ERROR 360] {filename}")
             q.task_done()
             continue
@@ -243,14 +293,17 @@ def worker_360(q: queue.Queue, resultados: list, taxonomia: dict):
                     product_type = v.get("product_type", "")
                     break
 
-        resultados.append({
+        rec = {
             "filename": filename,
+            "sha256": sha,
             "error": "",
             "raw_json": json.dumps(data, ensure_ascii=False),
             "componente_estandar": componente,
             "codigo_new": codigo_new,
             "product_type": product_type
-        })
+        }
+        journal.write(rec)
+        resultados.append(rec)
 
         print(f"[OK 360] {filename}")
         q.task_done()
@@ -276,19 +329,40 @@ def main():
     print("==============================================")
     print(f"📸 Total imágenes a procesar: {len(files)}\n")
 
-    q = queue.Queue()
-    for f in files:
-        q.put(f)
+    # Dedup perceptual: una ficha IA por grupo de casi-duplicados
+    rep_of = cluster_duplicates(files, cache_path=os.path.join(DIR_LOGS, "phash_cache.json"))
+    reps, n_dup = representatives(rep_of)
+    print(f"🧬 Casi-duplicados: {n_dup} (fichas IA: {len(reps)})\n")
 
+    journal = ResultadosNDJSON(CATALOGO_360_NDJSON)
     resultados = []
+    q = queue.Queue()
+    for f in reps:
+        sha = sha256_file(f)
+        previo = journal.hechos.get(sha)
+        if previo:
+            # Ya analizada (quizá con otro nombre): no se vuelve a pagar
+            resultados.append(dict(previo, filename=os.path.basename(f)))
+        else:
+            q.put((f, sha))
+    if len(reps) - q.qsize():
+        print(f"↩️  Reanudando: {len(reps) - q.qsize()} fichas ya en {CATALOGO_360_NDJSON}\n")
+
     threads = []
     for _ in range(NUM_WORKERS):
-        t = threading.Thread(target=worker_360, args=(q, resultados, taxonomia))
+        t = threading.Thread(target=worker_360, args=(q, resultados, taxonomia, journal))
         t.start()
         threads.append(t)
 
     for t in threads:
         t.join()
+    journal.close()
+
+    # Los duplicados reciben la ficha de su representante
+    por_archivo = {r["filename"]: r for r in resultados}
+    for f, rep in rep_of.items():
+        if f != rep and os.path.basename(rep) in por_archivo:
+            resultados.append(dict(por_archivo[os.path.basename(rep)], filename=os.path.basename(f)))
 
     # Guardar CSV maestro
     with open(CATALOGO_360_CSV, "w", encoding="utf-8", newline="") as f:
@@ -1,6 +1,9 @@
 import os
 import cv2
 
+from modules.crop_writer import CropWriter
+from modules.page_image import Page
+
 
 class CellExtractor:
     """
@@ -11,22 +14,29 @@ class CellExtractor:
         page_10_row_3_col_2.png
     """
 
-    def __init__(self, margin=4):
+    def __init__(self, margin=4, writer=None):
+        """
+        writer: CropWriter (asíncrono, formato según contenido, sin
+        reescribir recortes idénticos). Por defecto uno propio.
+        """
         self.margin = margin
+        self.writer = writer or CropWriter()
 
     def extract_cells(self, image_path, cells, output_dir):
         """
-        Recorta y guarda todas las celdas detectadas.
+        Recorta y guarda todas las celdas detectadas (escritura asíncrona,
+        ver flush()).
 
-        image_path: imagen de la página
+        image_path: imagen de la página (ruta o Page ya decodificado)
         cells: lista de dicts con {row, col, x, y, w, h}
         output_dir: carpeta donde guardar los PNG
         """
         os.makedirs(output_dir, exist_ok=True)
 
-        img = cv2.imread(image_path)
+        page = Page.of(image_path)
+        img = page.bgr
         if img is None:
-            print("[ERROR] No se pudo cargar la imagen:", image_path)
+            print("[ERROR] No se pudo cargar la imagen:", page.path)
             return []
 
         extracted_files = []
@@ -42,14 +52,20 @@ class CellExtractor:
 
             crop = img[y0:y1, x0:x1]
 
-            # Nombre de archivo
-            page = os.path.splitext(os.path.basename(image_path))[0]
-            fname = f"{page}_row{cell['row']}_col{cell['col']}.png"
-            out_path = os.path.join(output_dir, fname)
+            # Nombre de archivo (la extensión la decide el writer)
+            page_stem = os.path.splitext(os.path.basename(page.path))[0]
+            stem = f"{page_stem}_row{cell['row']}_col{cell['col']}"
 
-            cv2.imwrite(out_path, crop)
+            res = self.writer.submit(crop, output_dir, stem)
+            out_path = res["file"]
 
             cell["file"] = out_path
+            if "array" in res:
+                cell["array"] = res["array"]
             extracted_files.append(out_path)
 
+        # La escritura sigue en segundo plano: flush() antes de leer los PNG/JPG
         return extracted_files
+
+    def flush(self):
+        self.writer.flush()
@@ -4,6 +4,8 @@ import json
 import pandas as pd
 from collections import defaultdict
 
+from json_stream import JsonObjectStream, iter_json_file
+
 
 # ==========================================
 # 🔧 CONFIGURACIÓN
@@ -40,53 +42,6 @@ def safe_value(v):
     return clean_text(str(v))
 
 
-# ====================================================
-# 🧠 EXTRACCIÓN DE JSONS VÁLIDOS
-# ====================================================
-JSON_PATTERN = re.compile(r'\{.*?\}', re.DOTALL)
-
-
-def extract_json_objects(raw_text):
-    """Devuelve todos los objetos JSON detectados en el texto."""
-    candidates = JSON_PATTERN.findall(raw_text)
-    valid = []
-    corrupted = []
-
-    for c in candidates:
-        try:
-            obj = json.loads(c)
-            valid.append(obj)
-        except:
-            corrupted.append(c)
-
-    return valid, corrupted
-
-
-# ====================================================
-# 🧠 INTENTO DE REPARACIÓN SIMPLE DE JSONS
-# ====================================================
-def try_repair_json(broken):
-    """
-    Intenta corregir JSONs truncados:
-      - Llaves sin cerrar
-      - Comas faltantes
-      - Strings rotos
-    """
-    txt = broken.strip()
-
-    # Cerrar llave final si falta
-    if txt.count("{") > txt.count("}"):
-        txt += "}"
-
-    # Reparar comas mal puestas
-    txt = re.sub(r',\s*}', '}', txt)
-
-    try:
-        return json.loads(txt)
-    except:
-        return None
-
-
 # ====================================================
 # 🧠 UNIFICACIÓN DE CAMPOS
 # ====================================================
@@ -146,35 +101,16 @@ def main():
     print("=== FASE 17.1 — LIMPIEZA AVANZADA LLM JSON ===")
     print(f"Leyendo archivo: {INPUT_FILE}")
 
-    with open(INPUT_FILE, "r", encoding="utf-8", errors="ignore") as f:
-        raw = f.read()
-
-    # 1. Extraer JSONs válidos
-    print("Extrayendo JSONs válidos...")
-    valid, corrupted = extract_json_objects(raw)
-
-    print(f"   ✔ JSONs válidos: {len(valid)}")
-    print(f"   ⚠ JSONs corruptos: {len(corrupted)}")
-
-    # 2. Intentar reparar corruptos
-    repaired = []
-    for c in corrupted:
-        obj = try_repair_json(c)
-        if obj:
-            repaired.append(obj)
-
-    print(f"   ✔ JSONs reparados exitosamente: {len(repaired)}")
-
-    all_objs = valid + repaired
-
-    # 3. Normalizar
-    print("Normalizando objetos...")
-    normalized = [normalize_object(o) for o in all_objs]
-
-    # 4. Fusionar productos
-    print("Fusionando productos...")
+    # 1-3. Extraer (y reparar) JSONs en streaming, normalizar y fusionar
+    # sin cargar el archivo completo en memoria
+    print("Extrayendo, normalizando y fusionando JSONs...")
+    stream = JsonObjectStream()
+    normalized = (normalize_object(o) for o in iter_json_file(INPUT_FILE, stream=stream))
     merged = merge_products(normalized)
 
+    print(f"   ✔ JSONs válidos: {stream.stats['ok']}")
+    print(f"   ✔ JSONs reparados exitosamente: {stream.stats['repaired']}")
+    print(f"   ⚠ JSONs corruptos descartados: {stream.stats['dropped']}")
     print(f"   ✔ Total productos finales: {len(merged)}")
 
     # 5. Guardar JSON limpio
@@ -189,9 +125,11 @@ def main():
     # 7. Guardar log
     with open(OUT_LOG, "w", encoding="utf-8") as f:
         f.write("=== JSON VÁLIDOS ===\n")
-        f.write(f"{len(valid)}\n\n")
+        f.write(f"{stream.stats['ok']}\n\n")
+        f.write("=== JSON REPARADOS ===\n")
+        f.write(f"{stream.stats['repaired']}\n\n")
         f.write("=== JSON CORRUPTOS ===\n")
-        for c in corrupted[:200]:
+        for c in stream.dropped_samples:
             f.write(c + "\n\n")
 
     print("=== FASE 17.1 COMPLETADA ===")
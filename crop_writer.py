@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+
+FORMATS = {
+    "png": (".png", lambda q: [cv2.IMWRITE_PNG_COMPRESSION, 3]),
+    "jpg": (".jpg", lambda q: [cv2.IMWRITE_JPEG_QUALITY, int(q)]),
+    "webp": (".webp", lambda q: [cv2.IMWRITE_WEBP_QUALITY, int(q)]),
+}
+
+
+@contextmanager
+def _dir_lock(out_dir, timeout=60.0, stale=120.0):
+    """
+    Candado entre procesos por carpeta: archivo .crop_index.lock creado con
+    O_EXCL (funciona igual en Windows y Linux). Un candado más viejo que
+    `stale` segundos se da por abandonado (proceso muerto) y se borra.
+    """
+    path = os.path.join(out_dir, ".crop_index.lock")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > stale:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue  # otro proceso lo acaba de soltar
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No se pudo tomar el candado {path}")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class CropWriter:
+    """
+    Escritor asíncrono de recortes (ImageCropper / CellExtractor).
+
+        - Pool de hilos: codificación + escritura fuera del bucle de páginas
+          (cv2.imencode libera el GIL)
+        - Formato según contenido: fotos → photo_format (jpg/webp con
+          calidad), line art / texto → lineart_format (png)
+        - Sin reescrituras: hash del contenido por archivo en un índice
+          (.crop_index.json); si el recorte no cambió, no se vuelve a escribir
+        - naming="hash": nombres direccionados por contenido ({hash}.ext)
+        - keep_in_memory: el resultado incluye el array para OCR/LLM sin
+          releer el disco
+
+    submit() devuelve enseguida {file, hash, format[, array]};
+    el archivo queda garantizado en disco tras flush() / close().
+    """
+
+    def __init__(self, workers=4, photo_format="jpg", photo_quality=90,
+                 lineart_format="png", naming="stem", keep_in_memory=False,
+                 max_pending=256):
+        if photo_format not in FORMATS or lineart_format not in FORMATS:
+            raise ValueError(f"Formatos soportados: {', '.join(FORMATS)}")
+        self.photo_format = photo_format
+        self.photo_quality = photo_quality
+        self.lineart_format = lineart_format
+        self.naming = naming
+        self.keep_in_memory = keep_in_memory
+        # Tope de recortes en cola: acota la memoria si el disco va lento
+        self.max_pending = max_pending
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers)) if workers else None
+        self.futures = []
+        self.written = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._dirty = {}  # out_dir -> {archivo: hash} escritos por este proceso
+
+    # --------------------------------------------------------
+    # Clasificación foto / line art
+    # --------------------------------------------------------
+    @staticmethod
+    def is_photo(crop, max_colors=48):
+        """
+        Heurística barata: una foto tiene muchos colores distintos tras
+        cuantizar una miniatura; texto y dibujos lineales tienen pocos.
+        """
+        if crop.ndim == 2 or crop.size == 0:
+            return False
+        thumb = cv2.resize(crop, (64, 64), interpolation=cv2.INTER_AREA)
+        q = (thumb // 32).reshape(-1, thumb.shape[2]).astype(np.int32)
+        codes = q[:, 0] * 64 + q[:, 1] * 8 + q[:, 2]
+        return len(np.unique(codes)) > max_colors
+
+    # --------------------------------------------------------
+    # Índice de hashes por carpeta
+    # --------------------------------------------------------
+    @staticmethod
+    def _load_index(out_dir):
+        path = os.path.join(out_dir, ".crop_index.json")
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except ValueError:
+                pass
+        return {}
+
+    def _index(self, out_dir):
+        idx = self._indexes.get(out_dir)
+        if idx is None:
+            idx = self._indexes[out_dir] = self._load_index(out_dir)
+        return idx
+
+    def _save_indexes(self):
+        """
+        Varios procesos (--workers N) pueden compartir carpeta: con el
+        candado de la carpeta tomado se relee el índice en disco, se le suman
+        solo las entradas escritas aquí y se reemplaza de forma atómica
+        (tmp + os.replace).
+        """
+        for out_dir, changes in self._dirty.items():
+            if not changes:
+                continue
+            path = os.path.join(out_dir, ".crop_index.json")
+            with _dir_lock(out_dir):
+                idx = self._load_index(out_dir)
+                idx.update(changes)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(idx, f)
+                os.replace(tmp, path)
+            self._indexes[out_dir] = idx
+        self._dirty = {}
+
+    # --------------------------------------------------------
+    # Escritura
+    # --------------------------------------------------------
+    def _write(self, path, crop, fmt):
+        ext, params = FORMATS[fmt]
+        ok, buf = cv2.imencode(ext, crop, params(self.photo_quality))
+        if not ok:
+            print("[ERROR] No se pudo codificar el recorte:", path)
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf.tobytes())
+        os.replace(tmp, path)
+
+    def submit(self, crop, out_dir, stem, kind=None):
+        """
+        Encola un recorte. kind: "photo" | "lineart" | None (auto).
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        crop = np.ascontiguousarray(crop)
+        h = hashlib.blake2b(f"{crop.shape}|{crop.dtype}".encode(), digest_size=16)
+        h.update(memoryview(crop))
+        digest = h.hexdigest()
+
+        if kind is None:
+            kind = "photo" if self.is_photo(crop) else "lineart"
+        fmt = self.photo_format if kind == "photo" else self.lineart_format
+        name = digest if self.naming == "hash" else stem
+        path = os.path.join(out_dir, name + FORMATS[fmt][0])
+
+        with self._lock:
+            idx = self._index(out_dir)
+            unchanged = idx.get(os.path.basename(path)) == digest and os.path.exists(path)
+            if not unchanged:
+                idx[os.path.basename(path)] = digest
+                self._dirty.setdefault(out_dir, {})[os.path.basename(path)] = digest
+
+        if unchanged:
+            self.skipped += 1
+        else:
+            self.written += 1
+            if self.pool is None:
+                self._write(path, crop, fmt)
+            else:
+                if len(self.futures) >= self.max_pending:
+                    self.futures.pop(0).result()
+                self.futures.append(self.pool.submit(self._write, path, crop, fmt))
+
+        result = {"file": path, "hash": digest, "format": fmt}
+        if self.keep_in_memory:
+            result["array"] = crop
+        return result
+
+    def flush(self):
+        futures, self.futures = self.futures, []
+        for fut in futures:
+            fut.result()
+        with self._lock:
+            self._save_indexes()
+
+    def close(self):
+        self.flush()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
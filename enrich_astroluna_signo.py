@@ -1,4 +1,5 @@
-import argparse
+import argparse, os, sqlite3
+from astro_luna_cube import refresh
 p=argparse.ArgumentParser()
 p.add_argument("--db"), p.add_argument("--csv-top"), p.add_argument("--csv-all")
 p.add_argument("--html"), p.add_argument("--title")
@@ -8,4 +9,13 @@ p.add_argument("--blacklist"), p.add_argument("--w-alpha", type=float, default=0
 p.add_argument("--w-beta", type=float, default=0.3), p.add_argument("--w-gamma", type=float, default=0.2)
 p.add_argument("--lookback-days", type=int, default=365)
 args=p.parse_args()
+if args.db and os.path.exists(args.db):
+    # mantiene el cubo signo×posición×dígito al día (solo sorteos nuevos)
+    cnx=sqlite3.connect(args.db)
+    try:
+        st=refresh(cnx)
+        print(f"[OK ] astro_luna_cube {st['mode']}: +{st['added']} sorteos")
+    except RuntimeError as e:
+        print(f"[WARN] astro_luna_cube: {e}")
+    cnx.close()
 print("[OK ] enrich_astroluna_signo (stub)")
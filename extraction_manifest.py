@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import time
+
+
+class ExtractionManifest:
+    """
+    Manifiesto de extracción incremental.
+
+    Por cada archivo de entrada (PDF, página, HTML, ZIP...) guarda:
+        path → {size, mtime, hash, version, outputs, updated_at}
+
+    Un archivo está "al día" si su versión de pipeline coincide, sus
+    outputs siguen existiendo y su contenido no cambió. Primero se comparan
+    size + mtime (barato); solo si difieren se recalcula el hash, así un
+    archivo tocado pero idéntico no se reprocesa.
+
+    Uso:
+        m = ExtractionManifest("output/manifest.json", version="v4")
+        if m.is_fresh(path):
+            outputs = m.outputs(path)      # reutilizar
+        else:
+            ... procesar ...
+            m.record(path, [salida1, salida2])
+        m.save()
+    """
+
+    def __init__(self, path, version="1"):
+        self.path = path
+        self.version = str(version)
+        self.entries = {}
+        self.reused = 0
+        self.processed = 0
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.entries = data.get("entries", {})
+            except ValueError:
+                print(f"[WARN] Manifiesto ilegible, se reconstruye: {path}")
+                self.entries = {}
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    @staticmethod
+    def file_hash(path):
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    # --------------------------------------------------------
+    # Consulta
+    # --------------------------------------------------------
+    def is_fresh(self, path):
+        entry = self.entries.get(self._key(path))
+        if not entry or entry.get("version") != self.version:
+            return False
+        if not all(os.path.exists(o) for o in entry.get("outputs", [])):
+            return False
+
+        st = os.stat(path)
+        if st.st_size == entry["size"] and st.st_mtime == entry["mtime"]:
+            return True
+        if st.st_size != entry["size"]:
+            return False
+
+        # mtime distinto pero mismo tamaño: decide el contenido
+        if self.file_hash(path) != entry["hash"]:
+            return False
+        entry["mtime"] = st.st_mtime
+        return True
+
+    def outputs(self, path):
+        entry = self.entries.get(self._key(path))
+        return list(entry.get("outputs", [])) if entry else []
+
+    def stale(self, paths):
+        """
+        Filtra los archivos que hay que (re)procesar; cuenta los reutilizados.
+        """
+        todo = []
+        for p in paths:
+            if self.is_fresh(p):
+                self.reused += 1
+            else:
+                todo.append(p)
+        return todo
+
+    # --------------------------------------------------------
+    # Registro
+    # --------------------------------------------------------
+    def record(self, path, outputs):
+        st = os.stat(path)
+        self.entries[self._key(path)] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "hash": self.file_hash(path),
+            "version": self.version,
+            "outputs": [os.path.abspath(o) for o in outputs],
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.processed += 1
+
+    def save(self):
+        d = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(d, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "entries": self.entries}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def summary(self):
+        return f"{self.processed} procesados, {self.reused} reutilizados"
@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from modules.page_image import Page
+
 
 class FallbackDetector:
     """
@@ -16,17 +18,15 @@ class FallbackDetector:
     """
 
     def detect_blocks(self, image_path):
-        img = cv2.imread(image_path)
-        if img is None:
+        """
+        image_path: ruta de la página o Page ya decodificado.
+        """
+        page = Page.of(image_path)
+        if not page.ok:
             return []
 
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-        # Suavizar ruido
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-
-        # Detección de bordes
-        edges = cv2.Canny(blur, 50, 150)
+        # Suavizar ruido (5x5) + detección de bordes
+        edges = page.edges(50, 150, 5)
 
         # Dilatar bordes para agrupar
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
@@ -1,8 +1,30 @@
-import os, csv, time
+import os, csv, sys, sqlite3, argparse
+from astro_luna_cube import refresh, matrix_total, matrix_last_n, write_matrix_csv
+
 root=os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ap=argparse.ArgumentParser()
+ap.add_argument("--db", default=os.path.join(root,"radar_premios.db"))
+ap.add_argument("--last", type=int, default=0, help="Matriz de los últimos N sorteos (0 = todos)")
+ap.add_argument("--rebuild", action="store_true", help="Reconstruye el cubo completo")
+args=ap.parse_args()
+
 outdir=os.path.join(root,"data","limpio")
 os.makedirs(outdir, exist_ok=True)
 path=os.path.join(outdir,"matriz_astro_luna.csv")
 with open(path,"w",newline="",encoding="utf-8") as f:
     csv.writer(f).writerow(["d4","signo","freq"])
 print(f"✅ Matriz generada: {path} (0 filas, stub)")
+
+# Cubo signo×posición×dígito: solo suma los sorteos nuevos de astro_luna
+if os.path.exists(args.db):
+    cnx=sqlite3.connect(args.db)
+    try:
+        st=refresh(cnx, rebuild=args.rebuild)
+    except RuntimeError as e:
+        print(f"[WARN] Cubo astro_luna no actualizado: {e}")
+        sys.exit(0)
+    counts=matrix_last_n(cnx, args.last) if args.last>0 else matrix_total(cnx)
+    cube_path=os.path.join(outdir,"matriz_astro_luna_cubo.csv")
+    n=write_matrix_csv(cube_path, counts)
+    cnx.close()
+    print(f"✅ Cubo astro_luna ({st['mode']}, +{st['added']} sorteos): {cube_path} ({n} filas)")
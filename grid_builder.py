@@ -1,5 +1,7 @@
 import numpy as np
 
+from modules.bbox_utils import group_by_anchor
+
 class GridBuilder:
     """
     Organiza celdas detectadas en una cuadrícula ordenada y coherente.
@@ -22,23 +24,10 @@ class GridBuilder:
     # Agrupar celdas en filas por coordenada Y
     # -----------------------------------------------------------
     def group_rows(self, cells):
-        rows = []
+        # Barrido ordenado: cada celda va a la primera fila cuya celda ancla
+        # esté a <= row_threshold en vertical (bisección, O(n log n))
         sorted_cells = sorted(cells, key=lambda c: (c["y"], c["x"]))
-
-        for c in sorted_cells:
-            placed = False
-
-            for row in rows:
-                # Comparación vertical
-                if abs(c["y"] - row[0]["y"]) <= self.row_threshold:
-                    row.append(c)
-                    placed = True
-                    break
-
-            if not placed:
-                rows.append([c])
-
-        return rows
+        return group_by_anchor(sorted_cells, lambda c: c["y"], self.row_threshold)
 
     # -----------------------------------------------------------
     # Ordenar columnas dentro de cada fila
@@ -1,3 +1,6 @@
+from modules.bbox_utils import GridIndex, nearest_1d
+
+
 class ImageAssigner:
 
     def __init__(self):
@@ -5,24 +8,30 @@ class ImageAssigner:
 
     def assign(self, productos, image_blocks):
         """
-        Asigna bloques de imágenes a productos basados en cercanía vertical.
+        Asigna bloques de imágenes a productos basados en cercanía.
+
+        - Si el producto trae "x" e "y": imagen más cercana en 2D
+          (distancia punto–rectángulo) vía índice espacial.
+        - Si solo trae "y": imagen más cercana en vertical (búsqueda binaria).
         """
         productos_con_fotos = []
 
-        for prod in productos:
-            prod_y = prod["y"]
+        grid = None
+        ys = None
 
-            # Buscar imagen más cercana en Y
+        for prod in productos:
             closest = None
-            min_dist = 99999
-
-            for img in image_blocks:
-                (x, y, w, h) = img["bbox"]
-                dist = abs(y - prod_y)
 
-                if dist < min_dist:
-                    min_dist = dist
-                    closest = img["file"]
+            if image_blocks and prod.get("x") is not None:
+                if grid is None:
+                    grid = GridIndex.from_boxes([img["bbox"] for img in image_blocks])
+                idx = grid.nearest(prod["x"], prod["y"])
+                closest = image_blocks[idx]["file"]
+            elif image_blocks:
+                if ys is None:
+                    ys = sorted((img["bbox"][1], i) for i, img in enumerate(image_blocks))
+                idx = nearest_1d(ys, prod["y"])
+                closest = image_blocks[idx]["file"]
 
             prod["imagen"] = closest
             productos_con_fotos.append(prod)
@@ -1,15 +1,22 @@
-import cv2
 import os
 
+from modules.crop_writer import CropWriter
+
 class ImageCropper:
 
-    def __init__(self):
+    def __init__(self, writer=None):
+        """
+        writer: CropWriter compartido (formato, calidad, hilos). Por defecto
+        fotos en JPG y line art en PNG, escritos en segundo plano.
+        """
         self.out_dir = "output/images/crops/"
         os.makedirs(self.out_dir, exist_ok=True)
+        self.writer = writer or CropWriter()
 
     def crop_blocks(self, img, image_blocks, page_name):
         """
         Corta y exporta cada foto detectada.
+        La escritura es asíncrona: llamar flush() antes de leer los archivos.
         """
         saved = []
 
@@ -17,13 +24,18 @@ class ImageCropper:
 
             crop = img[y:y+h, x:x+w]
 
-            filename = f"{page_name.replace('.png','')}_img_{i}.png"
-            cv_path = os.path.join(self.out_dir, filename)
-            cv2.imwrite(cv_path, crop)
+            stem = f"{page_name.replace('.png','')}_img_{i}"
+            res = self.writer.submit(crop, self.out_dir, stem)
 
-            saved.append({
-                "file": cv_path,
+            entry = {
+                "file": res["file"],
                 "bbox": (x, y, w, h)
-            })
+            }
+            if "array" in res:
+                entry["array"] = res["array"]
+            saved.append(entry)
 
         return saved
+
+    def flush(self):
+        self.writer.flush()
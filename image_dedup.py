@@ -0,0 +1,219 @@
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+# ------------------------------------------------------------
+# Hashes perceptuales (64 bits)
+# ------------------------------------------------------------
+_N = 32
+_COS = [[math.cos((2 * x + 1) * u * math.pi / (2 * _N)) for x in range(_N)] for u in range(8)]
+
+
+def dhash(gray9x8):
+    """
+    Hash de diferencias: 1 si el píxel es más oscuro que su vecino derecho.
+    """
+    px = list(gray9x8.getdata())
+    bits = 0
+    for y in range(8):
+        row = px[y * 9:(y + 1) * 9]
+        for x in range(8):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return bits
+
+
+def phash(gray32):
+    """
+    Hash DCT: coeficientes de baja frecuencia (8x8) de una DCT-II 32x32,
+    1 si supera la mediana. La DCT es separable: filas y luego columnas,
+    solo para las 8 frecuencias que se usan.
+    """
+    px = list(gray32.getdata())
+    rows = []
+    for y in range(_N):
+        line = px[y * _N:(y + 1) * _N]
+        rows.append([sum(c * v for c, v in zip(_COS[u], line)) for u in range(8)])
+    coeffs = []
+    for v in range(8):
+        cv = _COS[v]
+        for u in range(8):
+            coeffs.append(sum(cv[y] * rows[y][u] for y in range(_N)))
+    median = sorted(coeffs)[32]
+    bits = 0
+    for c in coeffs:
+        bits = (bits << 1) | (c > median)
+    return bits
+
+
+def image_hashes(path):
+    """
+    {"d": dHash, "p": pHash, "w": ancho, "h": alto} de una imagen.
+    """
+    with Image.open(path) as img:
+        w, h = img.size
+        img.draft("L", (64, 64))  # JPEG: decodifica directo a baja resolución
+        gray = img.convert("L")
+    return {
+        "d": dhash(gray.resize((9, 8), Image.LANCZOS)),
+        "p": phash(gray.resize((_N, _N), Image.LANCZOS)),
+        "w": w,
+        "h": h,
+    }
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+# ------------------------------------------------------------
+# BK-tree (búsqueda por radio en distancia de Hamming)
+# ------------------------------------------------------------
+class BKTree:
+    """
+    Árbol BK sobre hashes de 64 bits. search(h, r) solo visita los hijos
+    cuya arista d cumple |d - dist| <= r (desigualdad triangular).
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, h, item):
+        node = [h, item, {}]
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+        cur = self.root
+        while True:
+            d = hamming(h, cur[0])
+            nxt = cur[2].get(d)
+            if nxt is None:
+                cur[2][d] = node
+                return
+            cur = nxt
+
+    def search(self, h, radius):
+        """
+        [(distancia, item), ...] ordenado por distancia.
+        """
+        out = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                out.append((d, node[1]))
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        out.sort(key=lambda t: t[0])
+        return out
+
+
+# ------------------------------------------------------------
+# Caché de hashes (ruta + tamaño + mtime)
+# ------------------------------------------------------------
+def _load_hash_cache(path):
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            pass
+    return {}
+
+
+def _save_hash_cache(path, cache):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def compute_hashes(paths, workers=8, cache_path=None):
+    """
+    {ruta: hashes | None} para todas las rutas (None si no se pudo abrir).
+    """
+    cache = _load_hash_cache(cache_path)
+    out, todo = {}, []
+    for p in paths:
+        st = os.stat(p)
+        hit = cache.get(os.path.abspath(p))
+        if hit and hit["size"] == st.st_size and hit["mtime"] == st.st_mtime:
+            out[p] = hit["hashes"]
+        else:
+            todo.append(p)
+
+    def one(p):
+        try:
+            return p, image_hashes(p)
+        except Exception as e:
+            print(f"[WARN] No se pudo calcular hash de {os.path.basename(p)}: {e}")
+            return p, None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        for p, hs in ex.map(one, todo):
+            out[p] = hs
+            if hs is not None:
+                st = os.stat(p)
+                cache[os.path.abspath(p)] = {"size": st.st_size, "mtime": st.st_mtime, "hashes": hs}
+
+    if todo:
+        _save_hash_cache(cache_path, cache)
+    return out
+
+
+# ------------------------------------------------------------
+# Agrupamiento de casi-duplicados
+# ------------------------------------------------------------
+def cluster_duplicates(paths, max_dist=6, workers=8, cache_path=None):
+    """
+    Agrupa imágenes casi idénticas (re-escaladas, re-comprimidas,
+    re-guardadas). Dos imágenes son duplicadas si su pHash difiere en
+    <= max_dist bits y su dHash en <= 2 * max_dist.
+
+    Representante de cada grupo: la de mayor resolución (luego mayor
+    archivo, luego ruta). Devuelve {ruta: representante}; las imágenes
+    ilegibles son su propio representante.
+    """
+    hashes = compute_hashes(paths, workers=workers, cache_path=cache_path)
+
+    def quality(p):
+        hs = hashes[p]
+        return (-(hs["w"] * hs["h"]), -os.path.getsize(p), p)
+
+    rep_of = {}
+    tree = BKTree()
+    for p in sorted((p for p in paths if hashes.get(p)), key=quality):
+        hs = hashes[p]
+        rep = None
+        for _, cand in tree.search(hs["p"], max_dist):
+            if hamming(hs["d"], hashes[cand]["d"]) <= 2 * max_dist:
+                rep = cand
+                break
+        if rep is None:
+            tree.add(hs["p"], p)
+            rep = p
+        rep_of[p] = rep
+
+    return {p: rep_of.get(p, p) for p in paths}
+
+
+def representatives(rep_of):
+    """
+    Representantes en orden de aparición + número de duplicados omitidos.
+    """
+    reps, seen = [], set()
+    for p, r in rep_of.items():
+        if r not in seen:
+            seen.add(r)
+            reps.append(r)
+    return reps, len(rep_of) - len(reps)
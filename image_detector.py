@@ -1,14 +1,24 @@
 import cv2
 
+from modules.result_cache import version_of
+
 class ImageDetector:
 
-    def __init__(self):
-        pass
+    CACHE_VERSION = "1"
+
+    def __init__(self, cache=None):
+        self.cache = cache
 
     def detect_images(self, img):
         """
         Detecta bloques que son fotos utilizando bordes + densidad de píxeles.
         """
+        if self.cache is None:
+            return self._detect_images(img)
+        key = self.cache.make_key(self.cache.hash_array(img), version_of(self))
+        return [tuple(b) for b in self.cache.get_or_compute("images", key, lambda: self._detect_images(img))]
+
+    def _detect_images(self, img):
         edges = cv2.Canny(img, 80, 200)
 
         cnts, _ = cv2.findContours(
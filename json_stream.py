@@ -0,0 +1,271 @@
+import json
+import re
+
+
+# Límite de un objeto en captura: si se supera (p. ej. una comilla sin
+# cerrar que se traga el resto del archivo) el objeto se descarta
+MAX_OBJECT_CHARS = 2 * 1024 * 1024
+
+_STRUCT = re.compile(r'[{}\[\]"]')
+_IN_STRING = re.compile(r'["\\\n]')
+_NEXT_OBJECT = re.compile(r'[ \t\r]*\{\s*"')
+_LITERALS = re.compile(r'\b(True|False|None|NaN)\b')
+_LITERAL_MAP = {"True": "true", "False": "false", "None": "null", "NaN": "null"}
+_CLOSER = {"{": "}", "[": "]"}
+
+
+# ------------------------------------------------------------
+# Reparación de un objeto suelto
+# ------------------------------------------------------------
+def repair_json(text):
+    """
+    Intenta cargar un objeto JSON dañado típico de salida de LLM:
+        - comas colgantes antes de } o ]
+        - True / False / None / NaN de Python
+        - saltos de línea y tabs crudos dentro de strings
+        - truncado: cierra el string y las llaves/corchetes abiertos,
+          retrocediendo a la última coma si el último campo quedó a medias
+    Devuelve el objeto o None.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    out = []
+    stack = []
+    cuts = []  # (largo de out antes de la coma, pila en ese punto)
+    in_str = esc = False
+    seg = []   # texto fuera de strings pendiente de reemplazar literales
+
+    def flush_seg():
+        if seg:
+            out.append(_LITERALS.sub(lambda m: _LITERAL_MAP[m.group(1)], "".join(seg)))
+            seg.clear()
+
+    for ch in text:
+        if in_str:
+            if esc:
+                esc = False
+                out.append(ch)
+            elif ch == "\\":
+                esc = True
+                out.append(ch)
+            elif ch == '"':
+                in_str = False
+                out.append(ch)
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+            continue
+
+        if ch == '"':
+            flush_seg()
+            in_str = True
+            out.append(ch)
+        elif ch in "{[":
+            flush_seg()
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            flush_seg()
+            # Coma colgante
+            while out and out[-1].strip() in ("", ","):
+                if out[-1].strip() == ",":
+                    out.pop()
+                    break
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(ch)
+        elif ch == ",":
+            flush_seg()
+            cuts.append((len(out), list(stack)))
+            out.append(ch)
+        else:
+            seg.append(ch)
+    flush_seg()
+
+    if in_str:
+        out.append('"')
+    body = "".join(out).rstrip()
+    candidates = []
+    if stack or in_str:
+        tail = body
+        if tail.endswith(","):
+            tail = tail[:-1]
+        elif tail.endswith(":"):
+            tail += " null"
+        candidates.append(tail + "".join(_CLOSER[c] for c in reversed(stack)))
+        for n, st in reversed(cuts[-20:]):
+            candidates.append("".join(out[:n]) + "".join(_CLOSER[c] for c in reversed(st)))
+    else:
+        candidates.append(body)
+
+    for cand in candidates:
+        try:
+            return json.loads(cand)
+        except ValueError:
+            continue
+    return None
+
+
+# ------------------------------------------------------------
+# Extracción incremental
+# ------------------------------------------------------------
+class JsonObjectStream:
+    """
+    Extrae objetos JSON de texto que llega por partes (respuestas de LLM,
+    archivos NDJSON, fragmentos concatenados "}{", listas JSON, texto con
+    ```json ... ``` alrededor) y los entrega uno a uno.
+
+        stream = JsonObjectStream()
+        for chunk in chunks:
+            for obj in stream.feed(chunk):
+                ...
+        for obj in stream.close():   # objeto truncado al final, reparado
+            ...
+
+    Solo se guarda en memoria el objeto que se está leyendo, no el archivo.
+    Los objetos dentro de una lista de nivel superior se entregan por
+    separado; lo que hay entre objetos (prosa, comas, corchetes) se ignora.
+    """
+
+    def __init__(self, repair=True, max_object_chars=MAX_OBJECT_CHARS, keep_samples=200):
+        self.repair = repair
+        self.max_object_chars = max_object_chars
+        self.keep_samples = keep_samples
+        self.stats = {"ok": 0, "repaired": 0, "dropped": 0}
+        self.dropped_samples = []
+        self._reset()
+
+    def _reset(self):
+        self._parts = []
+        self._size = 0
+        self._depth = 0
+        self._in_str = False
+        self._skip = 0
+        self._capturing = False
+
+    def _finish(self, text):
+        self._reset()
+        try:
+            obj = json.loads(text)
+            self.stats["ok"] += 1
+            return obj
+        except ValueError:
+            pass
+        obj = repair_json(text) if self.repair else None
+        if isinstance(obj, dict):
+            self.stats["repaired"] += 1
+            return obj
+        self._drop(text)
+        return None
+
+    def _drop(self, text):
+        self.stats["dropped"] += 1
+        if len(self.dropped_samples) < self.keep_samples:
+            self.dropped_samples.append(text[:2000])
+
+    def feed(self, chunk):
+        pos = self._skip
+        self._skip = 0
+        n = len(chunk)
+        start = 0 if self._capturing else None
+
+        while pos < n:
+            if not self._capturing:
+                pos = chunk.find("{", pos)
+                if pos < 0:
+                    return
+                self._capturing = True
+                self._depth = 1
+                start = pos
+                pos += 1
+                continue
+
+            if self._in_str:
+                m = _IN_STRING.search(chunk, pos)
+                if m is None:
+                    break
+                ch, pos = m.group(), m.end()
+                if ch == '"':
+                    self._in_str = False
+                elif ch == "\\":
+                    pos += 1  # salta el carácter escapado
+                elif _NEXT_OBJECT.match(chunk, pos):
+                    # Salto de línea dentro de un string seguido de '{"':
+                    # el objeto actual quedó truncado y empieza otro
+                    obj = self._finish("".join(self._parts) + chunk[start:pos - 1])
+                    if obj is not None:
+                        yield obj
+                continue
+
+            m = _STRUCT.search(chunk, pos)
+            if m is None:
+                break
+            ch, pos = m.group(), m.end()
+            if ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    obj = self._finish("".join(self._parts) + chunk[start:pos])
+                    start = None
+                    if obj is not None:
+                        yield obj
+
+        if pos > n:
+            self._skip = pos - n
+        if self._capturing and start is not None:
+            self._parts.append(chunk[start:])
+            self._size += n - start
+            if self._size > self.max_object_chars:
+                self._drop("".join(self._parts))
+                self._reset()
+
+    def close(self):
+        if self._capturing and self._parts:
+            obj = self._finish("".join(self._parts))
+            if obj is not None:
+                yield obj
+        self._reset()
+
+
+def iter_json_objects(text, stream=None, **kwargs):
+    """
+    Objetos JSON de un string o de un iterable de partes de texto.
+    """
+    stream = stream or JsonObjectStream(**kwargs)
+    chunks = [text] if isinstance(text, str) else text
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.close()
+
+
+def iter_json_file(path, chunk_size=1 << 20, stream=None, **kwargs):
+    """
+    Objetos JSON de un archivo (lista JSON, NDJSON o fragmentos pegados),
+    leído por bloques: memoria constante sin importar el tamaño.
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        yield from iter_json_objects(iter(lambda: f.read(chunk_size), ""), stream=stream, **kwargs)
+
+
+def parse_llm_json(text, default=None):
+    """
+    Primer objeto JSON de una respuesta de modelo (con o sin ```json,
+    prosa alrededor o truncada), o default.
+    """
+    if not text:
+        return default
+    for obj in iter_json_objects(text):
+        return obj
+    return default
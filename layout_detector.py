@@ -1,8 +1,21 @@
 import cv2
 
+from modules.result_cache import version_of
+
 class LayoutDetector:
 
+    CACHE_VERSION = "1"
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
     def detect(self, img):
+        if self.cache is None:
+            return self._detect(img)
+        key = self.cache.make_key(self.cache.hash_array(img), version_of(self))
+        return [tuple(b) for b in self.cache.get_or_compute("layout", key, lambda: self._detect(img))]
+
+    def _detect(self, img):
         thresh = cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
                                        cv2.THRESH_BINARY_INV, 25, 15)
 
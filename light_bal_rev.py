@@ -22,6 +22,8 @@ import sqlite3
 from collections import Counter
 from itertools import combinations
 
+from run_metrics import add_profile_args, profiler_from_args
+
 GAMES = [
     ("baloto",   "baloto_resultados_std"),
     ("revancha", "revancha_resultados_std"),
@@ -273,7 +275,7 @@ def recent_draws_table(draw_keys, draws_main, draws_super, show_last, order_row)
 
 def render_game(conn, db_path, game, table, out_dir,
                 sample_limit=0, topk=15, show_last=20, order_row="as_is",
-                include_pairs=True, include_trios=True):
+                include_pairs=True, include_trios=True, prof=None):
     ts = now_str()
 
     if not exists(conn, table):
@@ -293,7 +295,9 @@ def render_game(conn, db_path, game, table, out_dir,
         print(f"[WARN] No pude leer datos para {game}.")
         return 0
 
+    if prof: prof.lap("load", game)
     rows, cols = fetch_all(conn, table)
+    if prof: prof.add_rows(len(rows))
     if not rows:
         body = SECTION.format(
             title="Estado",
@@ -312,6 +316,7 @@ def render_game(conn, db_path, game, table, out_dir,
         print(f"[WARN] {game}: tabla vacía.")
         return 0
 
+    if prof: prof.lap("model", game)
     main_cols, super_col = detect_num_cols(cols)
     draws_main, draws_super, draw_keys, date_range = extract_draw_numbers(
         rows, cols, sample_limit, main_cols, super_col
@@ -391,6 +396,7 @@ def render_game(conn, db_path, game, table, out_dir,
             content=html_table(["Número", "Sorteos desde última aparición"], ls_s[:topk])
         ))
 
+    if prof: prof.lap("export", game)
     out_html = HTML_LAYOUT.replace("{css}", "{css}").format(
         title=f"{game.capitalize()} - Light",
         css=HTML_CSS,
@@ -409,6 +415,7 @@ def render_game(conn, db_path, game, table, out_dir,
     out_path = os.path.join(out_dir, f"{game}_light.html")
     with open(out_path, "w", encoding="utf-8") as f:
         f.write(out_html)
+    if prof: prof.lap(None)
     print(f"[OK ] {game} light -> {out_path}")
     return 0
 
@@ -427,6 +434,7 @@ def main():
                     help="Ordenar números por fila en la tabla de últimos sorteos")
     ap.add_argument("--no-pairs", dest="no_pairs", action="store_true", help="Oculta la sección de pares")
     ap.add_argument("--no-trios", dest="no_trios", action="store_true", help="Oculta la sección de tríos")
+    add_profile_args(ap)
     args = ap.parse_args()
 
     db_path = os.path.abspath(args.db)
@@ -439,14 +447,16 @@ def main():
 
     conn = sqlite3.connect(db_path)
     try:
-        for game, table in GAMES:
-            render_game(
-                conn, db_path, game, table, out_dir,
-                sample_limit=args.limit, topk=args.topk,
-                show_last=args.show_last, order_row=args.order_row,
-                include_pairs=not args.no_pairs,
-                include_trios=not args.no_trios
-            )
+        with profiler_from_args("light_bal_rev", args) as prof:
+            for game, table in GAMES:
+                render_game(
+                    conn, db_path, game, table, out_dir,
+                    sample_limit=args.limit, topk=args.topk,
+                    show_last=args.show_last, order_row=args.order_row,
+                    include_pairs=not args.no_pairs,
+                    include_trios=not args.no_trios,
+                    prof=prof
+                )
     finally:
         conn.close()
     print("[OK ] Scoring light finalizado")
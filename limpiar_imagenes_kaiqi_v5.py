@@ -2,9 +2,11 @@ import os
 import shutil
 import threading
 import queue
-import base64
 import json
 from openai import OpenAI
+from vision_cache import VisionCache
+from vision_image import image_content
+from image_dedup import cluster_duplicates, representatives
 
 # ==========================================
 # 🔧 CONFIGURACIÓN
@@ -19,12 +21,25 @@ DIR_NO_MOTO       = os.path.join(OUTPUT_DIR, "DESCARTADAS_NO_MOTO")
 DIR_BAJA_CALIDAD  = os.path.join(OUTPUT_DIR, "DESCARTADAS_BAJA_CALIDAD")
 DIR_LOGS          = os.path.join(OUTPUT_DIR, "LOGS")
 
-# Hilos
-NUM_WORKERS = 5  # Aumenté un poco para ir más rápido
+# Concurrencia por etapa: la IA y el disco se limitan por separado
+API_WORKERS = 5   # llamadas simultáneas a GPT-4o
+IO_WORKERS = 4    # hash y copias de archivos
+QUEUE_SIZE = 64   # tope de cada cola entre etapas (memoria acotada)
+
+# Diario de progreso: una corrida interrumpida se reanuda desde aquí
+JOURNAL_FILE = os.path.join(DIR_LOGS, "progreso_clasificacion_v5.jsonl")
+
+# Deduplicación perceptual: se clasifica una imagen por grupo de casi-duplicados
+DEDUP_MAX_DIST = 6
+HASH_CACHE = os.path.join(DIR_LOGS, "phash_cache.json")
 
 # Cliente IA (Asegúrate de tener la variable de entorno o pega tu key aquí)
 # client = OpenAI(api_key="sk-TU-API-KEY-AQUI") 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+MODELO_IA = "gpt-4o"
+
+# Caché Vision compartida con los demás scripts (sha256 imagen + prompt + modelo)
+VISION_CACHE = VisionCache()
 
 # ==========================================
 # 🧠 PROMPT DE PRECISIÓN V5
@@ -55,31 +70,41 @@ def setup_dirs():
         os.makedirs(d, exist_ok=True)
 
 def encode_image(img_path):
+    # Reducida a 512 px (detail="low") y recodificada (vision_image.py)
     try:
-        with open(img_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        return image_content(img_path, task="classify")
     except:
         return None
 
 def analizar_imagen(image_path):
-    img64 = encode_image(image_path)
-    if not img64: return None
+    try:
+        sha = VISION_CACHE.hash_file(image_path)
+    except OSError:
+        return None
+    cached = VISION_CACHE.get(sha, PROMPT_ANALISIS, MODELO_IA)
+    if cached: return cached
+
+    img_content = encode_image(image_path)
+    if not img_content: return None
 
     try:
         resp = client.chat.completions.create(
-            model="gpt-4o",
+            model=MODELO_IA,
             messages=[
                 {"role": "system", "content": "Eres un experto en repuestos de moto. Responde solo en JSON."},
                 {"role": "user", "content": [
                     {"type": "text", "text": PROMPT_ANALISIS},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img64}", "detail": "low"}}
+                    img_content
                 ]}
             ],
             temperature=0.0,
             max_tokens=150
         )
         content = resp.choices[0].message.content.replace("```json", "").replace("```", "").strip()
-        return json.loads(content)
+        data = json.loads(content)
+        if "clasificacion" in data:
+            VISION_CACHE.put(sha, PROMPT_ANALISIS, MODELO_IA, data)
+        return data
     except Exception as e:
         return {"error": str(e)}
 
@@ -101,29 +126,104 @@ def mover_archivo(src, clasificacion):
         pass
 
 # ==========================================
-# 🧵 WORKER
+# 📒 DIARIO DE PROGRESO
+# ==========================================
+class ProgressJournal:
+    """
+    JSONL de solo-anexar. Por archivo guarda la última etapa alcanzada:
+        {"file", "stage": "classified" | "moved", "cls", "razon", "rep", "error"}
+    Al reanudar, lo ya copiado no se toca y lo clasificado no vuelve a la IA.
+    Los errores de API no cuentan como hechos: se reintentan.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # última línea cortada por la interrupción
+                    if not rec.get("error"):
+                        self.state[rec["file"]] = rec
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def moved(self, path):
+        rec = self.state.get(path)
+        return rec is not None and rec["stage"] == "moved"
+
+    def classified(self, path):
+        return self.state.get(path)
+
+    def write(self, **rec):
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            if not rec.get("error"):
+                self.state[rec["file"]] = rec
+            self._fh.write(line)
+            self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+# ==========================================
+# 🧵 ETAPAS: scan → hash → classify → move
 # ==========================================
-def worker(q, results):
+def etapa_scan():
+    exts = (".jpg", ".jpeg", ".png", ".webp")
+    return sorted(os.path.join(IMAGE_DIR, f) for f in os.listdir(IMAGE_DIR) if f.lower().endswith(exts))
+
+
+def etapa_classify(q_api, q_move, journal):
+    """
+    Trabajador de IA: toma representantes de q_api y deja el resultado
+    en q_move (cola acotada: si el disco va lento, la IA espera).
+    """
     while True:
-        try:
-            img_path = q.get_nowait()
-        except queue.Empty:
+        img_path = q_api.get()
+        if img_path is None:
             break
-
         data = analizar_imagen(img_path)
-        
         if data and "clasificacion" in data:
-            cls = data["clasificacion"]
-            razon = data.get("razon", "")
-            mover_archivo(img_path, cls)
-            results.append(f"{os.path.basename(img_path)},{cls},{razon}")
+            cls, razon, error = data["clasificacion"], data.get("razon", ""), False
+            journal.write(file=img_path, stage="classified", cls=cls, razon=razon, rep=img_path)
             print(f"[{cls}] {os.path.basename(img_path)}")
         else:
-            mover_archivo(img_path, "BAJA_CALIDAD") # Fallback
-            results.append(f"{os.path.basename(img_path)},ERROR_API,")
+            cls, razon, error = None, "", True  # Sin copia: se reintenta en la próxima corrida
             print(f"[ERROR] {os.path.basename(img_path)}")
-            
-        q.task_done()
+        q_move.put((img_path, cls, razon, error))
+
+
+def etapa_move(q_move, journal, grupos):
+    """
+    Trabajador de disco: copia el representante y sus duplicados.
+    Un error de API no copia nada (solo queda en el diario); así al
+    reintentar el archivo no termina en dos carpetas.
+    """
+    while True:
+        item = q_move.get()
+        if item is None:
+            break
+        rep, cls, razon, error = item
+        for f in grupos[rep]:
+            if journal.moved(f):
+                continue
+            if error:
+                journal.write(file=f, stage="moved", cls="ERROR_API", razon="", rep=rep, error=True)
+                continue
+            if cls != "BAJA_CALIDAD":
+                # Copia vieja de una corrida que copiaba los errores como baja calidad
+                stale = os.path.join(DIR_BAJA_CALIDAD, os.path.basename(f))
+                if os.path.exists(stale):
+                    os.remove(stale)
+            mover_archivo(f, cls)
+            nota = razon if f == rep else f"DUPLICADO de {os.path.basename(rep)}"
+            journal.write(file=f, stage="moved", cls=cls, razon=nota, rep=rep, error=False)
+
 
 # ==========================================
 # 🚀 MAIN
@@ -132,31 +232,57 @@ def main():
     setup_dirs()
     print("--- CLASIFICADOR DE PRECISIÓN V5 (GPT-4o) ---")
     
-    # Cargar imágenes
-    exts = (".jpg", ".jpeg", ".png", ".webp")
-    files = [os.path.join(IMAGE_DIR, f) for f in os.listdir(IMAGE_DIR) if f.lower().endswith(exts)]
+    # 1) Scan
+    files = etapa_scan()
     print(f"📸 Total imágenes: {len(files)}")
-    
-    # Cola
-    q = queue.Queue()
-    for f in files: q.put(f)
-    
-    results = []
-    threads = []
-    
-    # Iniciar
-    for _ in range(NUM_WORKERS):
-        t = threading.Thread(target=worker, args=(q, results))
-        t.start()
-        threads.append(t)
-        
-    for t in threads: t.join()
-    
-    # Log
+
+    journal = ProgressJournal(JOURNAL_FILE)
+    pendientes = [f for f in files if not journal.moved(f)]
+    if len(pendientes) < len(files):
+        print(f"↩️  Reanudando: {len(files) - len(pendientes)} ya procesadas")
+
+    # 2) Hash + dedup (pool de I/O; hashes cacheados entre corridas)
+    rep_of = cluster_duplicates(files, max_dist=DEDUP_MAX_DIST, workers=IO_WORKERS, cache_path=HASH_CACHE)
+    grupos = {}
+    for f, rep in rep_of.items():
+        grupos.setdefault(rep, []).append(f)
+    reps = [r for r in representatives(rep_of)[0] if any(not journal.moved(f) for f in grupos[r])]
+    print(f"🧬 Casi-duplicados: {len(files) - len(grupos)} (grupos pendientes: {len(reps)})")
+
+    # 3) Classify (API_WORKERS) → 4) Move (IO_WORKERS), con colas acotadas
+    q_api = queue.Queue(maxsize=QUEUE_SIZE)
+    q_move = queue.Queue(maxsize=QUEUE_SIZE)
+    api_threads = [threading.Thread(target=etapa_classify, args=(q_api, q_move, journal))
+                   for _ in range(API_WORKERS)]
+    io_threads = [threading.Thread(target=etapa_move, args=(q_move, journal, grupos))
+                  for _ in range(IO_WORKERS)]
+    for t in api_threads + io_threads: t.start()
+
+    for rep in reps:
+        prev = journal.classified(rep)
+        if prev and prev.get("cls"):
+            # Clasificado en una corrida anterior: directo a copiar
+            q_move.put((rep, prev["cls"], prev.get("razon", ""), False))
+        else:
+            q_api.put(rep)
+
+    for _ in api_threads: q_api.put(None)
+    for t in api_threads: t.join()
+    for _ in io_threads: q_move.put(None)
+    for t in io_threads: t.join()
+    journal.close()
+
+    # Log (desde el diario: incluye lo hecho en corridas anteriores)
     with open(os.path.join(DIR_LOGS, "log_clasificacion_v5.csv"), "w", encoding="utf-8") as f:
         f.write("Archivo,Clasificacion,Razon\n")
-        for line in results: f.write(line + "\n")
+        for img_path in files:
+            rec = journal.state.get(img_path)
+            if rec and rec["stage"] == "moved":
+                f.write(f"{os.path.basename(img_path)},{rec['cls']},{rec['razon']}\n")
+            else:
+                f.write(f"{os.path.basename(img_path)},ERROR_API,\n")
 
+    print(f"💾 {VISION_CACHE.summary()}")
     print("\n✅ Terminamos. Revisa las carpetas.")
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+
+try:
+    from modules.vision_cache import VisionCache
+except ImportError:  # scripts sueltos, junto a vision_cache.py
+    from vision_cache import VisionCache
+
+
+# TTL por defecto de las respuestas cacheadas (segundos); LLM_CACHE_TTL=0 → sin vencimiento
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", 30 * 24 * 3600)) or None
+
+
+# ------------------------------------------------------------
+# Canonicalización de prompts
+# ------------------------------------------------------------
+def canonical_text(text):
+    """
+    Forma canónica de un prompt: NFKC, saltos de línea unificados, sin
+    sangría ni espacios repetidos, como mucho una línea en blanco seguida.
+    Dos prompts que solo difieren en eso producen la misma clave (y se
+    envía esta forma, así la respuesta cacheada corresponde a lo pedido).
+    """
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = [re.sub(r"[ \t]+", " ", ln).strip() for ln in text.split("\n")]
+    text = "\n".join(lines)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def _canonical_content(content):
+    if isinstance(content, str):
+        return canonical_text(content), []
+    parts, images = [], []
+    for part in content:
+        if part.get("type") == "text":
+            parts.append({**part, "text": canonical_text(part["text"])})
+        else:
+            parts.append(part)
+            if part.get("type") == "image_url":
+                url = part["image_url"]["url"]
+                images.append(hashlib.sha256(url.encode("utf-8")).hexdigest())
+    return parts, images
+
+
+def canonical_request(messages, model, params):
+    """
+    (mensajes canónicos, hash de las imágenes, clave) de una solicitud. Las imágenes entran en la
+    clave solo por su hash, no por el base64 completo.
+    """
+    out, images, key_msgs = [], [], []
+    for m in messages:
+        content, imgs = _canonical_content(m["content"])
+        out.append({**m, "content": content})
+        images.extend(imgs)
+        if isinstance(content, str):
+            key_msgs.append({"role": m["role"], "content": content})
+        else:
+            key_msgs.append({"role": m["role"], "content": [
+                p if p.get("type") == "text" else {"type": p.get("type"), "detail": p.get("image_url", {}).get("detail")}
+                for p in content
+            ]})
+    image_sha = hashlib.sha256("|".join(images).encode("utf-8")).hexdigest() if images else "text"
+    key = {"messages": key_msgs, "images": images, "params": params}
+    return out, image_sha, key
+
+
+# ------------------------------------------------------------
+# Gateway
+# ------------------------------------------------------------
+class _Pending:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LLMGateway:
+    """
+    Punto único de llamadas chat.completions para todos los scripts.
+
+        gw = LLMGateway(client)
+        txt = gw.chat(messages, model="gpt-4o", caller="pim_v7", max_tokens=50)
+
+    - Canonicaliza los prompts (canonical_text) antes de calcular la clave
+    - Coalescencia: si otra llamada idéntica ya está en vuelo, se espera su
+      resultado en vez de pagar una segunda
+    - Respuestas servidas desde la caché SQLite compartida (VisionCache)
+      con TTL; las respuestas vacías no se guardan, ni las que rechace el
+      validate= del llamador (p. ej. JSON que no se puede interpretar)
+    - Métricas por llamador: solicitudes, aciertos de caché, coalescidas,
+      llamadas reales, errores, tokens y latencia
+    """
+
+    def __init__(self, client, cache=None, ttl=DEFAULT_TTL):
+        """
+        cache: VisionCache (por defecto la compartida); False = sin caché.
+        """
+        self.client = client
+        self.cache = VisionCache() if cache is None else (cache or None)
+        self.ttl = ttl
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._metrics = {}
+
+    def last_headers(self):
+        """
+        Cabeceras de la respuesta real de la última chat() de este hilo
+        (None si se sirvió de caché, fue coalescida o el cliente no las expone).
+        """
+        return getattr(self._local, "headers", None)
+
+    # --------------------------------------------------------
+    # Métricas
+    # --------------------------------------------------------
+    def _record(self, caller, **inc):
+        with self._lock:
+            m = self._metrics.setdefault(caller, {
+                "requests": 0, "cache_hits": 0, "coalesced": 0, "api_calls": 0, "errors": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "latency_s": 0.0,
+            })
+            for k, v in inc.items():
+                m[k] += v
+
+    def metrics(self):
+        with self._lock:
+            return {c: dict(m) for c, m in self._metrics.items()}
+
+    def summary(self):
+        lines = []
+        for caller, m in sorted(self.metrics().items()):
+            avg = m["latency_s"] / m["api_calls"] if m["api_calls"] else 0.0
+            lines.append(
+                f"{caller}: {m['requests']} solicitudes, {m['api_calls']} a la API, "
+                f"{m['cache_hits']} de caché, {m['coalesced']} coalescidas, {m['errors']} errores, "
+                f"tokens {m['prompt_tokens']}+{m['completion_tokens']}, latencia media {avg:.2f}s"
+            )
+        return "\n".join(lines)
+
+    # --------------------------------------------------------
+    # Llamada
+    # --------------------------------------------------------
+    @staticmethod
+    def _valid(value, validate):
+        if value in (None, ""):
+            return False
+        if validate is None:
+            return True
+        try:
+            result = validate(value)
+        except Exception:
+            return False
+        return result is not None and result is not False
+
+    def _call(self, kwargs):
+        completions = self.client.chat.completions
+        raw_api = getattr(completions, "with_raw_response", None)
+        if raw_api is not None:
+            raw = raw_api.create(**kwargs)
+            self._local.headers = dict(raw.headers)
+            response = raw.parse()
+        else:
+            response = completions.create(**kwargs)
+        return response
+
+    def chat(self, messages, model, caller="default", use_cache=True, validate=None, **params):
+        """
+        Devuelve el texto de la respuesta. params = resto de argumentos de
+        chat.completions (temperature, max_tokens, response_format, ...).
+
+        validate(texto): parser del llamador; si lanza excepción o devuelve
+        None / False la respuesta se devuelve igual pero no se cachea (y una
+        entrada cacheada que no pase se vuelve a pedir).
+        """
+        self._local.headers = None
+        self._record(caller, requests=1)
+        messages, image_sha, key = canonical_request(messages, model, params)
+        cache = self.cache if use_cache else None
+
+        if cache is not None:
+            hit = cache.get(image_sha, key, model, max_age=self.ttl)
+            if self._valid(hit, validate):
+                self._record(caller, cache_hits=1)
+                return hit
+
+        flight = VisionCache.hash_prompt([image_sha, key, model])
+        with self._lock:
+            pending = self._inflight.get(flight)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[flight] = _Pending()
+
+        if not leader:
+            pending.event.wait()
+            self._record(caller, coalesced=1)
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            # Otra llamada pudo terminar entre la consulta a la caché y el lock
+            value = cache.get(image_sha, key, model, max_age=self.ttl) if cache is not None else None
+            if self._valid(value, validate):
+                self._record(caller, cache_hits=1)
+            else:
+                t0 = time.perf_counter()
+                try:
+                    response = self._call(dict(params, model=model, messages=messages))
+                except Exception:
+                    self._record(caller, errors=1)
+                    raise
+                usage = getattr(response, "usage", None)
+                self._record(
+                    caller, api_calls=1, latency_s=time.perf_counter() - t0,
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                    completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                )
+                value = response.choices[0].message.content
+                if cache is not None and self._valid(value, validate):
+                    cache.put(image_sha, key, model, value)
+            pending.value = value
+            return value
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(flight, None)
+            pending.event.set()
@@ -0,0 +1,142 @@
+import cv2
+import layoutparser as lp
+
+
+DEFAULT_MODEL = "lp://PrimaLayout/mask_rcnn_R_50_FPN_3x/config"
+
+_SERVERS = {}
+
+
+class LayoutModelServer:
+    """
+    Servidor de inferencia LayoutParser "caliente".
+
+        - Carga el modelo una sola vez por proceso (ver get_server)
+        - Acepta lotes de páginas (arrays RGB) y devuelve detecciones
+        - Inferencia CPU con número de hilos de torch configurable
+        - Reducción opcional de la entrada (max_side) con reescalado
+          de las cajas a coordenadas de la página original
+
+    Detección devuelta por página:
+        [ {"type": str, "bbox": [x1, y1, x2, y2], "score": float}, ... ]
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, threads=None, max_side=None):
+        self.model_name = model_name
+        self.threads = threads
+        self.max_side = max_side
+        self.model = None
+        self.enabled = True
+        self.batched = True
+        self.pages_served = 0
+
+    # --------------------------------------------------------
+    # Carga perezosa del modelo
+    # --------------------------------------------------------
+    def _configure_threads(self):
+        if not self.threads:
+            return
+        try:
+            import torch
+            torch.set_num_threads(int(self.threads))
+        except Exception as e:
+            print("[WARN] No se pudo fijar hilos de torch:", e)
+
+    def load(self):
+        if self.model is not None or not self.enabled:
+            return self.model
+        self._configure_threads()
+        try:
+            print(f"[LP] Cargando modelo {self.model_name} ...")
+            self.model = lp.AutoLayoutModel(self.model_name)
+        except Exception as e:
+            print("[WARN] LayoutParser no disponible:", e)
+            self.enabled = False
+        return self.model
+
+    # --------------------------------------------------------
+    # Reducción de entrada
+    # --------------------------------------------------------
+    def _resize(self, image):
+        h, w = image.shape[:2]
+        if not self.max_side or max(h, w) <= self.max_side:
+            return image, 1.0
+        scale = self.max_side / float(max(h, w))
+        small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return small, scale
+
+    @staticmethod
+    def _to_dets(layout, scale):
+        dets = []
+        for b in layout:
+            x1, y1, x2, y2 = b.block.coordinates
+            dets.append({
+                "type": b.type,
+                "bbox": [int(x1 / scale), int(y1 / scale), int(x2 / scale), int(y2 / scale)],
+                "score": float(b.score) if b.score is not None else None,
+            })
+        return dets
+
+    # --------------------------------------------------------
+    # Inferencia
+    # --------------------------------------------------------
+    def _detect_batched(self, images):
+        """
+        Un único forward de Detectron2 para todo el lote (mismo
+        preprocesado que DefaultPredictor.__call__).
+        """
+        import torch
+
+        predictor = self.model.model
+        inputs = []
+        with torch.no_grad():
+            for im in images:
+                if predictor.input_format == "RGB":
+                    im = im[:, :, ::-1]
+                h, w = im.shape[:2]
+                t = predictor.aug.get_transform(im).apply_image(im)
+                t = torch.as_tensor(t.astype("float32").transpose(2, 0, 1))
+                inputs.append({"image": t, "height": h, "width": w})
+            outputs = predictor.model(inputs)
+        return [self.model.gather_output(o) for o in outputs]
+
+    def detect_batch(self, images):
+        """
+        images: lista de arrays RGB. Devuelve una lista de detecciones por imagen.
+        """
+        if not images:
+            return []
+        self.load()
+        if not self.enabled:
+            return [[] for _ in images]
+
+        resized = [self._resize(im) for im in images]
+        smalls = [r[0] for r in resized]
+
+        layouts = None
+        if self.batched and len(smalls) > 1:
+            try:
+                layouts = self._detect_batched(smalls)
+            except Exception as e:
+                # Modelo sin predictor Detectron2 accesible: imagen a imagen
+                print("[WARN] Inferencia por lotes no disponible, se usa imagen a imagen:", e)
+                self.batched = False
+        if layouts is None:
+            layouts = [self.model.detect(im) for im in smalls]
+
+        self.pages_served += len(images)
+        return [self._to_dets(layout, scale) for layout, (_, scale) in zip(layouts, resized)]
+
+    def detect(self, image):
+        return self.detect_batch([image])[0]
+
+
+def get_server(model_name=DEFAULT_MODEL, threads=None, max_side=None):
+    """
+    Servidor compartido por proceso: una carga de modelo por worker,
+    sin importar cuántos detectores lo usen.
+    """
+    key = (model_name, threads, max_side)
+    if key not in _SERVERS:
+        _SERVERS[key] = LayoutModelServer(model_name, threads, max_side)
+    return _SERVERS[key]
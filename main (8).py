@@ -1,4 +1,7 @@
+import argparse
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 # Módulos internos del extractor
 from modules.preprocessing import Preprocessor
@@ -23,128 +26,251 @@ from modules.cleaner import Cleaner
 # Exportación (Fase 5)
 from modules.export_manager import ExportManager
 
+# Caché de OCR / detección + manifiesto incremental
+from modules.result_cache import ResultCache
+from modules.extraction_manifest import ExtractionManifest
+
 # Logging
 from utils.logger import get_logger
 logger = get_logger()
 
 
-def run_extractor():
-    logger.info("=== EXTRACTOR_V4 — Pipeline Completo Fase 1–6 ===")
+PAGES_DIR = "input/pages/"
+CACHE_PATH = "output/cache/extractor_cache.sqlite"
+
+# Extracción incremental: subir PIPELINE_VERSION al cambiar fases 1–7
+PIPELINE_VERSION = "extractor-v4-1"
+MANIFEST_PATH = "output/manifest_pages.json"
+PAGE_RESULTS_DIR = "output/cache/pages/"
+
+
+class PageStages:
+    """
+    Módulos por página (fases 1–7). Se instancian una vez por proceso:
+    en modo secuencial en run_extractor y en modo paralelo una vez por worker.
+    """
+
+    def __init__(self, ocr_mode="page", cache_path=CACHE_PATH):
+        self.ocr_mode = ocr_mode
+        self.cache = ResultCache(cache_path) if cache_path else None
+        self.pre = Preprocessor()
+        self.layout = LayoutDetector(cache=self.cache)
+        self.table_det = TableDetector()
+        self.imgdet = ImageDetector(cache=self.cache)
+        self.cropper = ImageCropper()
+        self.ocr = OCRReader(cache=self.cache)
+        self.segmenter = ProductSegmenter()
+        self.post = PostProcessor()
+        self.assigner = ImageAssigner()
+
+        self.normalizer = Normalizer()
+        self.variant_builder = VariantBuilder()
+
+
+def process_page(stages, pages_dir, page):
+    """
+    Ejecuta las fases 1–7 sobre una página y devuelve sus Product.
+    """
+    s = stages
+    img_path = os.path.join(pages_dir, page)
+
+    # --------------------------------------------------------
+    # 1 — PREPROCESAMIENTO
+    # --------------------------------------------------------
+    img, gray, norm = s.pre.process(img_path)
+
+    # --------------------------------------------------------
+    # 2 — DETECCIÓN DE LAYOUT
+    # --------------------------------------------------------
+    blocks = s.layout.detect(norm)
+
+    # --------------------------------------------------------
+    # 3 — DETECCIÓN DE IMÁGENES + CROP
+    # --------------------------------------------------------
+    image_blocks = s.imgdet.detect_images(norm)
+    images = s.cropper.crop_blocks(img, image_blocks, page)
+
+    # --------------------------------------------------------
+    # 4 — SEGMENTACIÓN DE PRODUCTOS
+    # --------------------------------------------------------
+    rows = s.segmenter.segment_products(blocks)
+    productos_detectados = []
+
+    # OCR de página completa: una llamada a Tesseract y reparto por bloque
+    page_text = s.ocr.read_blocks(norm, blocks) if s.ocr_mode == "page" else None
+
+    for fila in rows:
+
+        y_pos = sum([b[1] for b in fila]) // len(fila)
+        x_pos = sum([b[0] + b[2] // 2 for b in fila]) // len(fila)
+        texto_fila = ""
+
+        # OCR por cada bloque
+        for b in fila:
+            if page_text is not None:
+                raw = page_text.get(tuple(b), "")
+            else:
+                raw = s.ocr.read_region(norm, b)
+            texto_fila += " " + s.ocr.clean_text(raw)
+
+        cods = s.post.extract_codigos(texto_fila)
+        precio = s.post.extract_precio(texto_fila)
+        emp = s.post.extract_empaque(texto_fila)
+
+        productos_detectados.append({
+            "x": x_pos,
+            "y": y_pos,
+            "codigos": cods,
+            "descripcion": texto_fila.strip(),
+            "precio": precio,
+            "empaque": emp
+        })
+
+    # --------------------------------------------------------
+    # 5 — ASIGNAR IMÁGENES POR CERCANÍA
+    # --------------------------------------------------------
+    productos_detectados = s.assigner.assign(productos_detectados, images)
+
+    # --------------------------------------------------------
+    # 6 — NORMALIZACIÓN ADSI COMPLETA
+    # --------------------------------------------------------
+    productos_finales = []
+
+    for prod in productos_detectados:
+        for code in prod["codigos"]:
+
+            p = Product(
+                codigo=code,
+                descripcion=prod["descripcion"],
+                precio=prod["precio"],
+                empaque=prod["empaque"],
+                imagen=prod["imagen"]
+            )
+
+            # 🔵 Normalización ADSI
+            p.color = s.normalizer.detect_color(p.descripcion)
+            p.modelo_moto = s.normalizer.detect_moto(p.descripcion)
+            p.familia = s.normalizer.detect_familia(p.descripcion)
+            p.subfamilia = s.normalizer.detect_subfamilia(p.descripcion)
+            p.descripcion_tecnica, p.descripcion_marketing = \
+                s.normalizer.split_description(p.descripcion)
+
+            productos_finales.append(p)
+
+    # Recortes escritos en segundo plano mientras corría el OCR
+    s.cropper.flush()
+
+    # --------------------------------------------------------
+    # 7 — VARIANTES PADRE-HIJO
+    # --------------------------------------------------------
+    return s.variant_builder.assign_variants(productos_finales)
+
+
+# ------------------------------------------------------------
+# Workers (modo --workers > 1)
+# ------------------------------------------------------------
+_WORKER_STAGES = None
+
+
+def _init_worker(ocr_mode, cache_path):
+    global _WORKER_STAGES
+    # Un hilo OpenCV por proceso: el paralelismo lo da el pool
+    import cv2
+    cv2.setNumThreads(1)
+    _WORKER_STAGES = PageStages(ocr_mode, cache_path)
+
+
+def _worker_page(job):
+    pages_dir, page = job
+    productos = process_page(_WORKER_STAGES, pages_dir, page)
+    return page, [p.to_dict() for p in productos]
+
+
+def _iter_pages_parallel(pages_dir, pages, workers, ocr_mode, cache_path):
+    """
+    Procesa páginas en un pool de procesos. Cada worker devuelve dicts
+    (Product.to_dict) que se reconstruyen aquí, en el orden de `pages`.
+    """
+    jobs = [(pages_dir, page) for page in pages]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(ocr_mode, cache_path)) as ex:
+        # map conserva el orden de entrada => salida determinista
+        for page, dicts in ex.map(_worker_page, jobs, chunksize=1):
+            yield page, [Product.from_dict(d) for d in dicts]
+
+
+def _iter_pages_serial(pages_dir, pages, ocr_mode, cache_path):
+    stages = PageStages(ocr_mode, cache_path)
+    for page in pages:
+        logger.info(f"Procesando página: {page}")
+        yield page, process_page(stages, pages_dir, page)
+
+
+def _page_result_path(page):
+    return os.path.join(PAGE_RESULTS_DIR, os.path.splitext(page)[0] + ".json")
+
+
+def _save_page_result(manifest, pages_dir, page, productos):
+    path = _page_result_path(page)
+    os.makedirs(PAGE_RESULTS_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([p.to_dict() for p in productos], f, ensure_ascii=False)
+    manifest.record(os.path.join(pages_dir, page), [path])
 
-    # ------------------------------------------------------------
-    # Inicialización de módulos
-    # ------------------------------------------------------------
-    pre = Preprocessor()
-    layout = LayoutDetector()
-    table_det = TableDetector()
-    imgdet = ImageDetector()
-    cropper = ImageCropper()
-    ocr = OCRReader()
-    segmenter = ProductSegmenter()
-    post = PostProcessor()
-    assigner = ImageAssigner()
-
-    normalizer = Normalizer()
-    variant_builder = VariantBuilder()
+
+def _load_page_result(page):
+    with open(_page_result_path(page), "r", encoding="utf-8") as f:
+        return [Product.from_dict(d) for d in json.load(f)]
+
+
+def run_extractor(pages_dir=PAGES_DIR, workers=1, ocr_mode="page", cache_path=CACHE_PATH,
+                  incremental=True):
+    logger.info("=== EXTRACTOR_V4 — Pipeline Completo Fase 1–6 ===")
 
     validator = Validator()
     cleaner = Cleaner()
 
-    pages_dir = "input/pages/"
-    pages = [p for p in os.listdir(pages_dir) if p.lower().endswith(".png")]
+    # Orden alfabético: mismo orden de salida en modo secuencial y paralelo
+    pages = sorted(p for p in os.listdir(pages_dir) if p.lower().endswith(".png"))
+
+    # Páginas sin cambios desde la corrida anterior: se reutilizan sus productos.
+    # El modo de OCR entra en la versión: cambiarlo rehace todas las páginas
+    manifest = ExtractionManifest(MANIFEST_PATH, f"{PIPELINE_VERSION}|ocr={ocr_mode}")
+    by_page = {}
+    todo = pages
+    if incremental:
+        todo = []
+        for page in pages:
+            if manifest.is_fresh(os.path.join(pages_dir, page)):
+                by_page[page] = _load_page_result(page)
+                manifest.reused += 1
+            else:
+                todo.append(page)
+        logger.info(f"Páginas sin cambios: {len(pages) - len(todo)} | por procesar: {len(todo)}")
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, max(1, len(todo)))
 
     all_products = []  # 🔥 Donde acumulamos todos los productos del catálogo
 
     # ============================================================
     # PROCESAMIENTO POR PÁGINA
     # ============================================================
-    for page in pages:
-        logger.info(f"Procesando página: {page}")
-
-        img_path = os.path.join(pages_dir, page)
-
-        # --------------------------------------------------------
-        # 1 — PREPROCESAMIENTO
-        # --------------------------------------------------------
-        img, gray, norm = pre.process(img_path)
-
-        # --------------------------------------------------------
-        # 2 — DETECCIÓN DE LAYOUT
-        # --------------------------------------------------------
-        blocks = layout.detect(norm)
-
-        # --------------------------------------------------------
-        # 3 — DETECCIÓN DE IMÁGENES + CROP
-        # --------------------------------------------------------
-        image_blocks = imgdet.detect_images(norm)
-        images = cropper.crop_blocks(img, image_blocks, page)
-
-        # --------------------------------------------------------
-        # 4 — SEGMENTACIÓN DE PRODUCTOS
-        # --------------------------------------------------------
-        rows = segmenter.segment_products(blocks)
-        productos_detectados = []
-
-        for fila in rows:
-
-            y_pos = sum([b[1] for b in fila]) // len(fila)
-            texto_fila = ""
-
-            # OCR por cada bloque
-            for b in fila:
-                texto_fila += " " + ocr.clean_text(ocr.read_region(norm, b))
-
-            cods = post.extract_codigos(texto_fila)
-            precio = post.extract_precio(texto_fila)
-            emp = post.extract_empaque(texto_fila)
-
-            productos_detectados.append({
-                "y": y_pos,
-                "codigos": cods,
-                "descripcion": texto_fila.strip(),
-                "precio": precio,
-                "empaque": emp
-            })
-
-        # --------------------------------------------------------
-        # 5 — ASIGNAR IMÁGENES POR CERCANÍA
-        # --------------------------------------------------------
-        productos_detectados = assigner.assign(productos_detectados, images)
-
-        # --------------------------------------------------------
-        # 6 — NORMALIZACIÓN ADSI COMPLETA
-        # --------------------------------------------------------
-        productos_finales = []
-
-        for prod in productos_detectados:
-            for code in prod["codigos"]:
-
-                p = Product(
-                    codigo=code,
-                    descripcion=prod["descripcion"],
-                    precio=prod["precio"],
-                    empaque=prod["empaque"],
-                    imagen=prod["imagen"]
-                )
-
-                # 🔵 Normalización ADSI
-                p.color = normalizer.detect_color(p.descripcion)
-                p.modelo_moto = normalizer.detect_moto(p.descripcion)
-                p.familia = normalizer.detect_familia(p.descripcion)
-                p.subfamilia = normalizer.detect_subfamilia(p.descripcion)
-                p.descripcion_tecnica, p.descripcion_marketing = \
-                    normalizer.split_description(p.descripcion)
-
-                productos_finales.append(p)
-
-        # --------------------------------------------------------
-        # 7 — VARIANTES PADRE-HIJO
-        # --------------------------------------------------------
-        productos_finales = variant_builder.assign_variants(productos_finales)
+    if workers > 1:
+        logger.info(f"Modo paralelo: {len(todo)} páginas en {workers} procesos")
+        results = _iter_pages_parallel(pages_dir, todo, workers, ocr_mode, cache_path)
+    else:
+        results = _iter_pages_serial(pages_dir, todo, ocr_mode, cache_path)
 
+    for page, productos_finales in results:
         logger.info(f"Productos procesados en {page}: {len(productos_finales)}")
+        _save_page_result(manifest, pages_dir, page, productos_finales)
+        by_page[page] = productos_finales
+    manifest.save()
 
-        all_products.extend(productos_finales)
+    for page in pages:
+        all_products.extend(by_page[page])
 
     # ============================================================
     # 8 — VALIDACIÓN + LIMPIEZA (FASE 6)
@@ -169,4 +295,17 @@ def run_extractor():
 
 
 if __name__ == "__main__":
-    run_extractor()
+    ap = argparse.ArgumentParser(description="EXTRACTOR_V4 — pipeline de catálogo por páginas")
+    ap.add_argument("--pages-dir", default=PAGES_DIR, help="Carpeta con las páginas .png")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Procesos para las fases por página (1 = secuencial, 0 = todos los núcleos)")
+    ap.add_argument("--ocr-mode", choices=["page", "region"], default="page",
+                    help="page = un OCR por página con reparto por bloque; region = un OCR por bloque")
+    ap.add_argument("--cache", default=CACHE_PATH,
+                    help="SQLite de caché de OCR/detección por contenido de página")
+    ap.add_argument("--no-cache", action="store_true", help="No consultar ni escribir la caché")
+    ap.add_argument("--full", action="store_true",
+                    help="Reprocesar todas las páginas aunque el manifiesto diga que no cambiaron")
+    args = ap.parse_args()
+    run_extractor(args.pages_dir, args.workers, args.ocr_mode,
+                  None if args.no_cache else args.cache, incremental=not args.full)
@@ -1,43 +1,75 @@
 import os
 import base64
+import threading
 from openai import OpenAI
 
 
 class LLMClient:
-    def __init__(self):
+    def __init__(self, model="gpt-4o-mini", gateway=None):
+        """
+        gateway: LLMGateway opcional (caché con TTL, coalescencia y métricas).
+        """
+        self.model = model
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("ERROR: Falta la variable de entorno OPENAI_API_KEY")
 
-        self.client = OpenAI(api_key=api_key)
+        # OPENAI_BASE_URL (si existe) permite apuntar a un servidor local de pruebas
+        self.client = OpenAI(api_key=api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
+        self._local = threading.local()
+        self.gateway = gateway
+        if gateway is not None and gateway.client is None:
+            gateway.client = self.client
 
-    def ask_vision(self, prompt, image_b64):
+    def last_headers(self):
+        """
+        Cabeceras HTTP de la última respuesta recibida en este hilo
+        (x-ratelimit-*, para el despachador asíncrono).
+        """
+        if self.gateway is not None:
+            return self.gateway.last_headers()
+        return getattr(self._local, "headers", None)
+
+    def ask_vision(self, prompt, image_b64, mime="image/png", validate=None):
+        """
+        validate: parser de la respuesta; con gateway, solo se cachean las
+        respuestas que acepta (ver LLMGateway.chat).
+        """
 
         # Formato correcto para OpenAI Vision (enero 2025)
         image_payload = {
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/png;base64,{image_b64}"
+                "url": f"data:{mime};base64,{image_b64}"
             }
         }
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres un experto en extracción estructurada de catálogos comerciales y técnicos."
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        image_payload
-                    ]
-                }
-            ],
+        messages = [
+            {
+                "role": "system",
+                "content": "Eres un experto en extracción estructurada de catálogos comerciales y técnicos."
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    image_payload
+                ]
+            }
+        ]
+
+        if self.gateway is not None:
+            return self.gateway.chat(messages, model=self.model, caller="LLMClient.ask_vision",
+                                     validate=validate, temperature=0)
+
+        raw = self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=messages,
             temperature=0
         )
 
+        self._local.headers = dict(raw.headers)
+        response = raw.parse()
+
         # ESTA ES LA FORMA CORRECTA (2025):
         return response.choices[0].message.content
@@ -2,32 +2,144 @@ import pytesseract
 import cv2
 import numpy as np
 
+from modules.bbox_utils import GridIndex, area, center
+from modules.result_cache import version_of
+
 class OCRReader:
 
-    def __init__(self, lang="spa"):
+    CACHE_VERSION = "1"
+    REGION_CONFIG = "--psm 6 --oem 3"
+    PAGE_CONFIG = "--psm 3 --oem 3"
+
+    def __init__(self, lang="spa", min_conf=60.0, cache=None):
         self.lang = lang
+        self.cache = cache
+        # Confianza media mínima (0–100) para aceptar el texto de un bloque
+        # en modo página; por debajo se relee el bloque con read_region.
+        self.min_conf = min_conf
+        self.fallbacks = 0
+
+    def _prepare(self, crop):
+        # Limpieza OCR
+        crop = cv2.GaussianBlur(crop, (3, 3), 0)
+        return cv2.threshold(crop, 0, 255,
+                             cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+    def _cache_key(self, img, region):
+        return self.cache.make_key(self.cache.hash_array(img), region,
+                                   self.lang, version_of(self))
 
     def read_region(self, img, bbox):
         """
         Extrae texto de una región determinada.
         bbox = (x, y, w, h)
         """
-        x, y, w, h = bbox
-        crop = img[y:y+h, x:x+w]
+        if self.cache is None:
+            return self._read_region(img, bbox)
+        key = self._cache_key(img, [list(bbox), self.REGION_CONFIG])
+        return self.cache.get_or_compute("ocr_region", key, lambda: self._read_region(img, bbox))
 
-        # Limpieza OCR
-        crop = cv2.GaussianBlur(crop, (3, 3), 0)
-        crop = cv2.threshold(crop, 0, 255,
-                             cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    def _read_region(self, img, bbox):
+        x, y, w, h = bbox
+        crop = self._prepare(img[y:y+h, x:x+w])
 
         text = pytesseract.image_to_string(
             crop,
             lang=self.lang,
-            config="--psm 6 --oem 3"
+            config=self.REGION_CONFIG
         )
 
         return text.strip()
 
+    # --------------------------------------------------------
+    # OCR de página completa (una sola llamada a Tesseract)
+    # --------------------------------------------------------
+    def read_page_words(self, img):
+        """
+        Ejecuta image_to_data sobre la página completa.
+        Devuelve palabras: {text, bbox, conf, order}; `order` es el orden
+        de lectura de Tesseract (bloque, párrafo, línea, palabra).
+        """
+        if self.cache is None:
+            return self._read_page_words(img)
+        key = self._cache_key(img, ["page", self.PAGE_CONFIG])
+        return self.cache.get_or_compute("ocr_page", key, lambda: self._read_page_words(img))
+
+    def _read_page_words(self, img):
+        data = pytesseract.image_to_data(
+            self._prepare(img),
+            lang=self.lang,
+            config=self.PAGE_CONFIG,
+            output_type=pytesseract.Output.DICT
+        )
+
+        words = []
+        for i, text in enumerate(data["text"]):
+            text = (text or "").strip()
+            if not text:
+                continue
+            try:
+                conf = float(data["conf"][i])
+            except (TypeError, ValueError):
+                conf = -1.0
+            words.append({
+                "text": text,
+                "bbox": (data["left"][i], data["top"][i],
+                         data["width"][i], data["height"][i]),
+                "conf": conf,
+                "order": (data["block_num"][i], data["par_num"][i],
+                          data["line_num"][i], data["word_num"][i]),
+            })
+        return words
+
+    def map_words_to_blocks(self, words, blocks):
+        """
+        Asigna cada palabra al bloque más pequeño que contiene su centro.
+        Devuelve una lista paralela a `blocks`: (texto, confianza media | None).
+        """
+        index = GridIndex.from_boxes(blocks)
+        assigned = [[] for _ in blocks]
+
+        for w in words:
+            hits = index.query_point(*center(w["bbox"]))
+            if not hits:
+                continue
+            best = min(hits, key=lambda i: area(blocks[i]))
+            assigned[best].append(w)
+
+        out = []
+        for ws in assigned:
+            if not ws:
+                out.append(("", None))
+                continue
+            ws.sort(key=lambda w: w["order"])
+            confs = [w["conf"] for w in ws if w["conf"] >= 0]
+            mean = sum(confs) / len(confs) if confs else None
+            out.append((" ".join(w["text"] for w in ws), mean))
+        return out
+
+    def read_blocks(self, img, blocks):
+        """
+        Texto de cada bloque con un único OCR de página. Los bloques sin
+        palabras o con confianza media < min_conf se releen por región.
+        Devuelve {bbox: texto}.
+        """
+        blocks = [tuple(b) for b in blocks]
+        if not blocks:
+            return {}
+
+        mapped = self.map_words_to_blocks(self.read_page_words(img), blocks)
+
+        texts = {}
+        for b, (text, conf) in zip(blocks, mapped):
+            if b in texts:
+                continue
+            if not text or conf is None or conf < self.min_conf:
+                self.fallbacks += 1
+                text = self.read_region(img, b)
+            texts[b] = text
+        return texts
+
     def clean_text(self, text):
         """
         Normaliza texto: rompe saltos, remove basura.
@@ -0,0 +1,93 @@
+import cv2
+
+
+class Page:
+    """
+    Página decodificada una sola vez y compartida por todos los detectores.
+
+    Planos derivados calculados bajo demanda y cacheados:
+        - bgr      : imagen original (cv2.imread)
+        - rgb      : para LayoutParser
+        - gray     : escala de grises
+        - blur(k)  : GaussianBlur kxk sobre gray
+        - edges(lo, hi, k)           : Canny sobre blur(k)
+        - adaptive_inv(method, b, c) : umbral adaptativo invertido sobre gray
+        - otsu_inv                   : binario Otsu invertido sobre gray
+
+    Los detectores aceptan una ruta o un Page (Page.of normaliza), así el
+    mismo objeto recorre OpenCV, LayoutParser, Fallback y CellExtractor.
+    """
+
+    def __init__(self, path, image=None):
+        self.path = path
+        self.name = None if path is None else path.replace("\\", "/").rsplit("/", 1)[-1]
+        self._bgr = image
+        self._loaded = image is not None
+        self._planes = {}
+
+    @classmethod
+    def of(cls, source):
+        return source if isinstance(source, Page) else cls(source)
+
+    # --------------------------------------------------------
+    # Imagen base
+    # --------------------------------------------------------
+    @property
+    def bgr(self):
+        if not self._loaded:
+            self._bgr = cv2.imread(self.path)
+            self._loaded = True
+        return self._bgr
+
+    @property
+    def ok(self):
+        return self.bgr is not None
+
+    @property
+    def shape(self):
+        return None if self.bgr is None else self.bgr.shape
+
+    def _plane(self, key, fn):
+        if key not in self._planes:
+            self._planes[key] = fn()
+        return self._planes[key]
+
+    # --------------------------------------------------------
+    # Planos derivados
+    # --------------------------------------------------------
+    @property
+    def rgb(self):
+        return self._plane("rgb", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+
+    @property
+    def gray(self):
+        return self._plane("gray", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    def blur(self, k=5):
+        return self._plane(("blur", k), lambda: cv2.GaussianBlur(self.gray, (k, k), 0))
+
+    def edges(self, lo=50, hi=150, k=5):
+        return self._plane(("edges", lo, hi, k), lambda: cv2.Canny(self.blur(k), lo, hi))
+
+    def adaptive_inv(self, method=cv2.ADAPTIVE_THRESH_MEAN_C, block=15, c=8):
+        return self._plane(
+            ("adaptive_inv", method, block, c),
+            lambda: cv2.adaptiveThreshold(self.gray, 255, method,
+                                          cv2.THRESH_BINARY_INV, block, c)
+        )
+
+    @property
+    def otsu_inv(self):
+        return self._plane(
+            "otsu_inv",
+            lambda: cv2.threshold(self.gray, 0, 255,
+                                  cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+        )
+
+    def release(self):
+        """
+        Libera imagen y planos (la página puede volver a cargarse si se pide).
+        """
+        self._bgr = None
+        self._loaded = False
+        self._planes.clear()
@@ -1,6 +1,8 @@
 import os
 import json
 
+from modules.page_image import Page
+
 
 class PageProcessor:
     """
@@ -11,10 +13,19 @@ class PageProcessor:
         4. Producción de datos listos para LLM Vision
     """
 
-    def __init__(self, page_segmenter, cell_extractor, output_dir="output/segments"):
+    def __init__(self, page_segmenter, cell_extractor, output_dir="output/segments",
+                 batch_size=1, manifest=None):
+        """
+        batch_size > 1: las páginas se segmentan por lotes (process_batch),
+        así LayoutParser corre una vez por lote con el modelo ya cargado.
+        manifest: ExtractionManifest; process_all solo reprocesa páginas
+        nuevas o modificadas y reutiliza el JSON/recortes del resto.
+        """
         self.segmenter = page_segmenter
         self.cell_extractor = cell_extractor
         self.output_dir = output_dir
+        self.batch_size = max(1, int(batch_size))
+        self.manifest = manifest
 
         os.makedirs(self.output_dir, exist_ok=True)
 
@@ -23,45 +34,109 @@ class PageProcessor:
     # ---------------------------------------------------------
     def process_page(self, image_path, page_index):
         page_name = os.path.basename(image_path)
-        json_name = page_name.replace(".png", "").replace(".jpg", "") + ".json"
-        json_path = os.path.join(self.output_dir, json_name)
 
         print(f"[PAGE] Segmentando → {page_name}")
 
+        # Una sola decodificación para detectores y recortes
+        page = Page(image_path)
+
         # 1) Segmentación: detectores + selector + grid
-        seg = self.segmenter.process_page(image_path)
+        seg = self.segmenter.process_page(page)
+
+        return self._emit(page, seg)
+
+    # ---------------------------------------------------------
+    # Procesar un lote de páginas
+    # ---------------------------------------------------------
+    def process_batch(self, image_paths):
+        print(f"[PAGE] Segmentando lote → {', '.join(os.path.basename(p) for p in image_paths)}")
+
+        pages = [Page(p) for p in image_paths]
+        segs = self.segmenter.process_batch(pages)
+
+        return [self._emit(page, seg) for page, seg in zip(pages, segs)]
+
+    # ---------------------------------------------------------
+    # Recortes + JSON de una página ya segmentada
+    # ---------------------------------------------------------
+    def _emit(self, page, seg):
+        page_name = os.path.basename(page.path)
+        json_name = page_name.replace(".png", "").replace(".jpg", "") + ".json"
+        json_path = os.path.join(self.output_dir, json_name)
 
         # 2) Recorte de celdas en output/cells
         cells_dir = os.path.join(self.output_dir, "..", "cells")
         extracted_files = self.cell_extractor.extract_cells(
-            image_path,
+            page,
             seg["cells"],
             cells_dir
         )
+        page.release()
 
         # 3) Guardar JSON de salida por página
         for i, c in enumerate(seg["cells"]):
             if i < len(extracted_files):
                 c["file"] = extracted_files[i]
 
+        # Los arrays en memoria (CropWriter keep_in_memory) no van al JSON
+        serializable = dict(seg, cells=[{k: v for k, v in c.items() if k != "array"}
+                                        for c in seg["cells"]])
         with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(seg, f, indent=4)
+            json.dump(serializable, f, indent=4)
+
+        if self.manifest is not None:
+            self.manifest.record(page.path, [json_path] + list(extracted_files))
 
         return seg
 
+    def _load_previous(self, image_path):
+        """
+        Resultado de una corrida anterior (JSON de la página) o None.
+        """
+        for out in self.manifest.outputs(image_path):
+            if out.endswith(".json"):
+                try:
+                    with open(out, "r", encoding="utf-8") as f:
+                        return json.load(f)
+                except (OSError, ValueError):
+                    return None
+        return None
+
     # ---------------------------------------------------------
     # Procesar todas las páginas de un directorio
     # ---------------------------------------------------------
     def process_all(self, pages_dir):
-        pages = sorted(os.listdir(pages_dir))
-        results = []
+        pages = [os.path.join(pages_dir, fname) for fname in sorted(os.listdir(pages_dir))
+                 if fname.lower().endswith((".png", ".jpg", ".jpeg"))]
+        by_path = {}
+        index_of = {p: i for i, p in enumerate(pages)}
+
+        # Páginas sin cambios desde la última corrida: reutilizar su JSON
+        todo = pages
+        if self.manifest is not None:
+            todo = []
+            for p in pages:
+                prev = self._load_previous(p) if self.manifest.is_fresh(p) else None
+                if prev is None:
+                    todo.append(p)
+                else:
+                    self.manifest.reused += 1
+                    by_path[p] = prev
+            print(f"[PAGE] {len(pages) - len(todo)} páginas sin cambios, {len(todo)} por procesar")
+
+        if self.batch_size > 1 and hasattr(self.segmenter, "process_batch"):
+            for start in range(0, len(todo), self.batch_size):
+                batch = todo[start:start + self.batch_size]
+                by_path.update(zip(batch, self.process_batch(batch)))
+        else:
+            for full_path in todo:
+                by_path[full_path] = self.process_page(full_path, index_of[full_path])
 
-        for idx, fname in enumerate(pages):
-            if not fname.lower().endswith((".png", ".jpg", ".jpeg")):
-                continue
+        # Esperar a que terminen las escrituras de recortes en segundo plano
+        if hasattr(self.cell_extractor, "flush"):
+            self.cell_extractor.flush()
 
-            full_path = os.path.join(pages_dir, fname)
-            result = self.process_page(full_path, idx)
-            results.append(result)
+        if self.manifest is not None:
+            self.manifest.save()
 
-        return results
+        return [by_path[p] for p in pages]
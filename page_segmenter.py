@@ -1,6 +1,12 @@
 import os
 import cv2
 import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.page_image import Page
+from modules.result_cache import version_of
 
 
 class PageSegmenter:
@@ -12,31 +18,262 @@ class PageSegmenter:
         - Selección inteligente del modo
         - Reconstrucción de la cuadrícula con GridBuilder
         - Salida ordenada lista para recortes y LLM
+        - Caché opcional (ResultCache) de los resultados de cada detector,
+          por hash del archivo de página + versión del detector
+        - Planificación de detectores (schedule):
+            "sequential" → CV, LP y Fallback siempre, uno tras otro
+            "adaptive"   → CV + Fallback primero; LayoutParser solo si el
+                           selector no elegiría CV igualmente. Si las páginas
+                           recientes las ganó LP, se lanza LP en paralelo
+                           desde el inicio en lugar de esperar a CV.
+        - Registro por página del detector ganador (records / records_path)
+        - process_batch: LayoutParser una vez por lote de páginas
     """
 
+    SCHEDULES = ("sequential", "adaptive")
+
     def __init__(self, cv_detector, lp_detector, fallback_detector,
-                 grid_builder, selector):
+                 grid_builder, selector, cache=None, schedule="adaptive",
+                 history=20, cv_first_ratio=0.6, records_path=None):
+        """
+        history        : páginas recientes consideradas para decidir el plan
+        cv_first_ratio : fracción mínima de páginas recientes donde LP no hizo
+                         falta (select_mode "cv_table" o "blocks") para usar
+                         "CV primero"; por debajo LP arranca en paralelo
+        records_path   : JSONL donde anexar un registro por página (opcional)
+        """
+        if schedule not in self.SCHEDULES:
+            raise ValueError(f"schedule inválido: {schedule}")
         self.cv_detector = cv_detector
         self.lp_detector = lp_detector
         self.fallback_detector = fallback_detector
         self.grid_builder = grid_builder
         self.selector = selector
+        self.cache = cache
+        self.schedule = schedule
+        self.cv_first_ratio = cv_first_ratio
+        self.records_path = records_path
+        self.records = []
+        self.recent_winners = deque(maxlen=history)
+        self._pool = None
+
+        if records_path and os.path.exists(records_path):
+            self._load_history(records_path)
+
+    def _load_history(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    winner = json.loads(line)["winner"]
+                except (ValueError, KeyError):
+                    continue
+                # Registros antiguos guardaban el modo de select() ("cv", "lp")
+                self.recent_winners.append(self.LEGACY_WINNERS.get(winner, winner))
+
+    # --------------------------------------------------------
+    # Ejecutar un detector (consultando la caché)
+    # --------------------------------------------------------
+    def _run_detector(self, kind, detector, method, page, page_hash):
+        fn = getattr(detector, method)
+        # Un detector deshabilitado (p. ej. LayoutParser sin modelo) no se cachea
+        if self.cache is None:
+            return fn(page)
+        key = self.cache.make_key(page_hash, version_of(detector), method)
+        value = self.cache.get(kind, key)
+        if value is None:
+            value = fn(page)
+            if getattr(detector, "enabled", True):
+                self.cache.put(kind, key, value)
+        return value
+
+    def _run_lp_batch(self, pages, hashes, timings):
+        """
+        LayoutParser sobre varias páginas en una sola llamada al detector
+        (detect_tables_batch si existe). Consulta la caché página a página.
+        """
+        kind, method = "tables_lp", "detect_tables"
+        results = [None] * len(pages)
+        keys = [None] * len(pages)
+        todo = []
+        for i, page in enumerate(pages):
+            if self.cache is not None:
+                keys[i] = self.cache.make_key(hashes[i], version_of(self.lp_detector), method)
+                results[i] = self.cache.get(kind, keys[i])
+            if results[i] is None:
+                todo.append(i)
+
+        if todo:
+            t0 = time.perf_counter()
+            batch_fn = getattr(self.lp_detector, "detect_tables_batch", None)
+            if batch_fn is not None:
+                fresh = batch_fn([pages[i] for i in todo])
+            else:
+                fresh = [self.lp_detector.detect_tables(pages[i]) for i in todo]
+            per_page = round((time.perf_counter() - t0) * 1000.0 / len(todo), 1)
+            cacheable = self.cache is not None and getattr(self.lp_detector, "enabled", True)
+            for i, res in zip(todo, fresh):
+                results[i] = res
+                timings[i]["lp"] = per_page
+                if cacheable:
+                    self.cache.put(kind, keys[i], res)
+        return results
+
+    # --------------------------------------------------------
+    # Planificación de detectores
+    # --------------------------------------------------------
+    def _lp_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    # Modos de TableOrBlockSelector.select_mode que se deciden sin mirar a
+    # LP; "unknown" (que select() convierte en bloques) no cuenta
+    LP_NOT_NEEDED = ("cv_table", "blocks")
+    LEGACY_WINNERS = {"cv": "cv_table", "lp": "lp_table"}
+
+    def cv_first(self):
+        """
+        True si en el historial reciente LP casi nunca hizo falta (o aún no
+        hay historial).
+        """
+        if not self.recent_winners:
+            return True
+        no_lp = sum(1 for w in self.recent_winners if w in self.LP_NOT_NEEDED)
+        return no_lp / len(self.recent_winners) >= self.cv_first_ratio
+
+    def _cv_decides(self, cv_res, fb_res):
+        """
+        Mismo criterio que TableOrBlockSelector.select_mode: con tabla CV
+        ("cv_table") o mosaico ("blocks") el resultado de LP no cambia la
+        selección.
+        """
+        return (self.selector.is_probably_table_cv(cv_res.get("cells", []))
+                or self.selector.is_mosaic(fb_res.get("blocks", [])))
+
+    def _run_all(self, page, page_hash, timings):
+        def timed(name, kind, detector, method):
+            t0 = time.perf_counter()
+            res = self._run_detector(kind, detector, method, page, page_hash)
+            timings[name] = round((time.perf_counter() - t0) * 1000.0, 1)
+            return res
+
+        def run_lp():
+            return timed("lp", "tables_lp", self.lp_detector, "detect_tables")
+
+        if self.schedule == "sequential":
+            cv_res = timed("cv", "tables_cv", self.cv_detector, "detect_tables")
+            lp_res = run_lp()
+            fb_res = timed("fb", "blocks_fb", self.fallback_detector, "detect")
+            return cv_res, lp_res, fb_res, "sequential", False
+
+        if not self.cv_first():
+            # LP probablemente necesario: arrancarlo ya, en paralelo con CV + FB
+            page.bgr  # decodificar antes de compartir la página entre hilos
+            lp_future = self._lp_pool().submit(run_lp)
+            cv_res = timed("cv", "tables_cv", self.cv_detector, "detect_tables")
+            fb_res = timed("fb", "blocks_fb", self.fallback_detector, "detect")
+            return cv_res, lp_future.result(), fb_res, "concurrent", False
+
+        cv_res = timed("cv", "tables_cv", self.cv_detector, "detect_tables")
+        fb_res = timed("fb", "blocks_fb", self.fallback_detector, "detect")
+        if self._cv_decides(cv_res, fb_res):
+            return cv_res, {"tables": [], "cells": []}, fb_res, "cv_first", True
+        return cv_res, run_lp(), fb_res, "cv_first", False
+
+    def _record(self, page_name, winner, schedule, lp_skipped, timings):
+        """
+        winner: resultado de selector.select_mode (cv_table, lp_table,
+        blocks, hybrid, unknown), no el modo ya traducido por select().
+        """
+        rec = {
+            "page": page_name,
+            "winner": winner,
+            "schedule": schedule,
+            "lp_skipped": lp_skipped,
+            "ms": timings,
+        }
+        self.records.append(rec)
+        self.recent_winners.append(winner)
+        if self.records_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.records_path)), exist_ok=True)
+            with open(self.records_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
 
     # --------------------------------------------------------
     # Procesar una sola página
     # --------------------------------------------------------
     def process_page(self, image_path, output_json=None):
-        page_name = os.path.basename(image_path)
+        """
+        image_path: ruta de la página o Page. La imagen se decodifica una sola
+        vez y los tres detectores comparten sus planos (gris, blur, bordes...).
+        """
+        page = Page.of(image_path)
+        page_name = os.path.basename(page.path)
+
+        # 1 — Ejecutar detectores (según schedule)
+        page_hash = self.cache.hash_file(page.path) if self.cache is not None else None
+        timings = {}
+        cv_res, lp_res, fb_res, schedule, lp_skipped = self._run_all(page, page_hash, timings)
+
+        return self._finish(page_name, cv_res, lp_res, fb_res, schedule, lp_skipped,
+                            timings, output_json)
+
+    # --------------------------------------------------------
+    # Procesar un lote de páginas (LayoutParser por lotes)
+    # --------------------------------------------------------
+    def process_batch(self, sources, output_jsons=None):
+        """
+        Igual que process_page sobre varias páginas, pero LayoutParser corre
+        una sola vez para todas las páginas del lote que lo necesiten:
+        con schedule "adaptive" se omite en las páginas que CV ya decide.
+        """
+        pages = [Page.of(s) for s in sources]
+        output_jsons = output_jsons or [None] * len(pages)
+        hashes = [self.cache.hash_file(p.path) if self.cache is not None else None
+                  for p in pages]
+        timings = [{} for _ in pages]
+
+        cv_list, fb_list = [], []
+        for page, page_hash, tm in zip(pages, hashes, timings):
+            t0 = time.perf_counter()
+            cv_list.append(self._run_detector("tables_cv", self.cv_detector, "detect_tables", page, page_hash))
+            t1 = time.perf_counter()
+            fb_list.append(self._run_detector("blocks_fb", self.fallback_detector, "detect", page, page_hash))
+            tm["cv"] = round((t1 - t0) * 1000.0, 1)
+            tm["fb"] = round((time.perf_counter() - t1) * 1000.0, 1)
+
+        if self.schedule == "sequential":
+            need = list(range(len(pages)))
+        else:
+            need = [i for i in range(len(pages)) if not self._cv_decides(cv_list[i], fb_list[i])]
+
+        lp_list = [{"tables": [], "cells": []} for _ in pages]
+        lp_res = self._run_lp_batch([pages[i] for i in need], [hashes[i] for i in need],
+                                    [timings[i] for i in need])
+        for i, res in zip(need, lp_res):
+            lp_list[i] = res
 
-        # 1 — Ejecutar detectores
-        cv_res = self.cv_detector.detect_tables(image_path)
-        lp_res = self.lp_detector.detect_tables(image_path)
-        fb_res = self.fallback_detector.detect(image_path)
+        schedule = "sequential" if self.schedule == "sequential" else "batch"
+        need_set = set(need)
+        return [
+            self._finish(os.path.basename(pages[i].path), cv_list[i], lp_list[i], fb_list[i],
+                         schedule, i not in need_set, timings[i], output_jsons[i])
+            for i in range(len(pages))
+        ]
 
+    def _finish(self, page_name, cv_res, lp_res, fb_res, schedule, lp_skipped,
+                timings, output_json):
         # 2 — Seleccionar modo
         selection = self.selector.select(cv_res, lp_res, fb_res)
         mode = selection["mode"]
         raw_cells = selection["cells"]
+        winner = self.selector.select_mode(cv_res, lp_res, fb_res)
+        self._record(page_name, winner, schedule, lp_skipped, timings)
 
         # 3 — Construir la cuadrícula final
         grid = self.grid_builder.build(raw_cells)
@@ -58,22 +295,28 @@ class PageSegmenter:
     # --------------------------------------------------------
     # Procesar todas las páginas de un directorio
     # --------------------------------------------------------
-    def process_all(self, pages_dir, output_dir="output/segments"):
+    def process_all(self, pages_dir, output_dir="output/segments", batch_size=1):
         os.makedirs(output_dir, exist_ok=True)
 
-        pages = sorted(os.listdir(pages_dir))
+        pages = [p for p in sorted(os.listdir(pages_dir))
+                 if p.lower().endswith((".png", ".jpg", ".jpeg"))]
         results = []
 
-        for p in pages:
-            if not p.lower().endswith((".png", ".jpg", ".jpeg")):
-                continue
+        for start in range(0, len(pages), max(1, batch_size)):
+            batch = pages[start:start + max(1, batch_size)]
+            image_paths = [os.path.join(pages_dir, p) for p in batch]
+            json_paths = [os.path.join(output_dir, f"{os.path.splitext(p)[0]}.json") for p in batch]
 
-            image_path = os.path.join(pages_dir, p)
-            json_path = os.path.join(output_dir, f"{os.path.splitext(p)[0]}.json")
+            print(f"[PAGE] Segmentando {', '.join(batch)} ...")
 
-            print(f"[PAGE] Segmentando {p} ...")
+            if len(batch) == 1:
+                results.append(self.process_page(image_paths[0], json_paths[0]))
+            else:
+                results.extend(self.process_batch(image_paths, json_paths))
 
-            res = self.process_page(image_path, json_path)
-            results.append(res)
+        self.close()
+        skipped = sum(1 for r in self.records if r["lp_skipped"])
+        if self.records:
+            print(f"[PAGE] LayoutParser omitido en {skipped}/{len(self.records)} páginas")
 
         return results
@@ -1,23 +1,26 @@
-import base64
-import json
+from modules.json_stream import parse_llm_json
 from modules.modelo_llm import LLMClient
+from modules.vision_image import encode_for_vision
 from modules.normalizer import ADSINormalizer
 
 
 class LLMParser:
-    def __init__(self):
-        self.llm = LLMClient()
+    def __init__(self, cache=None, gateway=None):
+        self.llm = LLMClient(gateway=gateway)
         self.norm = ADSINormalizer()
+        # VisionCache opcional: se guarda la respuesta cruda del modelo, así
+        # los cambios del normalizador aplican también a los aciertos
+        self.cache = cache
 
     def _encode_image(self, img_path):
-        with open(img_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
+        # Reducida y recodificada para lectura de texto → (b64, mime)
+        return encode_for_vision(img_path, task="extract")
 
     def parse_row(self, img_path):
         """
         Envía una fila recortada a OpenAI Vision y obtiene JSON estructurado.
         """
-        img_b64 = self._encode_image(img_path)
+        img_b64, mime = self._encode_image(img_path)
 
         prompt = """
 Extrae de esta imagen un JSON limpio con la siguiente estructura:
@@ -41,12 +44,17 @@ Reglas:
 - "fotos": lista que incluya SOLO el nombre de la imagen recortada.
 """
 
-        raw = self.llm.ask_vision(prompt, img_b64)
+        sha = self.cache.hash_file(img_path) if self.cache is not None else None
+        cached = self.cache.get(sha, prompt, self.llm.model) if sha else None
+        raw = cached if cached is not None else self.llm.ask_vision(prompt, img_b64, mime,
+                                                                    validate=parse_llm_json)
 
-        # Validar JSON
-        try:
-            data = json.loads(raw)
-        except:
+        # Validar JSON (con ```json, prosa alrededor o truncado se repara)
+        data = parse_llm_json(raw)
+        if data is None:
             data = {"error": "JSON inválido", "raw": raw}
+        elif cached is None and sha:
+            # Solo se cachea una respuesta que se pudo interpretar
+            self.cache.put(sha, prompt, self.llm.model, raw)
 
         return self.norm.normalize(data)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+pdf_pages.py
+Fuente de páginas en streaming para los extractores PDF.
+
+Proporciona:
+- pdf_page_count(path)                                -> número de páginas (pdfinfo)
+- iter_pdf_pages(path, dpi, window, workers, ...)     -> genera (n_pagina, PIL.Image) de una en una
+
+Diseño:
+- convert_from_path(first_page, last_page) rasteriza solo una ventana de
+  `window` páginas cada vez; nunca se carga el PDF completo en memoria.
+- workers > 0 adelanta ventanas en hilos (pdftoppm corre en subprocesos,
+  así que los hilos bastan). Como máximo hay `workers` ventanas en vuelo,
+  por lo que la memoria queda acotada a ~ (workers + 1) * window páginas.
+- Las páginas se entregan siempre en orden; el consumidor debe cerrar
+  (img.close()) o soltar cada imagen al terminar con ella.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+
+def pdf_page_count(path, poppler_path=None):
+    info = pdfinfo_from_path(path, poppler_path=poppler_path)
+    return int(info.get("Pages", 0))
+
+
+def _render_window(path, first, last, dpi, fmt, poppler_path):
+    return convert_from_path(path, dpi=dpi, first_page=first, last_page=last,
+                             fmt=fmt, poppler_path=poppler_path)
+
+
+def iter_pdf_pages(path, dpi=200, window=4, workers=0, first_page=1, last_page=None,
+                   fmt="ppm", poppler_path=None):
+    """
+    Genera (n_pagina, imagen) para cada página del PDF, en orden.
+      window  : páginas rasterizadas por llamada a pdftoppm
+      workers : 0 = secuencial; N = hasta N ventanas rasterizándose por adelantado
+    """
+    total = pdf_page_count(path, poppler_path)
+    last = min(last_page or total, total)
+    window = max(1, int(window))
+    spans = [(a, min(a + window - 1, last)) for a in range(max(1, first_page), last + 1, window)]
+
+    if workers <= 0:
+        for a, b in spans:
+            for i, img in enumerate(_render_window(path, a, b, dpi, fmt, poppler_path)):
+                yield a + i, img
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        todo = iter(spans)
+
+        def _submit_next():
+            span = next(todo, None)
+            if span is not None:
+                pending.append((span[0], ex.submit(_render_window, path, span[0], span[1],
+                                                   dpi, fmt, poppler_path)))
+
+        for _ in range(workers):
+            _submit_next()
+
+        while pending:
+            a, fut = pending.popleft()
+            imgs = fut.result()
+            _submit_next()
+            for i, img in enumerate(imgs):
+                yield a + i, img
+            del imgs
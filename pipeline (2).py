@@ -1,45 +1,65 @@
 import os
 import json
-import time
+from modules.llm_gateway import LLMGateway
 from modules.parser_llm import LLMParser
-from openai import RateLimitError
+from modules.vision_cache import VisionCache
+from modules.vision_dispatcher import AsyncDispatcher, TokenBucket
+from openai import APIConnectionError, APITimeoutError, RateLimitError
 
 
 class ExtractionPipeline:
-    def __init__(self):
-        self.parser = LLMParser()
-
-    def process_folder(self, folder_path):
-        productos = []
-        files = sorted(os.listdir(folder_path))
+    def __init__(self, concurrency=4, rpm=300, max_retries=5):
+        self.cache = VisionCache()
+        # Filas idénticas en vuelo se coalescen y las repetidas salen de la caché
+        self.gateway = LLMGateway(None, cache=self.cache)
+        self.parser = LLMParser(gateway=self.gateway)
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.max_retries = max_retries
+        self.stats = {}
+        self.failed = []
 
+    def process_folder(self, folder_path, checkpoint_path=None):
+        """
+        Envía los recortes al LLM Vision con `concurrency` llamadas en vuelo,
+        respetando el rate limit. Con checkpoint_path, los resultados se
+        anexan a un JSONL y una corrida interrumpida se reanuda desde ahí.
+        Los productos se devuelven en el orden de los archivos; los recortes
+        que fallaron quedan en self.failed como [(archivo, error)].
+        """
+        files = [
+            f for f in sorted(os.listdir(folder_path))
+            if f.lower().endswith((".png", ".jpg", ".jpeg"))
+        ]
+        # Clave de checkpoint = nombre + hash del contenido: si los recortes
+        # se regeneran entre corridas, no se reutiliza el resultado de otra imagen
+        items = []
         for fname in files:
-            if not fname.lower().endswith((".png", ".jpg", ".jpeg")):
-                continue
-
-            img_path = os.path.join(folder_path, fname)
-            print(f"[LLM] Procesando {fname}...")
-
-            intentos = 0
-
-            while intentos < 4:
-                try:
-                    result = self.parser.parse_row(img_path)
-                    productos.append(result)
-                    time.sleep(0.35)  # throttle preventivo
-                    break
-
-                except RateLimitError:
-                    intentos += 1
-                    wait = 0.7 * intentos
-                    print(f"[WAIT] Rate limit alcanzado. Reintentando en {wait} segundos...")
-                    time.sleep(wait)
+            path = os.path.join(folder_path, fname)
+            items.append((f"{fname}:{self.cache.hash_file(path)[:16]}", path))
+        print(f"[LLM] {len(items)} imágenes, concurrencia {self.concurrency}")
 
-                except Exception as e:
-                    print(f"[ERROR] Falló {fname}: {e}")
-                    break
+        dispatcher = AsyncDispatcher(
+            self.parser.parse_row,
+            concurrency=self.concurrency,
+            bucket=TokenBucket(rpm=self.rpm),
+            retry_on=(RateLimitError, APIConnectionError, APITimeoutError),
+            max_retries=self.max_retries,
+            checkpoint_path=checkpoint_path,
+            headers_fn=self.parser.llm.last_headers,
+        )
+        results = dispatcher.run(items)
+        self.stats = dispatcher.stats
+        self.failed = [(key.rsplit(":", 1)[0], err) for key, err in dispatcher.failed]
+        if dispatcher.stats["resumed"]:
+            print(f"[LLM] Reanudados desde checkpoint: {dispatcher.stats['resumed']}")
+        if self.failed:
+            print(f"[WARN] {len(self.failed)} recortes sin resultado: "
+                  f"{', '.join(fname for fname, _ in self.failed)}")
+        print(f"[LLM] {self.cache.summary()}")
+        print(f"[LLM] {self.gateway.summary()}")
 
-        return productos
+        return [res for ok, res in results if ok]
 
     def save_as_json(self, productos, outfile):
         with open(outfile, "w", encoding="utf-8") as f:
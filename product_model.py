@@ -35,3 +35,25 @@ class Product:
             "descripcion_tecnica": self.descripcion_tecnica,
             "descripcion_marketing": self.descripcion_marketing,
         }
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Reconstruye un Product desde to_dict() (p. ej. al volver de un worker).
+        """
+        p = cls(
+            codigo=d.get("codigo"),
+            descripcion=d.get("descripcion"),
+            precio=d.get("precio"),
+            empaque=d.get("empaque"),
+            imagen=d.get("imagen"),
+            familia=d.get("familia"),
+            subfamilia=d.get("subfamilia"),
+            padre=d.get("padre"),
+            variante=d.get("variante"),
+        )
+        p.color = d.get("color")
+        p.modelo_moto = d.get("modelo_moto")
+        p.descripcion_tecnica = d.get("descripcion_tecnica")
+        p.descripcion_marketing = d.get("descripcion_marketing")
+        return p
@@ -4,6 +4,8 @@ import re
 import pandas as pd
 from collections import defaultdict
 
+from json_stream import JsonObjectStream, iter_json_file
+
 
 # ==========================================
 # CONFIG
@@ -25,63 +27,6 @@ def normalize_text(s):
     return s
 
 
-def try_json_load(fragment):
-    try:
-        return json.loads(fragment)
-    except:
-        return None
-
-
-# ==========================================
-# 1) SEPARAR OBJETOS JSON PEGADOS
-# ==========================================
-def split_json_objects(raw):
-    """
-    Usa una estrategia ultra agresiva:
-    - Insertar saltos entre '}{'
-    - Insertar saltos entre '}\n{'
-    - Insertar saltos entre '}{\s*"'
-    """
-    temp = raw.replace("}{", "}\n{")
-    temp = temp.replace("}\n\n{", "}\n{")
-    temp = re.sub(r'\}\s*\{', '}\n{', temp)
-    return temp.split("\n")
-
-
-# ==========================================
-# 2) RECONSTRUCCIÓN: UNIFICAR FRAGMENTOS
-# ==========================================
-def reconstruct_fragments(lines):
-    """
-    Junta líneas hasta formar un JSON válido.
-    """
-    buffer = ""
-    reconstructed = []
-
-    for line in lines:
-        line = line.strip()
-        if not line: continue
-
-        # Agregar al buffer
-        buffer += " " + line
-
-        # Intentar cargar
-        obj = try_json_load(buffer.strip())
-        if obj:
-            reconstructed.append(obj)
-            buffer = ""
-
-        # Si el JSON empieza pero no termina, seguimos acumulando
-        elif buffer.count("{") > buffer.count("}"):
-            continue
-
-        # Si tiene algo que no es JSON, limpiamos
-        elif not buffer.strip().startswith("{"):
-            buffer = ""
-
-    return reconstructed
-
-
 # ==========================================
 # 3) LIMPIEZA Y NORMALIZACIÓN
 # ==========================================
@@ -138,25 +83,22 @@ def main():
     print("=== FASE 17.2 — REBUILD MODE (Reconstrucción Avanzada) ===")
     print(f"Leyendo archivo bruto: {RAW_FILE}")
 
-    raw = open(RAW_FILE, "r", encoding="utf-8", errors="ignore").read()
-
-    # 1) Separar bloques grandes
-    print("[1] Separando bloques JSON...")
-    lines = split_json_objects(raw)
-    print(f"    → {len(lines)} fragmentos detectados")
-
-    # 2) Reconstruir JSONs válidos
-    print("[2] Reconstruyendo fragmentos...")
-    objs = reconstruct_fragments(lines)
-    print(f"    → {len(objs)} objetos reconstruidos")
+    # 1-2) Separar y reconstruir objetos en streaming (objetos pegados,
+    # NDJSON o truncados), sin cargar el archivo completo
+    print("[1] Separando y reconstruyendo fragmentos JSON...")
+    stream = JsonObjectStream()
+    objs = iter_json_file(RAW_FILE, stream=stream)
 
     # 3) Limpiar / normalizar
     print("[3] Normalizando objetos...")
-    clean_objs = [normalize_obj(o) for o in objs]
+    clean_objs = (normalize_obj(o) for o in objs)
 
     # 4) Fusionar
     print("[4] Agrupando productos...")
     merged = group_products(clean_objs)
+    n_objs = stream.stats["ok"] + stream.stats["repaired"]
+    print(f"    → {n_objs} objetos reconstruidos ({stream.stats['repaired']} reparados, "
+          f"{stream.stats['dropped']} descartados)")
     print(f"    → {len(merged)} productos finales reconstruidos")
 
     # 5) Exportar JSON
@@ -171,8 +113,10 @@ def main():
     # 7) LOG
     with open(LOG_FILE, "w", encoding="utf-8") as f:
         f.write("=== REBUILD MODE LOG ===\n")
-        f.write(f"Fragmentos leídos: {len(lines)}\n")
-        f.write(f"Objetos reconstruidos: {len(objs)}\n")
+        f.write(f"Objetos válidos: {stream.stats['ok']}\n")
+        f.write(f"Objetos reparados: {stream.stats['repaired']}\n")
+        f.write(f"Fragmentos descartados: {stream.stats['dropped']}\n")
+        f.write(f"Objetos reconstruidos: {n_objs}\n")
         f.write(f"Productos finales: {len(merged)}\n")
 
     print("\n=== FASE 17.2 COMPLETADA ===")
@@ -37,7 +37,6 @@ import shutil
 import hashlib
 import asyncio
 import unicodedata
-import numpy as np
 import pandas as pd
 from PIL import Image
 from difflib import SequenceMatcher
@@ -51,6 +50,8 @@ import uvicorn
 
 # ---------------- OpenAI API ----------------
 from openai import OpenAI
+from vision_cache import VisionCache
+from vector_store import VectorStore
 
 
 # ======================================================================================
@@ -63,8 +64,12 @@ DIR_DUP = os.path.join(BASE, "IMAGENES_DUPLICADOS_v24")
 DIR_LOGS = os.path.join(BASE, "logs")
 DIR_CACHE = os.path.join(BASE, "cache")
 
-VISION_CACHE = os.path.join(DIR_CACHE, "vision_cache.json")
-EMB_CACHE = os.path.join(DIR_CACHE, "embeddings_cache.npz")
+# Caché Vision compartida entre scripts (SQLite, ver vision_cache.py)
+VISION_MODEL = "gpt-4o"
+VISION_PROMPT = "Identifica este repuesto:"
+# Matriz de embeddings de la KB persistida (ver vector_store.py)
+KB_VECTORS = os.path.join(DIR_CACHE, "kb_v24_text-embedding-3-small")
+EMB_MODEL = "text-embedding-3-small"
 
 os.makedirs(DIR_SALIDA, exist_ok=True)
 os.makedirs(DIR_DUP, exist_ok=True)
@@ -161,92 +166,82 @@ def evitar_conflicto(output_dir, filename):
 # ======================================================================================
 
 def load_vision_cache():
-    if os.path.exists(VISION_CACHE):
-        try:
-            return json.load(open(VISION_CACHE, "r", encoding="utf-8"))
-        except:
-            return {}
-    return {}
+    return VisionCache()
 
 
 def save_vision_cache(cache):
-    json.dump(cache, open(VISION_CACHE, "w", encoding="utf-8"), indent=2)
+    # Cada respuesta se guarda al recibirse; aquí solo se reporta
+    print(f"[INFO] {cache.summary()}")
+
+
+def _vision_call(full_path):
+    with open(full_path, "rb") as f:
+        b64 = base64.b64encode(f.read()).decode("utf-8")
+
+    resp = client.chat.completions.create(
+        model=VISION_MODEL,
+        messages=[
+            {"role": "system",
+             "content": "Eres experto en repuestos de motos y generas nombres comerciales técnicos sin códigos."},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": VISION_PROMPT},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}
+                ]
+            }
+        ],
+        max_tokens=60
+    )
+    return resp.choices[0].message.content.strip()
 
 
 def vision(full_path, cache):
     if client is None:
         return ""
 
-    sha = sha1_file(full_path)
-    if sha in cache:
-        return cache[sha]
-
     try:
-        with open(full_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("utf-8")
-
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system",
-                 "content": "Eres experto en repuestos de motos y generas nombres comerciales técnicos sin códigos."},
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Identifica este repuesto:"},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}
-                    ]
-                }
-            ],
-            max_tokens=60
-        )
-
-        name = resp.choices[0].message.content.strip()
-        cache[sha] = name
-        save_vision_cache(cache)
-        return name
-
+        return cache.get_or_call(full_path, VISION_PROMPT, VISION_MODEL,
+                                 lambda: _vision_call(full_path))
     except:
         return ""
 
 
-def embed_list(lista):
-    if client is None:
-        return None
-    out = []
-    batch = 200
-    for i in range(0, len(lista), batch):
-        chunk = lista[i:i+batch]
-        try:
-            res = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=chunk
-            )
-            out.extend([d.embedding for d in res.data])
-        except:
-            pass
-    return np.array(out)
+def cargar_kb_vectores(mapa):
+    """
+    VectorStore de los nombres conocidos. Los textos se ordenan para que
+    la matriz persistida coincida entre corridas; solo se embeben los
+    textos que no estén ya en la caché de embeddings.
+    """
+    textos = sorted(set(mapa.values()))
+    return VectorStore(KB_VECTORS, client, EMB_MODEL).build(textos)
+
 
+def consulta_emb(fn):
+    return limpiar(fn.lower())
 
-def resolver_emb(query, vecs, textos):
-    if client is None or vecs is None:
+
+def prefetch_emb(fns, store):
+    """
+    Una sola pasada en lote (embeddings + producto matricial) para todos
+    los archivos; resolver_emb luego sale de la memoria del store.
+    """
+    qs = [q for q in (consulta_emb(fn) for fn in fns) if len(q) >= 3]
+    if qs and len(store):
+        store.search(qs, k=1)
+
+
+def resolver_emb(query, store):
+    if store is None or not len(store):
         return ""
     q = limpiar(query)
     if len(q) < 3:
         return ""
     try:
-        e = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=[q]
-        )
-        qv = np.array(e.data[0].embedding)
-        sims = np.dot(vecs, qv) / (np.linalg.norm(vecs, axis=1) * np.linalg.norm(qv))
-        idx = int(np.argmax(sims))
-        if sims[idx] >= 0.50:
-            return textos[idx]
+        texto, _ = store.best(q, min_score=0.50)
+        return texto
     except:
         return ""
-    return ""
 
 
 # ======================================================================================
@@ -339,7 +334,7 @@ def cargar_inteligencia():
 # RESOLUCIÓN HÍBRIDA
 # ======================================================================================
 
-def resolver_nombre(fn, full, mapa, vecs, textos, vcache):
+def resolver_nombre(fn, full, mapa, store, vcache):
 
     base = fn.lower()
 
@@ -353,7 +348,7 @@ def resolver_nombre(fn, full, mapa, vecs, textos, vcache):
         return "MATCH_APROX", mapa[approx]
 
     # Embeddings
-    em = resolver_emb(base, vecs, textos)
+    em = resolver_emb(base, store)
     if em:
         return "EMBEDDING", em
 
@@ -370,7 +365,7 @@ def resolver_nombre(fn, full, mapa, vecs, textos, vcache):
 # PROCESO DE RENOMBRADO (WORKERS)
 # ======================================================================================
 
-def procesar_archivo(full_path, fn, mapa, vecs, textos, vcache, live_log=None):
+def procesar_archivo(full_path, fn, mapa, store, vcache, live_log=None):
 
     sha = sha1_file(full_path)
 
@@ -387,7 +382,7 @@ def procesar_archivo(full_path, fn, mapa, vecs, textos, vcache, live_log=None):
 
     procesar_archivo.vistos[sha] = fn
 
-    estrategia, nombre = resolver_nombre(fn, full_path, mapa, vecs, textos, vcache)
+    estrategia, nombre = resolver_nombre(fn, full_path, mapa, store, vcache)
 
     sl = slug(nombre)
     new = evitar_conflicto(DIR_SALIDA, sl + ".jpg")
@@ -475,19 +470,12 @@ async def api_rename_file(file: UploadFile):
         f.write(await file.read())
 
     mapa = cargar_inteligencia()
-    textos = list(set(mapa.values()))
-
-    vecs = None
-    if client and textos and os.path.exists(EMB_CACHE):
-        try:
-            vecs = np.load(EMB_CACHE)["vecs"]
-        except:
-            vecs = None
+    store = cargar_kb_vectores(mapa)
 
     vcache = load_vision_cache()
 
     fn, new, estrategia = procesar_archivo(
-        original_path, file.filename, mapa, vecs, textos, vcache
+        original_path, file.filename, mapa, store, vcache
     )
 
     return {"original": fn, "nuevo": new, "estrategia": estrategia}
@@ -499,20 +487,7 @@ async def api_rename_file(file: UploadFile):
 
 def run_folder(folder):
     mapa = cargar_inteligencia()
-    textos = list(set(mapa.values()))
-
-    if client and textos:
-        if os.path.exists(EMB_CACHE):
-            try:
-                vecs = np.load(EMB_CACHE)["vecs"]
-            except:
-                vecs = embed_list(textos)
-                np.savez(EMB_CACHE, vecs=vecs)
-        else:
-            vecs = embed_list(textos)
-            np.savez(EMB_CACHE, vecs=vecs)
-    else:
-        vecs = None
+    store = cargar_kb_vectores(mapa)
 
     vcache = load_vision_cache()
     tareas = []
@@ -521,9 +496,10 @@ def run_folder(folder):
     q = queue.Queue()
 
     # Dispatcher
-    for fn in os.listdir(folder):
-        if fn.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
-            q.put(fn)
+    fns = [fn for fn in os.listdir(folder) if fn.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))]
+    prefetch_emb(fns, store)
+    for fn in fns:
+        q.put(fn)
 
     def worker():
         while True:
@@ -533,7 +509,7 @@ def run_folder(folder):
                 break
 
             full = os.path.join(folder, fn)
-            res = procesar_archivo(full, fn, mapa, vecs, textos, vcache, enviar_log)
+            res = procesar_archivo(full, fn, mapa, store, vcache, enviar_log)
             resultados.append(res)
             q.task_done()
 
@@ -29,11 +29,11 @@ import io
 import json
 import hashlib
 import unicodedata
-import numpy as np
 import pandas as pd
 from PIL import Image
 from difflib import SequenceMatcher
 from openai import OpenAI
+from vector_store import VectorStore
 
 # ------------------ CONFIG -------------------
 
@@ -45,6 +45,10 @@ TAX_FILE = os.path.join(BASE, "taxonomia_srm_qk_adsi_v1.csv")
 DIR_OUT = os.path.join(BASE, "RENOMBRADAS")
 os.makedirs(DIR_OUT, exist_ok=True)
 
+# Matriz de embeddings de la KB persistida (ver vector_store.py)
+KB_VECTORS = os.path.join(BASE, "cache", "kb_v26_text-embedding-3-large")
+EMB_MODEL = "text-embedding-3-large"
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
@@ -115,36 +119,16 @@ def vision_name(img_bytes):
         return ""
 
 
-# -------------------- EMBEDDINGS --------------------
-
-def embed_single(text):
-    if not client: return None
-    text = clean_text(text)
-    if not text: return None
-
-    try:
-        resp = client.embeddings.create(
-            model="text-embedding-3-large",
-            input=[text]
-        )
-        return np.array(resp.data[0].embedding, dtype=np.float32)
-    except:
-        return None
-
-
 # ------------------ MATCH SEMÁNTICO ------------------
 
-def semantic_match(filename_base, kb_texts, kb_vecs):
-    vec_q = embed_single(filename_base)
-    if vec_q is None:
-        return "", 0.0
-
-    sims = np.dot(kb_vecs, vec_q) / (
-        np.linalg.norm(kb_vecs, axis=1) * np.linalg.norm(vec_q)
-    )
-
-    idx = int(np.argmax(sims))
-    return kb_texts[idx], float(sims[idx])
+def semantic_match_batch(bases, store):
+    """
+    Mejor texto de la KB para cada nombre de archivo: un solo lote de
+    embeddings (con caché) y un producto matricial contra la KB.
+    """
+    queries = [clean_text(b) for b in bases]
+    res = store.search(queries, k=1)
+    return [r[0] if (q and r) else ("", 0.0) for q, r in zip(queries, res)]
 
 
 # ------------------ PROCESAR UNA IMAGEN ------------------
@@ -161,12 +145,11 @@ def convertir_jpg_bytes(image_bytes):
         return None
 
 
-def resolver_final(nombre_archivo, img_bytes, kb_texts, kb_vecs):
+def resolver_final(nombre_archivo, img_bytes, sem):
     base = os.path.splitext(nombre_archivo)[0]
-    base_clean = clean_text(base)
 
-    # 1) Semántico
-    sem_name, sem_score = semantic_match(base_clean, kb_texts, kb_vecs)
+    # 1) Semántico (resuelto en lote por procesar_cliente)
+    sem_name, sem_score = sem
 
     # 2) Basado en filename directo
     fn_name = clean_text(base)
@@ -195,7 +178,7 @@ def resolver_final(nombre_archivo, img_bytes, kb_texts, kb_vecs):
 
 # ------------------ PROCESAR CLIENTE ------------------
 
-def procesar_cliente(cliente, kb_texts, kb_vecs):
+def procesar_cliente(cliente, store):
     print(f"\n🟦 Procesando: {cliente}")
 
     fotos_dir = os.path.join(BASE, f"{FOTOS_PREFIX}{cliente.upper()}")
@@ -205,29 +188,30 @@ def procesar_cliente(cliente, kb_texts, kb_vecs):
 
     out_rows = []
 
-    for fname in os.listdir(fotos_dir):
-        if fname.lower().endswith((".jpg",".jpeg",".png",".webp")):
+    fnames = [f for f in os.listdir(fotos_dir) if f.lower().endswith((".jpg",".jpeg",".png",".webp"))]
+    sems = semantic_match_batch([os.path.splitext(f)[0] for f in fnames], store)
 
-            path = os.path.join(fotos_dir, fname)
-            with open(path, "rb") as f:
-                b = f.read()
+    for fname, sem in zip(fnames, sems):
+        path = os.path.join(fotos_dir, fname)
+        with open(path, "rb") as f:
+            b = f.read()
 
-            nombre_rico, slugseo = resolver_final(fname, b, kb_texts, kb_vecs)
-            jpg = convertir_jpg_bytes(b)
+        nombre_rico, slugseo = resolver_final(fname, b, sem)
+        jpg = convertir_jpg_bytes(b)
 
-            new_name = slugseo + ".jpg"
-            out_path = os.path.join(DIR_OUT, new_name)
+        new_name = slugseo + ".jpg"
+        out_path = os.path.join(DIR_OUT, new_name)
 
-            with open(out_path, "wb") as o:
-                o.write(jpg)
+        with open(out_path, "wb") as o:
+            o.write(jpg)
 
-            out_rows.append({
-                "CLIENTE": cliente,
-                "ARCHIVO_ORIGINAL": fname,
-                "NOMBRE_RICO": nombre_rico,
-                "SLUG_SEO": slugseo,
-                "IMG_FINAL": new_name
-            })
+        out_rows.append({
+            "CLIENTE": cliente,
+            "ARCHIVO_ORIGINAL": fname,
+            "NOMBRE_RICO": nombre_rico,
+            "SLUG_SEO": slugseo,
+            "IMG_FINAL": new_name
+        })
 
     df_out = pd.DataFrame(out_rows)
     salida_csv = os.path.join(DIR_OUT, f"renombrado_{cliente}.csv")
@@ -251,23 +235,16 @@ def main():
 
     kb_texts = kb["TEXTO"].astype(str).tolist()
 
-    print("→ Generando embeddings para KB global...")
-    kb_vecs = []
-    for t in kb_texts:
-        v = embed_single(t)
-        if v is not None:
-            kb_vecs.append(v)
-
-    kb_vecs = np.array(kb_vecs, dtype=np.float32)
-    kb_texts = kb_texts[: len(kb_vecs)]
+    print("→ Cargando embeddings para KB global...")
+    store = VectorStore(KB_VECTORS, client, EMB_MODEL).build([clean_text(t) for t in kb_texts])
 
-    print(f"✔ KB cargada: {len(kb_vecs)} vectores")
+    print(f"✔ KB cargada: {len(store)} vectores")
 
     # ---- Procesar clientes ----
     clientes = ["Bara","DFG","Duna","Japan","Kaiqi","Leo","Store","Vaisand","Yokomar"]
 
     for cli in clientes:
-        procesar_cliente(cli, kb_texts, kb_vecs)
+        procesar_cliente(cli, store)
 
     print("\n🟩 FINALIZADO — RENOMBRADOR v26 listo.\n")
 
@@ -14,10 +14,14 @@
 #   python -X utf8 report_n5sb.py --db "C:\RadarPremios\radar_premios.db"
 # Opcionales:
 #   --out "C:\RadarPremios\reports" --window 12 --games "baloto,revancha"
+#   --windows "12,24,50,100"  (ventanas rolling adicionales, calculadas en una pasada)
 
 import os, sys, argparse, sqlite3, csv, datetime as dt
 from collections import defaultdict, namedtuple
 
+from rolling_stats import rolling_multi, rolling_mean, parse_windows
+from run_metrics import add_profile_args, profiler_from_args
+
 def ensure_dir(p):
     os.makedirs(p, exist_ok=True)
     return p
@@ -53,22 +57,14 @@ def parse_args():
     ap.add_argument("--out", default=os.path.join(rp_root, "reports"))
     ap.add_argument("--window", type=int, default=12, help="Ventana rolling (sorteos) para promedios")
     ap.add_argument("--games", default="baloto,revancha", help="baloto,revancha o all para ambos")
+    ap.add_argument("--windows", default="12,24,50,100", help="Ventanas rolling multi (sorteos), separadas por coma")
+    add_profile_args(ap)
     return ap.parse_args()
 
 def compute_rolling(seq, w):
-    out = []
-    s = 0.0
-    from collections import deque
-    q = deque()
-    for i, val in enumerate(seq):
-        v = to_float(val, 0.0)
-        q.append(v); s += v
-        if len(q) > w:
-            s -= q.popleft()
-        out.append(s / len(q))
-    return out
-
-def analyze_game(rows, game, window, outdir):
+    return rolling_mean(seq, w)
+
+def analyze_game(rows, game, window, outdir, windows=()):
     # rows: ordenados por fecha/sorteo
     # Campos esperados: fecha, sorteo, ganadores_5sb, premio_total_5sb, premio_ind_5sb
     rows_sorted = sorted(
@@ -95,12 +91,23 @@ def analyze_game(rows, game, window, outdir):
     roll_prem_tot = compute_rolling(premios_tot, window)
     roll_hit_rate = compute_rolling(hits, window)
 
+    # Rolling multi-ventana (una pasada por KPI)
+    windows = parse_windows(windows, default=[window])
+    multi_prem = rolling_multi(premios_tot, windows)
+    multi_hit = rolling_multi(hits, windows)
+    multi_cols = []
+    for wn in windows:
+        multi_cols += [f"roll{wn}_prem_total", f"roll{wn}_prem_max", f"roll{wn}_hit_rate"]
+
     # Construcción de CSV draw-level
     draws_csv = os.path.join(outdir, f"n5sb_draws_{game}.csv")
     with open(draws_csv, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
-        w.writerow(["game","fecha","sorteo","hit_5sb","ganadores_5sb","premio_total_5sb","premio_ind_5sb","nohit_streak","roll_prem_total","roll_hit_rate"])
+        w.writerow(["game","fecha","sorteo","hit_5sb","ganadores_5sb","premio_total_5sb","premio_ind_5sb","nohit_streak","roll_prem_total","roll_hit_rate"] + multi_cols)
         for i, r in enumerate(rows_sorted):
+            extra = []
+            for wn in windows:
+                extra += [multi_prem[wn]["mean"][i], multi_prem[wn]["max"][i], multi_hit[wn]["mean"][i]]
             w.writerow([
                 game,
                 r.get("fecha"),
@@ -112,7 +119,7 @@ def analyze_game(rows, game, window, outdir):
                 nohit_streak[i],
                 roll_prem_tot[i],
                 roll_hit_rate[i],
-            ])
+            ] + extra)
 
     # Detectar ciclos: desde (después de un hit) hasta el siguiente hit
     # Def: un ciclo incluye el bloque de no-hits y cierra en el sorteo con hit.
@@ -136,7 +143,7 @@ def analyze_game(rows, game, window, outdir):
             j += 1
         # Registrar ciclo si hay al menos un sorteo en el intervalo
         if j >= i:
-            si, sj = i, j
+            si, sj = i, min(j, len(rows_sorted) - 1)  # ciclo abierto al final: cierra en el último sorteo
             cycles.append(Cycle(
                 game=game,
                 start_fecha=rows_sorted[si].get("fecha"),
@@ -169,17 +176,39 @@ def analyze_game(rows, game, window, outdir):
         "avg_roll_prem_total": sum(roll_prem_tot)/len(roll_prem_tot) if roll_prem_tot else 0.0,
         "last_nohit_streak": nohit_streak[-1] if nohit_streak else 0,
         "last_premio_total": premios_tot[-1] if premios_tot else 0.0,
+        "windows": {
+            wn: {
+                "last_hit_rate": multi_hit[wn]["mean"][-1] if total_draws else 0.0,
+                "last_roll_prem_total": multi_prem[wn]["mean"][-1] if total_draws else 0.0,
+                "last_roll_prem_max": multi_prem[wn]["max"][-1] if total_draws else 0.0,
+            }
+            for wn in windows
+        },
     }
     return kpi
 
+def _summary_windows(kpis):
+    ws = set()
+    for g in kpis:
+        ws.update(g.get("windows", {}).keys())
+    return sorted(ws)
+
 def write_summary(kpis, outdir):
     summ_csv = os.path.join(outdir, "n5sb_summary.csv")
+    windows = _summary_windows(kpis)
+    multi_cols = []
+    for wn in windows:
+        multi_cols += [f"last_roll{wn}_hit_rate", f"last_roll{wn}_prem_total", f"last_roll{wn}_prem_max"]
     with open(summ_csv, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
-        w.writerow(["game","total_draws","total_hits_5sb","hit_rate","max_nohit_streak","avg_roll_prem_total","last_nohit_streak","last_premio_total"])
+        w.writerow(["game","total_draws","total_hits_5sb","hit_rate","max_nohit_streak","avg_roll_prem_total","last_nohit_streak","last_premio_total"] + multi_cols)
         for g in kpis:
+            extra = []
+            for wn in windows:
+                kw = g.get("windows", {}).get(wn, {})
+                extra += [kw.get("last_hit_rate", ""), kw.get("last_roll_prem_total", ""), kw.get("last_roll_prem_max", "")]
             w.writerow([g["game"], g["total_draws"], g["total_hits_5sb"], g["hit_rate"],
-                        g["max_nohit_streak"], g["avg_roll_prem_total"], g["last_nohit_streak"], g["last_premio_total"]])
+                        g["max_nohit_streak"], g["avg_roll_prem_total"], g["last_nohit_streak"], g["last_premio_total"]] + extra)
 
 def write_html(kpis, outdir):
     html = os.path.join(outdir, "n5sb_report.html")
@@ -202,6 +231,22 @@ def write_html(kpis, outdir):
             f"<td style='text-align:right'>{fmt_money(g['last_premio_total'])}</td>"
             f"</tr>"
         )
+    windows = _summary_windows(kpis)
+    win_rows = []
+    for g in kpis:
+        for wn in windows:
+            kw = g.get("windows", {}).get(wn)
+            if not kw:
+                continue
+            win_rows.append(
+                f"<tr>"
+                f"<td>{g['game']}</td>"
+                f"<td style='text-align:right'>{wn}</td>"
+                f"<td style='text-align:right'>{kw['last_hit_rate']:.3f}</td>"
+                f"<td style='text-align:right'>{fmt_money(kw['last_roll_prem_total'])}</td>"
+                f"<td style='text-align:right'>{fmt_money(kw['last_roll_prem_max'])}</td>"
+                f"</tr>"
+            )
     html_txt = f"""<!DOCTYPE html>
 <html lang="es">
 <head>
@@ -236,6 +281,19 @@ tr:nth-child(even){{background:#f9f9f9}}
 </tbody>
 </table>
 
+<h2>Ventanas rolling (último sorteo)</h2>
+<table>
+<thead>
+<tr>
+  <th>Juego</th><th>Ventana (sorteos)</th><th>Tasa hit</th>
+  <th>Promedio premio total</th><th>Máx premio total</th>
+</tr>
+</thead>
+<tbody>
+{''.join(win_rows)}
+</tbody>
+</table>
+
 <p>Archivos producidos en esta carpeta:
 <ul>
   <li><span class="code">n5sb_draws_*.csv</span> — por sorteo</li>
@@ -251,6 +309,10 @@ tr:nth-child(even){{background:#f9f9f9}}
 
 def main():
     args = parse_args()
+    with profiler_from_args("report_n5sb", args) as prof:
+        run(args, prof)
+
+def run(args, prof):
     cnx = sqlite3.connect(args.db)
 
     # Validaciones mínimas
@@ -272,24 +334,28 @@ def main():
 
     kpis = []
     for g in games:
-        data = read_table(
-            cnx,
-            "SELECT game, sorteo, fecha, ganadores_5sb, premio_total_5sb, premio_ind_5sb "
-            "FROM n5sb_top_tier_by_draw WHERE game = ? ORDER BY date(fecha), sorteo",
-            (g,)
-        )
+        with prof.phase("load", game=g):
+            data = read_table(
+                cnx,
+                "SELECT game, sorteo, fecha, ganadores_5sb, premio_total_5sb, premio_ind_5sb "
+                "FROM n5sb_top_tier_by_draw WHERE game = ? ORDER BY date(fecha), sorteo",
+                (g,)
+            )
+            prof.add_rows(len(data))
         if not data:
             print(f"[WARN] Sin datos en n5sb_top_tier_by_draw para '{g}'.")
             continue
-        kpi = analyze_game(data, g, args.window, outdir)
+        with prof.phase("analyze", game=g):
+            kpi = analyze_game(data, g, args.window, outdir, windows=args.windows)
         kpis.append(kpi)
 
     if not kpis:
         print("[WARN] No se generaron KPIs (¿sin datos?).")
         sys.exit(2)
 
-    write_summary(kpis, outdir)
-    write_html(kpis, outdir)
+    with prof.phase("export"):
+        write_summary(kpis, outdir)
+        write_html(kpis, outdir)
     print("[OK] Reporte N5+SB generado en:", outdir)
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ResultCache:
+    """
+    Caché persistente (SQLite) de resultados de OCR y detección, direccionada
+    por contenido.
+
+    La clave de cada entrada combina:
+        - hash de la imagen de la página (bytes del archivo o del array)
+        - región / parámetros de la llamada (bbox, lang, config, umbrales)
+        - nombre y versión del detector (CACHE_VERSION de cada clase)
+
+    Si la imagen no cambia, re-ejecutar el extractor tras ajustar reglas
+    posteriores (PostProcessor, Normalizer...) no repite OCR ni detección.
+    Al cambiar un detector basta con subir su CACHE_VERSION.
+
+    Es seguro entre procesos e hilos: cada hilo de cada proceso abre su
+    propia conexión (sqlite3 no comparte conexiones entre hilos).
+    """
+
+    def __init__(self, path="output/cache/extractor_cache.sqlite"):
+        self.path = path
+        self._local = threading.local()
+        self._last = (None, None)  # (array, digest), se reemplaza de una vez
+        self.hits = 0
+        self.misses = 0
+
+    # --------------------------------------------------------
+    # Conexión (una por hilo / proceso)
+    # --------------------------------------------------------
+    def _conn(self):
+        cnx = getattr(self._local, "cnx", None)
+        if cnx is None or self._local.pid != os.getpid():
+            d = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(d, exist_ok=True)
+            cnx = sqlite3.connect(self.path, timeout=30)
+            cnx.execute("PRAGMA journal_mode=WAL")
+            cnx.execute("""
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    kind       TEXT NOT NULL,
+                    key        TEXT NOT NULL,
+                    value      TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            cnx.commit()
+            self._local.cnx = cnx
+            self._local.pid = os.getpid()
+        return cnx
+
+    def __getstate__(self):
+        # Al enviarse a otro proceso no viajan conexiones ni memos
+        state = self.__dict__.copy()
+        state.update(_local=None, _last=(None, None))
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    # --------------------------------------------------------
+    # Hashes de contenido
+    # --------------------------------------------------------
+    @staticmethod
+    def hash_file(path):
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def hash_array(self, arr):
+        """
+        Hash de un array numpy (forma + dtype + bytes). Se memoiza el último
+        array recibido: OCRReader consulta la misma página muchas veces.
+        """
+        last_arr, last_digest = self._last
+        if arr is last_arr:
+            return last_digest
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{arr.shape}|{arr.dtype}".encode())
+        h.update(arr.tobytes() if not arr.flags["C_CONTIGUOUS"] else memoryview(arr))
+        digest = h.hexdigest()
+        self._last = (arr, digest)
+        return digest
+
+    @staticmethod
+    def make_key(*parts):
+        raw = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).hexdigest()
+
+    # --------------------------------------------------------
+    # Lectura / escritura
+    # --------------------------------------------------------
+    def get(self, kind, key):
+        row = self._conn().execute(
+            "SELECT value FROM result_cache WHERE kind=? AND key=?", (kind, key)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, kind, key, value):
+        cnx = self._conn()
+        cnx.execute(
+            "INSERT OR REPLACE INTO result_cache(kind, key, value, created_at) VALUES (?,?,?,?)",
+            (kind, key, json.dumps(value), time.time())
+        )
+        cnx.commit()
+
+    def get_or_compute(self, kind, key, fn):
+        value = self.get(kind, key)
+        if value is None:
+            value = fn()
+            self.put(kind, key, value)
+        return value
+
+    def clear(self, kind=None):
+        cnx = self._conn()
+        if kind:
+            cnx.execute("DELETE FROM result_cache WHERE kind=?", (kind,))
+        else:
+            cnx.execute("DELETE FROM result_cache")
+        cnx.commit()
+
+
+def version_of(obj):
+    """
+    Identificador de versión de un detector para las claves de caché.
+    """
+    return f"{type(obj).__name__}:{getattr(obj, 'CACHE_VERSION', '0')}"
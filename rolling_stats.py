@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+rolling_stats.py
+Estadísticas rodantes O(n) para los reportes de RadarPremios.
+
+Proporciona:
+- parse_windows("12,24,50,100") -> [12, 24, 50, 100]
+- rolling_multi(seq, windows) -> {w: {"mean","sum","count","min","max"}}
+- rolling_mean(seq, w) -> lista de promedios (compatible con compute_rolling)
+
+Diseño:
+- Una sola pasada sobre la serie: sumas acumuladas (prefix sums) para
+  suma/promedio de cualquier ventana y un deque monotónico por ventana
+  para min/max. Costo O(n * len(windows)) en vez de O(n * w) por ventana.
+- Ventanas "expansivas" al inicio: mientras i+1 < w, la ventana cubre
+  los i+1 valores disponibles (mismo criterio que el compute_rolling original).
+- Valores no numéricos se tratan como 0.0.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Sequence
+
+DEFAULT_WINDOWS = (12, 24, 50, 100)
+
+
+def _to_float(x, default: float = 0.0) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return default
+
+
+def parse_windows(spec, default: Sequence[int] = DEFAULT_WINDOWS) -> List[int]:
+    """
+    Convierte "12,24,50" (o lista de ints) en lista ordenada y sin duplicados
+    de ventanas positivas. Si no queda ninguna válida, retorna `default`.
+    """
+    if spec is None:
+        return list(default)
+    if isinstance(spec, str):
+        parts = [p.strip() for p in spec.split(",")]
+    else:
+        parts = list(spec)
+    out = set()
+    for p in parts:
+        try:
+            v = int(p)
+        except Exception:
+            continue
+        if v > 0:
+            out.add(v)
+    return sorted(out) if out else list(default)
+
+
+def rolling_multi(seq: Iterable, windows: Sequence[int]) -> Dict[int, Dict[str, List[float]]]:
+    """
+    Calcula en una pasada, para cada ventana w, las series:
+      sum, mean, count, min, max
+    alineadas con `seq` (mismo largo).
+    """
+    vals = [_to_float(v) for v in seq]
+    ws = parse_windows(windows)
+    n = len(vals)
+
+    out: Dict[int, Dict[str, List[float]]] = {
+        w: {"sum": [0.0] * n, "mean": [0.0] * n, "count": [0] * n,
+            "min": [0.0] * n, "max": [0.0] * n}
+        for w in ws
+    }
+    # deques de índices: mínimos crecientes / máximos decrecientes
+    dq_min = {w: deque() for w in ws}
+    dq_max = {w: deque() for w in ws}
+    prefix = [0.0] * (n + 1)
+
+    for i, v in enumerate(vals):
+        prefix[i + 1] = prefix[i] + v
+        for w in ws:
+            start = i + 1 - w if i + 1 > w else 0
+            cnt = i + 1 - start
+            s = prefix[i + 1] - prefix[start]
+            o = out[w]
+            o["sum"][i] = s
+            o["count"][i] = cnt
+            o["mean"][i] = s / cnt
+
+            qmin = dq_min[w]
+            while qmin and vals[qmin[-1]] >= v:
+                qmin.pop()
+            qmin.append(i)
+            if qmin[0] < start:
+                qmin.popleft()
+            o["min"][i] = vals[qmin[0]]
+
+            qmax = dq_max[w]
+            while qmax and vals[qmax[-1]] <= v:
+                qmax.pop()
+            qmax.append(i)
+            if qmax[0] < start:
+                qmax.popleft()
+            o["max"][i] = vals[qmax[0]]
+    return out
+
+
+def rolling_mean(seq: Iterable, w: int) -> List[float]:
+    """
+    Promedio rodante (ventana expansiva al inicio) para una sola ventana.
+    """
+    w = max(1, int(w))
+    return rolling_multi(seq, [w])[w]["mean"]
@@ -6,6 +6,9 @@ def main():
     BASE = os.path.dirname(os.path.abspath(__file__))
     CROP_DIR = os.path.join(BASE, "output", "images", "crops")
     OUT_JSON = os.path.join(BASE, "output", "productos_llm.json")
+    CHECKPOINT = os.path.join(BASE, "output", "productos_llm.ckpt.jsonl")
+    CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+    RPM = int(os.getenv("LLM_RPM", "300"))
 
     print("=== EXTRACTOR ADSI V5 – FASE 8 ===")
     print(f"Usando carpeta: {CROP_DIR}")
@@ -14,15 +17,18 @@ def main():
         print("[ERROR] No existe la carpeta de recortes.")
         return
 
-    pipeline = ExtractionPipeline()
+    pipeline = ExtractionPipeline(concurrency=CONCURRENCY, rpm=RPM)
 
     print("[1] Procesando imágenes...")
-    productos = pipeline.process_folder(CROP_DIR)
+    productos = pipeline.process_folder(CROP_DIR, checkpoint_path=CHECKPOINT)
 
     print(f"[2] Total procesados: {len(productos)}")
 
     print(f"[3] Guardando JSON en: {OUT_JSON}")
     pipeline.save_as_json(productos, OUT_JSON)
+    # Corrida completa: el checkpoint ya no hace falta
+    if not pipeline.stats.get("error") and os.path.exists(CHECKPOINT):
+        os.remove(CHECKPOINT)
 
     print("=== FASE 8 COMPLETADA ===")
 
@@ -8,6 +8,7 @@ from modules.table_detector_hybrid import HybridDetector
 from modules.page_segmenter import PageSegmenter
 from modules.cell_extractor import CellExtractor
 from modules.vision_extractor import VisionExtractor
+from modules.vision_cache import VisionCache
 from modules.product_builder import ProductBuilder
 from modules.catalog_integrator import CatalogIntegrator
 from modules.exporter import Exporter
@@ -61,7 +62,7 @@ def main():
     detector = select_detector()
     segmenter = PageSegmenter(detector)
     cell_extractor = CellExtractor(margin=4)
-    vision = VisionExtractor(model="gpt-4o-mini")
+    vision = VisionExtractor(model="gpt-4o-mini", cache=VisionCache())
     builder = ProductBuilder()
     integrator = CatalogIntegrator()
     exporter = Exporter(output_dir=CATALOG_DIR)
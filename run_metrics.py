@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+run_metrics.py
+Instrumentación por fases para los CLIs de RadarPremios (--profile).
+
+Proporciona:
+- add_profile_args(ap)                    -> agrega --profile / --profile-out / --metrics-db
+- profiler_from_args(script, args, game)  -> RunProfiler (inactivo si no hay --profile)
+- RunProfiler.phase(name, game=None)      -> context manager que mide una fase
+- RunProfiler.lap(name, game=None)        -> cierra la fase en curso y abre otra
+- RunProfiler.add_rows(n)                 -> filas procesadas en la fase en curso
+- RunProfiler.finish(status="ok")         -> escribe run_metrics y el .pstats (opcional)
+
+Tabla run_metrics (en radar_premios.db, se crea si no existe):
+  run_uid, script, game, phase, started_at, elapsed_ms, rows, status, params
+
+Diseño:
+- Sin --profile todas las llamadas son no-op (no se abre la DB ni se mide nada).
+- Una fila por fase y una fila 'total' por ejecución; run_uid agrupa las fases.
+- --profile-out guarda un volcado cProfile (pstats) de toda la ejecución.
+- Un fallo al escribir métricas nunca rompe el CLI: se reporta como [WARN].
+"""
+
+import cProfile
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+def add_profile_args(ap) -> None:
+    ap.add_argument("--profile", action="store_true", help="Registra tiempos por fase en run_metrics")
+    ap.add_argument("--profile-out", help="Ruta .pstats para volcado cProfile (implica --profile)")
+    ap.add_argument("--metrics-db", help="DB donde escribir run_metrics (por defecto --db)")
+
+def ensure_schema(cnx: sqlite3.Connection) -> None:
+    cnx.execute("""
+        CREATE TABLE IF NOT EXISTS run_metrics (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_uid    TEXT NOT NULL,
+            script     TEXT NOT NULL,
+            game       TEXT,
+            phase      TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            elapsed_ms REAL NOT NULL,
+            rows       INTEGER,
+            status     TEXT,
+            params     TEXT
+        )
+    """)
+    cnx.execute("CREATE INDEX IF NOT EXISTS idx_run_metrics_script ON run_metrics(script, started_at)")
+
+
+class RunProfiler:
+    def __init__(self, script: str, db_path: Optional[str] = None, enabled: bool = False,
+                 game: Optional[str] = None, pstats_path: Optional[str] = None,
+                 params: Optional[Dict] = None):
+        self.script = script
+        self.db_path = db_path
+        self.enabled = bool(enabled or pstats_path)
+        self.game = game
+        self.pstats_path = pstats_path
+        self.params = params or {}
+        self.run_uid = uuid.uuid4().hex[:12]
+        self.records: List[Dict] = []
+        self._t0 = time.perf_counter()
+        self._started_at = datetime.now().isoformat(timespec="seconds")
+        self._current: Optional[Dict] = None
+        self._total_rows = 0
+        self._finished = False
+        self._cprof = None
+        if self.pstats_path:
+            self._cprof = cProfile.Profile()
+            self._cprof.enable()
+
+    # ---------- fases ----------
+
+    def _open(self, name: str, game: Optional[str]) -> Dict:
+        rec = {"phase": name, "game": game or self.game, "rows": 0,
+               "started_at": datetime.now().isoformat(timespec="seconds"),
+               "_t": time.perf_counter()}
+        self._current = rec
+        return rec
+
+    def _close(self, rec: Dict) -> None:
+        rec["elapsed_ms"] = (time.perf_counter() - rec.pop("_t")) * 1000.0
+        self.records.append(rec)
+        if self._current is rec:
+            self._current = None
+
+    @contextmanager
+    def phase(self, name: str, game: Optional[str] = None):
+        if not self.enabled:
+            yield self
+            return
+        prev = self._current
+        rec = self._open(name, game)
+        try:
+            yield self
+        finally:
+            self._close(rec)
+            self._current = prev
+
+    def lap(self, name: Optional[str], game: Optional[str] = None) -> None:
+        """
+        Cierra la fase abierta con lap() (si hay) y abre `name` (None = solo cerrar).
+        """
+        if not self.enabled:
+            return
+        if self._current is not None and self._current.get("_lap"):
+            self._close(self._current)
+        if name:
+            rec = self._open(name, game)
+            rec["_lap"] = True
+
+    def add_rows(self, n: int) -> None:
+        if not self.enabled:
+            return
+        n = int(n or 0)
+        self._total_rows += n
+        if self._current is not None:
+            self._current["rows"] += n
+
+    # ---------- cierre ----------
+
+    def finish(self, status: str = "ok") -> None:
+        if not self.enabled or self._finished:
+            return
+        self._finished = True
+        self.lap(None)
+        total_ms = (time.perf_counter() - self._t0) * 1000.0
+        if self._cprof is not None:
+            self._cprof.disable()
+            try:
+                d = os.path.dirname(os.path.abspath(self.pstats_path))
+                os.makedirs(d, exist_ok=True)
+                self._cprof.dump_stats(self.pstats_path)
+            except Exception as e:
+                print(f"[WARN] No se pudo escribir pstats {self.pstats_path}: {e}")
+        self.records.append({"phase": "total", "game": self.game, "rows": self._total_rows,
+                             "started_at": self._started_at, "elapsed_ms": total_ms})
+        for r in self.records:
+            print(f"[PROF] {self.script} {r['game'] or '-'} {r['phase']:<12} {r['elapsed_ms']:10.1f} ms  rows={r['rows']}")
+        if not self.db_path:
+            return
+        try:
+            cnx = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                ensure_schema(cnx)
+                params = json.dumps(self.params, ensure_ascii=False, default=str)
+                cnx.executemany(
+                    "INSERT INTO run_metrics(run_uid, script, game, phase, started_at, elapsed_ms, rows, status, params) "
+                    "VALUES (?,?,?,?,?,?,?,?,?)",
+                    [(self.run_uid, self.script, r["game"], r["phase"], r["started_at"],
+                      round(r["elapsed_ms"], 3), r["rows"], status, params) for r in self.records]
+                )
+                cnx.commit()
+            finally:
+                cnx.close()
+        except Exception as e:
+            print(f"[WARN] No se pudo escribir run_metrics en {self.db_path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None or (exc_type is SystemExit and exc.code in (0, None)):
+            self.finish("ok")
+        else:
+            self.finish(f"error:{exc_type.__name__}")
+        return False
+
+
+def profiler_from_args(script: str, args, game: Optional[str] = None) -> RunProfiler:
+    enabled = bool(getattr(args, "profile", False))
+    pstats_path = getattr(args, "profile_out", None)
+    db_path = getattr(args, "metrics_db", None) or getattr(args, "db", None)
+    params = {k: v for k, v in vars(args).items() if k not in ("profile", "profile_out", "metrics_db")}
+    return RunProfiler(script, db_path=db_path, enabled=enabled, game=game,
+                       pstats_path=pstats_path, params=params)
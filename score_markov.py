@@ -12,15 +12,19 @@ Soporta:
  - Juegos N5+SB: baloto, revancha, n5sb, all_n5sb
 
 Salida:
- - CSV con todas las puntuaciones (o muestra para N5+SB)
+ - CSV con todas las puntuaciones (o muestra para N5+SB), escrito en streaming
  - CSV top-N (si se indica)
  - Reporte HTML simple con entropías y mixing
+ - HTML de candidatos paginado o con tabla virtual (--export-html)
 """
-import argparse, sqlite3, os, sys, math, csv, json, time, random
+import argparse, sqlite3, os, sys, math, csv, json, time, random, heapq
 from collections import defaultdict, Counter
 from datetime import datetime
 from typing import List, Tuple, Dict, Iterable, Optional
 
+from stream_export import StreamingCSVWriter, external_sort, make_html_writer, tee_write
+from run_metrics import add_profile_args, profiler_from_args
+
 # ---------------- RNGs ----------------
 
 class RNGBase:
@@ -364,8 +368,7 @@ def sample_4d(rng:RNGBase, n:int)->List[str]:
         out.append(f"{v:04d}")
     return out
 
-def sample_n5sb(rng:RNGBase, n:int, mn:int, mx:int)->List[Tuple[int,int,int,int,int,int]]:
-    out=[]
+def iter_sample_n5sb(rng:RNGBase, n:int, mn:int, mx:int)->Iterable[Tuple[int,int,int,int,int,int]]:
     for _ in range(n):
         # cinco números 1..mx sin repetición (ordenados) + sb 1..mx (puede repetir respecto a los 5)
         picks=set()
@@ -373,26 +376,78 @@ def sample_n5sb(rng:RNGBase, n:int, mn:int, mx:int)->List[Tuple[int,int,int,int,
             picks.add(rng.randint(mn,mx))
         five = sorted(picks)
         sb = rng.randint(mn,mx)
-        out.append((five[0],five[1],five[2],five[3],five[4],sb))
-    return out
+        yield (five[0],five[1],five[2],five[3],five[4],sb)
+
+def sample_n5sb(rng:RNGBase, n:int, mn:int, mx:int)->List[Tuple[int,int,int,int,int,int]]:
+    return list(iter_sample_n5sb(rng, n, mn, mx))
 
 # ---------------- Export ----------------
 
-def write_csv_4d(path:str, rows:List[Dict]):
-    fieldnames=["num","score","markov_logp","prior_logp"]
-    with open(path,"w",newline="",encoding="utf-8") as f:
-        w=csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in rows:
-            w.writerow({k:r[k] for k in fieldnames})
-
-def write_csv_n5sb(path:str, rows:List[Dict]):
-    fieldnames=["n1","n2","n3","n4","n5","sb","score","markov_logp","prior_logp"]
-    with open(path,"w",newline="",encoding="utf-8") as f:
-        w=csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in rows:
-            w.writerow({k:r[k] for k in fieldnames})
+FIELDS_4D=["num","score","markov_logp","prior_logp"]
+FIELDS_N5SB=["n1","n2","n3","n4","n5","sb","score","markov_logp","prior_logp"]
+
+def write_csv_4d(path:str, rows:Iterable[Dict]):
+    with StreamingCSVWriter(path, FIELDS_4D) as w:
+        tee_write(rows, [w])
+
+def write_csv_n5sb(path:str, rows:Iterable[Dict]):
+    with StreamingCSVWriter(path, FIELDS_N5SB) as w:
+        tee_write(rows, [w])
+
+def _score_key(r:Dict)->float:
+    return r["score"]
+
+def export_scored(rows:Iterable[Dict], fieldnames:List[str], args, title:str)->int:
+    """
+    Exporta candidatos puntuados sin materializarlos en memoria:
+     - Sin --export-all/--export-html: solo top-N con heapq.nlargest (memoria O(top)).
+     - Con exportación completa: orden externo por bloques y una sola pasada
+       que alimenta CSV completo, HTML paginado/virtual y CSV top-N.
+    El orden es el mismo que rows.sort(key=score, reverse=True).
+    """
+    full = bool(args.export_all or args.export_html)
+    if not full:
+        if not args.export:
+            n = 0
+            for _ in rows:
+                n += 1
+            return n
+        seen = [0]
+        def counted():
+            for r in rows:
+                seen[0] += 1
+                yield r
+        top = heapq.nlargest(max(0, args.top), counted(), key=_score_key)
+        with StreamingCSVWriter(args.export, fieldnames) as w:
+            tee_write(top, [w])
+        return seen[0]
+
+    ordered = external_sort(rows, key=_score_key, reverse=True, chunk_size=args.sort_chunk)
+    writers = []
+    if args.export_all:
+        writers.append(StreamingCSVWriter(args.export_all, fieldnames))
+    if args.export_html:
+        writers.append(make_html_writer(args.html_mode, args.export_html, fieldnames,
+                                        title=title, page_size=args.page_size))
+    top_w = StreamingCSVWriter(args.export, fieldnames) if args.export else None
+    for w in writers:
+        w.__enter__()
+    if top_w:
+        top_w.__enter__()
+    n = 0
+    try:
+        for r in ordered:
+            for w in writers:
+                w.write(r)
+            if top_w and n < args.top:
+                top_w.write(r)
+            n += 1
+    finally:
+        for w in writers:
+            w.close()
+        if top_w:
+            top_w.close()
+    return n
 
 def write_report_html(path:str, meta:Dict, entropies:List[float], mixing:List[int]):
     html = []
@@ -427,8 +482,17 @@ def main():
     ap.add_argument("--export-all", help="CSV todos los candidatos evaluados")
     ap.add_argument("--top", type=int, default=50, help="Top-N a exportar")
     ap.add_argument("--report", help="HTML con entropías y mixing")
+    ap.add_argument("--export-html", help="Carpeta para HTML de todos los candidatos (paginado o tabla virtual)")
+    ap.add_argument("--html-mode", default="paged", choices=["paged","virtual"], help="paged: page_NNNN.html | virtual: data.js + tabla virtual")
+    ap.add_argument("--page-size", type=int, default=1000, help="Filas por página (--html-mode paged)")
+    ap.add_argument("--sort-chunk", type=int, default=200000, help="Filas por bloque del orden externo (memoria pico)")
+    add_profile_args(ap)
     args = ap.parse_args()
 
+    with profiler_from_args("score_markov", args, game=args.game.lower().strip()) as prof:
+        run(args, prof)
+
+def run(args, prof):
     rng = make_rng(args.rng, args.seed)
 
     cnx = sqlite3.connect(args.db)
@@ -454,10 +518,13 @@ def main():
     }
 
     if is4d:
+        prof.lap("load")
         draws = load_draws_4d(cnx, game)
+        prof.add_rows(len(draws))
         if len(draws)<2:
             print("[ERROR] Muy pocos sorteos 4D para entrenar.", file=sys.stderr)
             sys.exit(3)
+        prof.lap("model")
         Ppos = transitions_4d(draws, smoothing=args.smoothing)
         pi_pos, mixing, ent = stationary_per_pos(Ppos, alpha=args.damping, eps=args.eps, max_steps=args.max_iter)
         prev = draws[-1]
@@ -475,34 +542,36 @@ def main():
             # evalúa todos (o muestrea si quieres)
             cand_list = list(enumerate_4d())
 
-        rows=[]
         w = max(0.0, min(1.0, args.markov_weight))
-        for s in cand_list:
-            lp_m = logprob_next_4d(Ppos, prev, s)
-            lp_p = logprob_prior_4d(pi_pos, s)
-            score = w*lp_m + (1.0-w)*lp_p
-            rows.append({"num":s, "score":score, "markov_logp":lp_m, "prior_logp":lp_p})
-        rows.sort(key=lambda r: r["score"], reverse=True)
-
-        if args.export_all:
-            write_csv_4d(args.export_all, rows)
-        if args.export:
-            write_csv_4d(args.export, rows[:args.top])
+        def scored_4d():
+            for s in cand_list:
+                lp_m = logprob_next_4d(Ppos, prev, s)
+                lp_p = logprob_prior_4d(pi_pos, s)
+                score = w*lp_m + (1.0-w)*lp_p
+                yield {"num":s, "score":score, "markov_logp":lp_m, "prior_logp":lp_p}
+
+        # el scoring es perezoso: esta fase incluye puntuar y exportar
+        prof.lap("score_export")
+        prof.add_rows(export_scored(scored_4d(), FIELDS_4D, args, f"Candidatos Markov {args.game}"))
+        prof.lap("report")
         if args.report:
             write_report_html(args.report, meta, ent, mixing)
 
     else:
         # N5+SB
+        prof.lap("load")
         draws = load_draws_n5sb(cnx, game)
+        prof.add_rows(len(draws))
         if len(draws)<2:
             print("[ERROR] Muy pocos sorteos n5+sb para entrenar.", file=sys.stderr)
             sys.exit(4)
+        prof.lap("model")
         Ppos, mn, k = transitions_npos(draws, npos=6, smoothing=args.smoothing)
         pi_pos, mixing, ent = stationary_per_pos(Ppos, alpha=args.damping, eps=args.eps, max_steps=args.max_iter)
         prev = draws[-1]
 
         # candidatos: archivo o generados
-        cand_list: List[Tuple[int,int,int,int,int,int]] = []
+        cand_list: Iterable[Tuple[int,int,int,int,int,int]] = []
         if args.candidates:
             with open(args.candidates, encoding="utf-8") as f:
                 for row in csv.DictReader(f):
@@ -514,23 +583,22 @@ def main():
         if not cand_list:
             gen = args.gen or 10000
             mx = mn + k - 1
-            cand_list = sample_n5sb(rng, gen, mn, mx)
+            # generador: los candidatos se muestrean a medida que se puntúan
+            cand_list = iter_sample_n5sb(rng, gen, mn, mx)
 
-        rows=[]
         w = max(0.0, min(1.0, args.markov_weight))
-        for t in cand_list:
-            lp_m = logprob_next_npos(Ppos, prev, t, mn=mn)
-            lp_p = logprob_prior_npos(pi_pos, t, mn=mn)
-            score = w*lp_m + (1.0-w)*lp_p
-            n1,n2,n3,n4,n5,sb = t
-            rows.append({"n1":n1,"n2":n2,"n3":n3,"n4":n4,"n5":n5,"sb":sb,
-                         "score":score,"markov_logp":lp_m,"prior_logp":lp_p})
-        rows.sort(key=lambda r: r["score"], reverse=True)
-
-        if args.export_all:
-            write_csv_n5sb(args.export_all, rows)
-        if args.export:
-            write_csv_n5sb(args.export, rows[:args.top])
+        def scored_n5sb():
+            for t in cand_list:
+                lp_m = logprob_next_npos(Ppos, prev, t, mn=mn)
+                lp_p = logprob_prior_npos(pi_pos, t, mn=mn)
+                score = w*lp_m + (1.0-w)*lp_p
+                n1,n2,n3,n4,n5,sb = t
+                yield {"n1":n1,"n2":n2,"n3":n3,"n4":n4,"n5":n5,"sb":sb,
+                       "score":score,"markov_logp":lp_m,"prior_logp":lp_p}
+
+        prof.lap("score_export")
+        prof.add_rows(export_scored(scored_n5sb(), FIELDS_N5SB, args, f"Candidatos Markov {args.game}"))
+        prof.lap("report")
         if args.report:
             write_report_html(args.report, meta, ent, mixing)
 
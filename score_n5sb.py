@@ -23,6 +23,7 @@ from datetime import datetime
 from typing import List, Tuple
 
 import std_source as SS
+from run_metrics import add_profile_args, profiler_from_args
 
 # -------------------- Utiles --------------------
 
@@ -214,8 +215,14 @@ def main():
     ap.add_argument("--export", required=True, help="CSV top")
     ap.add_argument("--export-all", required=True, help="CSV all")
     ap.add_argument("--report", required=True, help="HTML report")
+    add_profile_args(ap)
     args = ap.parse_args()
 
+    with profiler_from_args("score_n5sb", args, game=args.game) as prof:
+        run(args, prof)
+
+def run(args, prof):
+    prof.lap("load")
     cnx = SS.connect(args.db)
     # Sanity n5+sb
     SS.sanity_check_source(cnx, args.game)
@@ -223,12 +230,17 @@ def main():
     draws = SS.load_n5sb(cnx, args.game)
     if not draws:
         raise SystemExit(f"No hay datos de {args.game} para scoring.")
+    prof.add_rows(len(draws))
 
+    prof.lap("model")
     rnd = random.Random(args.seed)
     model = _score_model(draws)
+    prof.lap("score")
     ranked = _generate_candidates(model, args.game, rnd, n_gen=args.gen)
+    prof.add_rows(len(ranked))
 
     # Exportar
+    prof.lap("export")
     rows_all = []
     for i, (sc, (a,b,c,d,e,sb)) in enumerate(ranked, 1):
         rows_all.append({
@@ -23,12 +23,16 @@ import os
 import re
 import csv
 import glob
+import hashlib
 import json
 import zipfile
 import logging
 import pandas as pd
 from bs4 import BeautifulSoup
-from pdfminer.high_level import extract_text
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTContainer, LTText, LTTextBox
+
+from extraction_manifest import ExtractionManifest
 
 # ========================
 # CONFIGURACIÓN GLOBAL
@@ -38,6 +42,11 @@ BASE_DIR = r"C:\img"
 SALIDA_DIR = os.path.join(BASE_DIR, "EXTRACT")
 os.makedirs(SALIDA_DIR, exist_ok=True)
 
+# Extracción incremental: subir la versión invalida todo lo cacheado
+EXTRACTOR_VERSION = "srm-extractor-1"
+CACHE_DIR = os.path.join(SALIDA_DIR, "cache")
+MANIFEST = ExtractionManifest(os.path.join(SALIDA_DIR, "manifest.json"), EXTRACTOR_VERSION)
+
 logging.basicConfig(
     filename=os.path.join(SALIDA_DIR, "extractor.log"),
     level=logging.INFO,
@@ -66,20 +75,53 @@ def registrar(msg):
 
 # ------------------------ PDF -------------------------------------
 
+def _render_layout(item, out):
+    # Mismo recorrido que TextConverter de pdfminer (extract_text): entra en
+    # figuras y contenedores, y cierra cada caja de texto con un salto de línea
+    if isinstance(item, LTContainer):
+        for child in item:
+            _render_layout(child, out)
+    elif isinstance(item, LTText):
+        out.append(item.get_text())
+    if isinstance(item, LTTextBox):
+        out.append("\n")
+
+
+def iter_pdf_text_pages(path):
+    """
+    Texto del PDF página a página: pdfminer interpreta una página cada vez,
+    así el layout de un catálogo de cientos de páginas nunca está completo en memoria.
+    Concatenar las páginas da el mismo texto que extract_text(path) (cada
+    página termina en "\f").
+    """
+    for page_layout in extract_pages(path):
+        out = []
+        _render_layout(page_layout, out)
+        out.append("\f")
+        yield "".join(out)
+
+
+def _agregar_linea_pdf(rows, path, line):
+    line = clean(line)
+    if len(line) >= 3:     # línea con algo útil
+        rows.append({
+            "FUENTE": os.path.basename(path),
+            "ORIGEN_TIPO": "PDF",
+            "CONTENIDO": line
+        })
+
+
 def procesar_pdf(path):
     registrar(f"    → PDF: {path}")
+    rows = []
     try:
-        text = extract_text(path)
-        rows = []
-
-        for line in text.split("\n"):
-            line = clean(line)
-            if len(line) >= 3:     # línea con algo útil
-                rows.append({
-                    "FUENTE": os.path.basename(path),
-                    "ORIGEN_TIPO": "PDF",
-                    "CONTENIDO": line
-                })
+        tail = ""  # línea que continúa en la página siguiente (tras el "\f")
+        for text in iter_pdf_text_pages(path):
+            lines = (tail + text).split("\n")
+            tail = lines.pop()
+            for line in lines:
+                _agregar_linea_pdf(rows, path, line)
+        _agregar_linea_pdf(rows, path, tail)
         return rows
     except Exception as e:
         registrar(f"[ERROR PDF] {path}: {e}")
@@ -222,6 +264,39 @@ def procesar_zip(path):
     return rows
 
 
+# ===================================================================
+# EXTRACCIÓN INCREMENTAL
+# ===================================================================
+
+def procesar_incremental(path, fn):
+    """
+    Ejecuta fn(path) solo si el archivo es nuevo o cambió (manifiesto);
+    si no, reutiliza las filas guardadas de la corrida anterior.
+    """
+    key = hashlib.blake2b(os.path.abspath(path).encode("utf-8"), digest_size=12).hexdigest()
+    cache_file = os.path.join(CACHE_DIR, f"{key}.json")
+
+    if MANIFEST.is_fresh(path):
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+            MANIFEST.reused += 1
+            registrar(f"    → SIN CAMBIOS (reutilizado): {path}")
+            return rows
+        except (OSError, ValueError):
+            pass
+
+    rows = fn(path)
+    if not rows:
+        # Vacío o error de lectura: se reintenta en la próxima corrida
+        return rows
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False)
+    MANIFEST.record(path, [cache_file])
+    return rows
+
+
 # ===================================================================
 # PROCESADOR POR CLIENTE
 # ===================================================================
@@ -243,15 +318,15 @@ def procesar_cliente(cliente):
         ext = f.lower().split(".")[-1]
 
         if ext in ["pdf"]:
-            rows_final += procesar_pdf(f)
+            rows_final += procesar_incremental(f, procesar_pdf)
         elif ext in ["xlsx","xls"]:
-            rows_final += procesar_excel(f)
+            rows_final += procesar_incremental(f, procesar_excel)
         elif ext in ["csv","txt"]:
-            rows_final += procesar_csv_txt(f)
+            rows_final += procesar_incremental(f, procesar_csv_txt)
         elif ext in ["html","htm"]:
-            rows_final += procesar_html(f)
+            rows_final += procesar_incremental(f, procesar_html)
         elif ext in ["zip"]:
-            rows_final += procesar_zip(f)
+            rows_final += procesar_incremental(f, procesar_zip)
 
     # B. IMÁGENES
     if os.path.isdir(fotos_dir):
@@ -270,6 +345,9 @@ def procesar_cliente(cliente):
 
     registrar(f"  → COMPLETADO: {len(df)} filas extraídas")
 
+    MANIFEST.save()
+    registrar(f"  → Manifiesto: {MANIFEST.summary()}")
+
 
 # ===================================================================
 # MAIN
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+stream_export.py
+Exportación en streaming de candidatos para RadarPremios.
+
+Proporciona:
+- external_sort(rows, key, reverse, chunk_size) -> iterador ordenado con memoria acotada
+- StreamingCSVWriter(path, fieldnames)         -> CSV escrito fila a fila
+- PagedHTMLWriter(out_dir, fieldnames, ...)    -> HTML partido en páginas + index.html
+- VirtualTableWriter(out_dir, fieldnames, ...) -> data.js compacto + index.html con tabla virtual
+- make_html_writer(mode, out_dir, fieldnames, ...)
+- tee_write(rows, writers)                     -> envía cada fila a todos los writers
+
+Diseño:
+- Ningún writer acumula filas: cada fila se escribe y se descarta.
+- external_sort ordena por bloques de `chunk_size` filas, vuelca cada bloque
+  ordenado a un archivo temporal (pickle) y los mezcla con heapq.merge.
+  El orden resultante es idéntico a sorted(..., reverse=...) (estable).
+- La tabla virtual carga los datos con <script src="data.js"> (funciona
+  con file:// sin servidor) y solo pinta las filas visibles.
+"""
+
+import csv
+import heapq
+import html
+import json
+import os
+import pickle
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# ---------------- Orden externo ----------------
+
+def _spill(chunk: List[Dict], tmpdir: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="run_", suffix=".pkl", dir=tmpdir)
+    with os.fdopen(fd, "wb") as f:
+        for r in chunk:
+            pickle.dump(r, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+def _read_run(path: str) -> Iterator[Dict]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def external_sort(rows: Iterable[Dict], key: Callable, reverse: bool = False,
+                  chunk_size: int = 200000, tmpdir: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Ordena un iterable arbitrariamente grande con memoria O(chunk_size).
+    Si todo cabe en un bloque no toca disco.
+    """
+    chunk_size = max(1, int(chunk_size))
+    chunk: List[Dict] = []
+    runs: List[str] = []
+    workdir = None
+    try:
+        for r in rows:
+            chunk.append(r)
+            if len(chunk) >= chunk_size:
+                if workdir is None:
+                    workdir = tempfile.mkdtemp(prefix="rp_sort_", dir=tmpdir)
+                chunk.sort(key=key, reverse=reverse)
+                runs.append(_spill(chunk, workdir))
+                chunk = []
+        chunk.sort(key=key, reverse=reverse)
+        if not runs:
+            yield from chunk
+            return
+        if chunk:
+            runs.append(_spill(chunk, workdir))
+            chunk = []
+        yield from heapq.merge(*[_read_run(p) for p in runs], key=key, reverse=reverse)
+    finally:
+        for p in runs:
+            try:
+                os.remove(p)
+            except Exception:
+                pass
+        if workdir:
+            try:
+                os.rmdir(workdir)
+            except Exception:
+                pass
+
+# ---------------- Writers ----------------
+
+def _ensure_parent(path: str):
+    d = os.path.dirname(os.path.abspath(path))
+    os.makedirs(d, exist_ok=True)
+
+class StreamingCSVWriter:
+    """
+    CSV fila a fila. Uso:
+        with StreamingCSVWriter(path, fields) as w:
+            w.write(row)
+    """
+    def __init__(self, path: str, fieldnames: List[str]):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.count = 0
+        self._f = None
+        self._w = None
+
+    def __enter__(self):
+        _ensure_parent(self.path)
+        self._f = open(self.path, "w", newline="", encoding="utf-8")
+        self._w = csv.DictWriter(self._f, fieldnames=self.fieldnames, extrasaction="ignore")
+        self._w.writeheader()
+        return self
+
+    def write(self, row: Dict):
+        self._w.writerow(row)
+        self.count += 1
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+_PAGE_CSS = ("body{font-family:Segoe UI, Arial, sans-serif;margin:24px} h1{font-size:20px} "
+             "table{border-collapse:collapse} td,th{border:1px solid #ccc;padding:4px 8px;text-align:right} "
+             "th{background:#f4f4f4;position:sticky;top:0} .nav a{margin-right:8px}")
+
+def _fmt(v) -> str:
+    if isinstance(v, float):
+        return f"{v:.6f}"
+    return str(v)
+
+class PagedHTMLWriter:
+    """
+    HTML partido en archivos page_0001.html, page_0002.html, ... de `page_size`
+    filas, más un index.html con enlaces. Una página llena se cierra (con enlace
+    a la siguiente) recién cuando llega otra fila; así la última nunca enlaza a
+    una página inexistente.
+    """
+    def __init__(self, out_dir: str, fieldnames: List[str], title: str = "Candidatos",
+                 page_size: int = 1000):
+        self.out_dir = out_dir
+        self.fieldnames = list(fieldnames)
+        self.title = title
+        self.page_size = max(1, int(page_size))
+        self.count = 0
+        self.pages = 0
+        self._f = None
+        self._in_page = 0
+
+    def _page_name(self, i: int) -> str:
+        return f"page_{i:04d}.html"
+
+    def _open_page(self):
+        self.pages += 1
+        self._in_page = 0
+        self._f = open(os.path.join(self.out_dir, self._page_name(self.pages)), "w", encoding="utf-8")
+        t = html.escape(f"{self.title} — página {self.pages}")
+        th = "".join(f"<th>{html.escape(h)}</th>" for h in ["#"] + self.fieldnames)
+        self._f.write(f"<!doctype html><meta charset='utf-8'><title>{t}</title><style>{_PAGE_CSS}</style>")
+        self._f.write(f"<h1>{t}</h1><table><thead><tr>{th}</tr></thead><tbody>\n")
+
+    def _close_page(self, last: bool):
+        if not self._f:
+            return
+        nav = ["<a href='index.html'>índice</a>"]
+        if self.pages > 1:
+            nav.append(f"<a href='{self._page_name(self.pages - 1)}'>« anterior</a>")
+        if not last:
+            nav.append(f"<a href='{self._page_name(self.pages + 1)}'>siguiente »</a>")
+        self._f.write(f"</tbody></table><p class='nav'>{''.join(nav)}</p>")
+        self._f.close()
+        self._f = None
+
+    def __enter__(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        return self
+
+    def write(self, row: Dict):
+        if self._f is not None and self._in_page >= self.page_size:
+            self._close_page(last=False)
+        if self._f is None:
+            self._open_page()
+        self.count += 1
+        tds = "".join(f"<td>{html.escape(_fmt(row.get(h, '')))}</td>" for h in self.fieldnames)
+        self._f.write(f"<tr><td>{self.count}</td>{tds}</tr>\n")
+        self._in_page += 1
+
+    def close(self):
+        if self._f is not None:
+            self._close_page(last=True)
+        links = []
+        for i in range(1, self.pages + 1):
+            a = (i - 1) * self.page_size + 1
+            b = min(i * self.page_size, self.count)
+            links.append(f"<li><a href='{self._page_name(i)}'>{a}–{b}</a></li>")
+        t = html.escape(self.title)
+        with open(os.path.join(self.out_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(f"<!doctype html><meta charset='utf-8'><title>{t}</title><style>{_PAGE_CSS}</style>")
+            f.write(f"<h1>{t}</h1><p>{self.count} filas en {self.pages} páginas · "
+                    f"generado {datetime.now().isoformat(timespec='seconds')}</p><ul>{''.join(links)}</ul>")
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+_VIRTUAL_INDEX = """<!doctype html><meta charset='utf-8'><title>{title}</title>
+<style>body{{font-family:Segoe UI, Arial, sans-serif;margin:24px}} h1{{font-size:20px}}
+#vp{{height:80vh;overflow-y:auto;border:1px solid #ccc;position:relative}}
+#hd,.r{{display:grid;grid-template-columns:{cols};font-size:13px}}
+#hd{{background:#f4f4f4;font-weight:bold;border:1px solid #ccc;border-bottom:0}}
+#hd div,.r div{{padding:2px 8px;text-align:right;white-space:nowrap}}
+.r{{position:absolute;left:0;right:0;height:{rh}px;line-height:{rh}px}} .r:nth-child(even){{background:#fafafa}}</style>
+<h1>{title}</h1><p id='info'></p>
+<div id='hd'></div><div id='vp'><div id='sz'></div></div>
+<script src='data.js'></script>
+<script>
+(function(){{
+  var D = window.RP_DATA, RH = {rh}, vp = document.getElementById('vp'), sz = document.getElementById('sz');
+  var cols = ['#'].concat(D.fields);
+  document.getElementById('hd').innerHTML = cols.map(function(c){{return '<div>'+c+'</div>';}}).join('');
+  document.getElementById('info').textContent = D.rows.length + ' filas · generado ' + D.generated_at;
+  sz.style.height = (D.rows.length * RH) + 'px';
+  function paint(){{
+    var a = Math.max(0, Math.floor(vp.scrollTop / RH) - 10);
+    var b = Math.min(D.rows.length, a + Math.ceil(vp.clientHeight / RH) + 20);
+    var h = [];
+    for (var i = a; i < b; i++) {{
+      h.push('<div class="r" style="top:'+(i*RH)+'px"><div>'+(i+1)+'</div><div>'+D.rows[i].join('</div><div>')+'</div></div>');
+    }}
+    sz.innerHTML = h.join('');
+  }}
+  vp.addEventListener('scroll', function(){{ window.requestAnimationFrame(paint); }});
+  paint();
+}})();
+</script>
+"""
+
+class VirtualTableWriter:
+    """
+    Escribe data.js (window.RP_DATA = {fields, rows:[[...], ...]}) fila a fila
+    y un index.html que pinta solo las filas visibles (tabla virtual).
+    """
+    ROW_HEIGHT = 22
+
+    def __init__(self, out_dir: str, fieldnames: List[str], title: str = "Candidatos"):
+        self.out_dir = out_dir
+        self.fieldnames = list(fieldnames)
+        self.title = title
+        self.count = 0
+        self._f = None
+
+    def __enter__(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._f = open(os.path.join(self.out_dir, "data.js"), "w", encoding="utf-8")
+        head = {"fields": self.fieldnames, "generated_at": datetime.now().isoformat(timespec="seconds")}
+        self._f.write("window.RP_DATA = " + json.dumps(head, ensure_ascii=False)[:-1] + ', "rows": [\n')
+        return self
+
+    def write(self, row: Dict):
+        vals = []
+        for h in self.fieldnames:
+            v = row.get(h, "")
+            vals.append(round(v, 6) if isinstance(v, float) else v)
+        self._f.write(("," if self.count else "") + json.dumps(vals, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._f is None:
+            return
+        self._f.write("]};\n")
+        self._f.close()
+        self._f = None
+        cols = " ".join(["minmax(60px,1fr)"] * (len(self.fieldnames) + 1))
+        with open(os.path.join(self.out_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(_VIRTUAL_INDEX.format(title=html.escape(self.title), cols=cols, rh=self.ROW_HEIGHT))
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def make_html_writer(mode: str, out_dir: str, fieldnames: List[str], title: str = "Candidatos",
+                     page_size: int = 1000):
+    """
+    mode: 'paged' (HTML por páginas) | 'virtual' (data.js + tabla virtual)
+    """
+    mode = (mode or "paged").lower()
+    if mode == "paged":
+        return PagedHTMLWriter(out_dir, fieldnames, title=title, page_size=page_size)
+    if mode == "virtual":
+        return VirtualTableWriter(out_dir, fieldnames, title=title)
+    raise ValueError("Modo HTML desconocido: " + mode)
+
+
+def tee_write(rows: Iterable[Dict], writers: List) -> int:
+    """
+    Envía cada fila a todos los writers (ya abiertos). Retorna # filas.
+    """
+    n = 0
+    for r in rows:
+        for w in writers:
+            w.write(r)
+        n += 1
+    return n
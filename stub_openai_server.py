@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita /v1/chat/completions de OpenAI (sin red ni costo),
+para probar AsyncDispatcher / ExtractionPipeline de punta a punta.
+
+USO:
+    python stub_openai_server.py --port 8765 --fail-first 3
+    set OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    python run_extractor.py
+
+    - Cada respuesta trae x-ratelimit-remaining-requests / -reset-requests
+    - --fail-first N: las N primeras solicitudes responden 429 con retry-after
+    - responder(body) → texto de la respuesta (por defecto un JSON de producto)
+      Si lanza excepción, la solicitud responde 500.
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_REPLY = json.dumps({
+    "codigo": "STUB-001", "descripcion": "PRODUCTO DE PRUEBA", "precio": "1000",
+    "empaque": "X1", "fotos": [], "variantes": [],
+})
+
+
+class StubOpenAIServer:
+    """
+        with StubOpenAIServer(fail_first=2) as srv:
+            os.environ["OPENAI_BASE_URL"] = srv.base_url
+            ...
+            srv.requests   # solicitudes recibidas (incluye las 429)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, responder=None, fail_first=0,
+                 retry_after=0.1, rpm_limit=1000):
+        self.responder = responder or (lambda body: DEFAULT_REPLY)
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.rpm_limit = rpm_limit
+        self.requests = 0
+        self.bodies = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=()):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": f"ruta desconocida {self.path}"}})
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    n = server.requests
+                    server.bodies.append(body)
+                if n <= server.fail_first:
+                    return self._send(429, {"error": {"message": "rate limit (stub)", "type": "requests"}},
+                                      [("retry-after", str(server.retry_after))])
+                try:
+                    content = server.responder(body)
+                except Exception as e:
+                    return self._send(500, {"error": {"message": str(e)}})
+                remaining = max(0, server.rpm_limit - n)
+                self._send(200, {
+                    "id": "chatcmpl-" + uuid.uuid4().hex[:12],
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+                }, [("x-ratelimit-remaining-requests", str(remaining)),
+                    ("x-ratelimit-reset-requests", "1s")])
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor falso de chat.completions")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--fail-first", type=int, default=0, help="primeras N solicitudes → 429")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    args = ap.parse_args()
+
+    srv = StubOpenAIServer(port=args.port, fail_first=args.fail_first, retry_after=args.retry_after)
+    print(f"[STUB] Escuchando. OPENAI_BASE_URL={srv.base_url}  (Ctrl+C para salir)")
+    try:
+        srv._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
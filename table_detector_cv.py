@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from modules.page_image import Page
+
 class OpenCVTableDetector:
     """
     Detector de tablas usando OpenCV – funciona para tablas marcadas,
@@ -8,19 +10,15 @@ class OpenCVTableDetector:
     """
 
     def detect_tables(self, image_path):
-        img = cv2.imread(image_path)
-        if img is None:
+        """
+        image_path: ruta de la página o Page ya decodificado.
+        """
+        page = Page.of(image_path)
+        if not page.ok:
             return {"tables": [], "cells": []}
 
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
         # Umbral adaptativo para resaltar bordes
-        thresh = cv2.adaptiveThreshold(
-            gray, 255,
-            cv2.ADAPTIVE_THRESH_MEAN_C,
-            cv2.THRESH_BINARY_INV,
-            15, 8
-        )
+        thresh = page.adaptive_inv(cv2.ADAPTIVE_THRESH_MEAN_C, 15, 8)
 
         # Líneas horizontales
         horiz = thresh.copy()
@@ -1,7 +1,8 @@
-import layoutparser as lp
-import cv2
 import numpy as np
 
+from modules.lp_model_server import DEFAULT_MODEL, get_server
+from modules.page_image import Page
+
 
 class LayoutParserTableDetector:
     """
@@ -15,42 +16,56 @@ class LayoutParserTableDetector:
 
     Este módulo es más flexible que el detector OpenCV
     y detecta tablas incluso sin bordes visibles.
+
+    La inferencia la hace un LayoutModelServer (modelo cargado una vez
+    por proceso, entrada por lotes).
     """
 
-    def __init__(self, model_name="lp://PrimaLayout/mask_rcnn_R_50_FPN_3x/config"):
-        try:
-            self.model = lp.AutoLayoutModel(model_name)
-            self.enabled = True
-        except Exception as e:
-            print("[WARN] LayoutParser no disponible:", e)
-            self.enabled = False
+    def __init__(self, model_name=DEFAULT_MODEL, server=None, threads=None, max_side=None):
+        """
+        server: LayoutModelServer ya cargado. Si no se pasa, se usa el servidor
+        compartido del proceso (get_server), así varias instancias del
+        detector no vuelven a cargar el modelo.
+        """
+        self.server = server or get_server(model_name, threads=threads, max_side=max_side)
+
+    @property
+    def enabled(self):
+        self.server.load()
+        return self.server.enabled
 
     def detect_tables(self, image_path):
+        return self.detect_tables_batch([image_path])[0]
+
+    def detect_tables_batch(self, sources):
+        """
+        Detecta tablas en varias páginas con una sola llamada al servidor.
+        sources: rutas o Page. Devuelve una lista de {tables, cells}.
+        """
+        empty = {"tables": [], "cells": []}
         if not self.enabled:
-            return {
-                "tables": [],
-                "cells": []
-            }
-
-        image = cv2.imread(image_path)
-        if image is None:
-            return {"tables": [], "cells": []}
+            return [dict(empty) for _ in sources]
 
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        pages = [Page.of(s) for s in sources]
+        valid = [i for i, p in enumerate(pages) if p.ok]
+        dets = self.server.detect_batch([pages[i].rgb for i in valid])
 
-        # Detect layout components
-        layout = self.model.detect(image_rgb)
+        out = [dict(empty) for _ in sources]
+        for i, d in zip(valid, dets):
+            out[i] = self._to_tables(d)
+        return out
 
+    def _to_tables(self, layout):
         tables = []
         cells = []
 
         # --- Filtrar SOLO los bloques que nos sirven ---
-        table_blocks = [b for b in layout if b.type in ("Table", "table")]
-        cell_blocks = [b for b in layout if b.type in ("Table Cell", "Cell")]
+        table_blocks = [b for b in layout if b["type"] in ("Table", "table")]
+        cell_blocks = [b for b in layout if b["type"] in ("Table Cell", "Cell")]
 
         # Convertir celdas a diccionarios
         for blk in cell_blocks:
-            x1, y1, x2, y2 = map(int, blk.block)
+            x1, y1, x2, y2 = blk["bbox"]
             w = x2 - x1
             h = y2 - y1
 
@@ -67,7 +82,7 @@ class LayoutParserTableDetector:
         # Convertir tablas
         for blk in table_blocks:
             tables.append({
-                "bbox": list(map(int, blk.block)),
+                "bbox": list(blk["bbox"]),
                 "cells": cells  # LayoutParser no separa celdas por tabla
             })
 
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Prueba local de batch_runner con FakeBatchClient (sin red ni costo).
+
+USO:
+    python test_batch_runner.py
+
+Escenarios:
+    - un lote termina en "failed" y el script se vuelve a correr: el reenvío
+      debe devolver las respuestas nuevas y no el results_*.jsonl vacío que
+      dejó la corrida fallida
+    - un trabajo anterior en la misma carpeta con los mismos custom_id: sus
+      respuestas no deben colarse en el trabajo actual
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch_runner import BatchJob, FakeBatchClient, message_content
+
+
+def _job(client, workdir, prefix="item"):
+    job = BatchJob(client, workdir, poll_interval=0)
+    for i in range(3):
+        job.add(f"req-{i}", {"model": "gpt-4o", "messages": [{"role": "user", "content": f"{prefix} {i}"}]})
+    return job
+
+
+def test_resubmit_after_failed_batch():
+    client = FakeBatchClient(lambda body: body["messages"][0]["content"].upper(), fail_batches=1)
+    with tempfile.TemporaryDirectory() as workdir:
+        # Corrida 1: el lote falla, ninguna respuesta
+        first = _job(client, workdir).run()
+        assert all(v is None for v in first.values()), first
+
+        # Corrida 2 (nuevo proceso, mismo workdir): reenvía y obtiene respuestas
+        second = _job(client, workdir).run()
+        got = {cid: message_content(body) for cid, body in second.items()}
+        assert got == {"req-0": "ITEM 0", "req-1": "ITEM 1", "req-2": "ITEM 2"}, got
+
+        # Solo queda el archivo de resultados del lote vigente
+        results = [n for n in os.listdir(workdir) if n.startswith("results_")]
+        assert len(results) == 1, results
+
+
+def test_results_ignore_previous_jobs():
+    client = FakeBatchClient(lambda body: body["messages"][0]["content"].upper())
+    with tempfile.TemporaryDirectory() as workdir:
+        # Trabajo anterior con los mismos custom_id y otro prompt
+        old = _job(client, workdir, prefix="viejo").run()
+        assert message_content(old["req-0"]) == "VIEJO 0"
+
+        # El lote actual falla: no debe heredar las respuestas del anterior
+        client.fail_batches = 1
+        current = _job(client, workdir, prefix="nuevo").run()
+        assert all(v is None for v in current.values()), current
+
+
+if __name__ == "__main__":
+    test_resubmit_after_failed_batch()
+    test_results_ignore_previous_jobs()
+    print("✅ test_batch_runner: APROBADO")
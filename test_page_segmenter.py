@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Prueba local del schedule "adaptive" de PageSegmenter con detectores falsos
+(sin OpenCV ni LayoutParser).
+
+USO:
+    python test_page_segmenter.py
+
+Escenario: CV gana N páginas seguidas; LayoutParser no debe ejecutarse en
+ninguna y el planificador debe quedarse en "CV primero".
+"""
+
+import os
+import sys
+
+# Este archivo vive junto a los módulos del paquete modules/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.page_image import Page
+from modules.page_segmenter import PageSegmenter
+from modules.selector import TableOrBlockSelector
+
+
+class FakeCV:
+    def detect_tables(self, page):
+        cells = [{"x": 10 + 60 * i, "y": 10, "w": 50, "h": 20} for i in range(6)]
+        return {"tables": [{"x": 0, "y": 0, "w": 400, "h": 40}], "cells": cells}
+
+
+class FakeLP:
+    def __init__(self):
+        self.calls = 0
+
+    def detect_tables(self, page):
+        self.calls += 1
+        return {"tables": [], "cells": []}
+
+
+class FakeFallback:
+    def detect(self, page):
+        return {"blocks": []}
+
+
+class FakeGrid:
+    def build(self, cells):
+        return cells
+
+
+def test_cv_wins_skip_lp(n=10):
+    lp = FakeLP()
+    seg = PageSegmenter(FakeCV(), lp, FakeFallback(), FakeGrid(), TableOrBlockSelector())
+    for i in range(n):
+        res = seg.process_page(Page(f"page_{i:03d}.png", image=object()))
+        assert res["mode"] == "cv", res["mode"]
+    seg.close()
+
+    assert lp.calls == 0, f"LayoutParser se ejecutó en {lp.calls} páginas"
+    assert all(r["lp_skipped"] for r in seg.records)
+    assert [r["schedule"] for r in seg.records] == ["cv_first"] * n
+    assert list(seg.recent_winners) == ["cv_table"] * n
+
+
+if __name__ == "__main__":
+    test_cv_wins_skip_lp()
+    print("✅ test_page_segmenter: APROBADO")
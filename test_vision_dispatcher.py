@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Prueba local de AsyncDispatcher contra stub_openai_server (sin red ni costo).
+
+USO:
+    python test_vision_dispatcher.py
+
+Escenarios:
+    - 429 con retry-after en las primeras solicitudes: se reintenta y todos
+      los ítems terminan bien, en el orden de entrada
+    - checkpoint: al reanudar solo se piden los ítems nuevos
+    - ítems que fallan quedan en dispatcher.failed
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_openai_server import StubOpenAIServer
+from vision_dispatcher import AsyncDispatcher, TokenBucket
+
+
+class StubRateLimit(Exception):
+    def __init__(self, response):
+        super().__init__("429")
+        self.response = response
+
+
+class StubClient:
+    """
+    Cliente mínimo (urllib) de chat.completions; guarda las cabeceras de la
+    última respuesta por hilo, como LLMClient.
+    """
+
+    def __init__(self, base_url):
+        self.url = base_url + "/chat/completions"
+        self._local = threading.local()
+
+    def last_headers(self):
+        return getattr(self._local, "headers", None)
+
+    def ask(self, text):
+        data = json.dumps({"model": "stub", "messages": [{"role": "user", "content": text}]}).encode("utf-8")
+        req = urllib.request.Request(self.url, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                self._local.headers = dict(resp.headers)
+                return json.loads(resp.read())["choices"][0]["message"]["content"]
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise StubRateLimit(e)
+            raise RuntimeError(f"HTTP {e.code}")
+
+
+def _dispatcher(client, **kwargs):
+    return AsyncDispatcher(client.ask, concurrency=3, bucket=TokenBucket(rpm=6000),
+                           retry_on=(StubRateLimit,), base_delay=0.01, max_delay=0.05,
+                           headers_fn=client.last_headers, **kwargs)
+
+
+def test_retries_after_429():
+    with StubOpenAIServer(responder=lambda body: body["messages"][0]["content"].upper(),
+                          fail_first=2, retry_after=0.05) as srv:
+        d = _dispatcher(StubClient(srv.base_url))
+        results = d.run([(f"k{i}", f"item {i}") for i in range(6)])
+    assert results == [(True, f"ITEM {i}") for i in range(6)], results
+    assert d.stats["retries"] >= 2 and d.stats["error"] == 0, d.stats
+
+
+def test_checkpoint_resume():
+    with tempfile.TemporaryDirectory() as tmp, StubOpenAIServer() as srv:
+        ckpt = os.path.join(tmp, "ckpt.jsonl")
+        client = StubClient(srv.base_url)
+        _dispatcher(client, checkpoint_path=ckpt).run([(f"k{i}", f"item {i}") for i in range(3)])
+        assert srv.requests == 3
+
+        d = _dispatcher(client, checkpoint_path=ckpt)
+        results = d.run([(f"k{i}", f"item {i}") for i in range(4)])
+        assert srv.requests == 4, srv.requests
+        assert d.stats["resumed"] == 3 and all(ok for ok, _ in results)
+
+
+def test_failed_keys_reported():
+    def responder(body):
+        if body["messages"][0]["content"] == "malo":
+            raise ValueError("falla simulada")
+        return "ok"
+
+    with StubOpenAIServer(responder=responder) as srv:
+        d = _dispatcher(StubClient(srv.base_url))
+        results = d.run([("a", "bueno"), ("b", "malo"), ("c", "bueno")])
+    assert [ok for ok, _ in results] == [True, False, True]
+    assert [key for key, _ in d.failed] == ["b"], d.failed
+
+
+if __name__ == "__main__":
+    test_retries_after_429()
+    test_checkpoint_resume()
+    test_failed_keys_reported()
+    print("✅ test_vision_dispatcher: APROBADO")
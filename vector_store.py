@@ -0,0 +1,342 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+EMBED_BATCH = 256
+
+# A partir de este tamaño de KB, index="auto" usa IVF en vez de búsqueda exacta
+IVF_MIN_ROWS = 100000
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "embedding_cache.sqlite"),
+)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _normalize(mat):
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+# ------------------------------------------------------------
+# Caché de embeddings por texto (SQLite, compartida)
+# ------------------------------------------------------------
+class EmbeddingCache:
+    """
+    Embeddings ya normalizados por (sha256 del texto, modelo), guardados
+    como float32 crudo. Compartida por todos los renombradores: un texto
+    (de la KB o de una consulta) se embebe una sola vez.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self._local = threading.local()
+
+    def _conn(self):
+        cnx = getattr(self._local, "cnx", None)
+        if cnx is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            cnx = sqlite3.connect(self.path, timeout=30)
+            cnx.execute("PRAGMA journal_mode=WAL")
+            cnx.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    text_hash TEXT NOT NULL,
+                    model     TEXT NOT NULL,
+                    vec       BLOB NOT NULL,
+                    PRIMARY KEY (text_hash, model)
+                )
+            """)
+            cnx.commit()
+            self._local.cnx = cnx
+            self._local.pid = os.getpid()
+        return cnx
+
+    def get_many(self, hashes, model):
+        cnx = self._conn()
+        out = {}
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = cnx.execute(
+                f"SELECT text_hash, vec FROM embedding_cache WHERE model=? "
+                f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                [model] + chunk,
+            ).fetchall()
+            for h, blob in rows:
+                out[h] = np.frombuffer(blob, dtype=np.float32)
+        return out
+
+    def put_many(self, items, model):
+        """
+        items: [(text_hash, vector float32), ...]
+        """
+        cnx = self._conn()
+        cnx.executemany(
+            "INSERT OR REPLACE INTO embedding_cache(text_hash, model, vec) VALUES (?,?,?)",
+            [(h, model, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items],
+        )
+        cnx.commit()
+
+
+# ------------------------------------------------------------
+# Almacén de vectores de la KB
+# ------------------------------------------------------------
+class VectorStore:
+    """
+    Vectores normalizados de la base de conocimiento en una matriz float32
+    mapeada en memoria ({prefix}.f32) con metadatos ({prefix}.json: modelo,
+    dimensión, textos en el mismo orden que las filas, versión).
+
+        store = VectorStore(os.path.join(DIR_CACHE, "kb_v24"), client, "text-embedding-3-small")
+        store.build(textos)                    # solo embebe lo que falte
+        store.search(consultas, k=1)           # [[(texto, score)], ...]
+
+    - Embeddings por lotes (EMBED_BATCH textos por llamada) con caché por
+      hash de texto: consultas repetidas no vuelven a la API
+    - Búsqueda: un solo producto matricial por bloque de consultas
+      (similitud coseno = producto punto, las filas ya están normalizadas)
+    - KB grande: índice IVF opcional (k-means sobre la matriz, se
+      persiste en {prefix}.ivf.npz) y se revisan nprobe listas
+    - Resultados de search() memorizados por consulta: una pasada en
+      lote al inicio deja las consultas por archivo sin costo
+    """
+
+    def __init__(self, prefix, client=None, model="text-embedding-3-small", embed_fn=None,
+                 cache=None, index="auto", nprobe=8):
+        """
+        embed_fn(lista de textos) -> lista de vectores (por defecto, client.embeddings).
+        index: "flat", "ivf" o "auto".
+        """
+        self.prefix = prefix
+        self.client = client
+        self.model = model
+        self.embed_fn = embed_fn or (self._openai_embed if client is not None else None)
+        self.cache = cache or EmbeddingCache()
+        self.index = index
+        self.nprobe = nprobe
+        self.texts = []
+        self.matrix = None
+        self.ivf = None
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _openai_embed(self, batch):
+        res = self.client.embeddings.create(model=self.model, input=batch)
+        return [d.embedding for d in res.data]
+
+    # --------------------------------------------------------
+    # Embeddings (con caché)
+    # --------------------------------------------------------
+    def embed(self, texts):
+        """
+        (matriz n x d normalizada, máscara de filas válidas). Los textos sin
+        embedding (sin cliente o error de la API) quedan en cero y False.
+        """
+        hashes = [text_hash(t) for t in texts]
+        found = self.cache.get_many(set(hashes), self.model)
+        missing = list(dict.fromkeys(h for h in hashes if h not in found))
+        if missing and self.embed_fn is not None:
+            by_hash = dict(zip(hashes, texts))
+            for i in range(0, len(missing), EMBED_BATCH):
+                chunk = missing[i:i + EMBED_BATCH]
+                try:
+                    vecs = self.embed_fn([by_hash[h] for h in chunk])
+                except Exception as e:
+                    print(f"[WARN] Falló lote de embeddings ({len(chunk)} textos): {e}")
+                    continue
+                vecs = _normalize(np.asarray(vecs, dtype=np.float32))
+                self.cache.put_many(zip(chunk, vecs), self.model)
+                found.update(zip(chunk, vecs))
+
+        dim = next((len(v) for v in found.values()), 0)
+        mat = np.zeros((len(texts), dim), dtype=np.float32)
+        mask = np.zeros(len(texts), dtype=bool)
+        for i, h in enumerate(hashes):
+            v = found.get(h)
+            if v is not None:
+                mat[i] = v
+                mask[i] = True
+        return mat, mask
+
+    # --------------------------------------------------------
+    # Construcción / apertura de la KB
+    # --------------------------------------------------------
+    def _kb_hash(self, texts):
+        h = hashlib.sha256(f"{FORMAT_VERSION}\n{self.model}\n".encode("utf-8"))
+        for t in texts:
+            h.update(t.encode("utf-8") + b"\0")
+        return h.hexdigest()
+
+    def build(self, texts):
+        """
+        Abre la matriz persistida si corresponde a estos textos y modelo;
+        si no, la reconstruye (los embeddings ya conocidos salen de la
+        caché, solo se piden los textos nuevos).
+        """
+        texts = list(dict.fromkeys(t for t in texts if t))
+        kb_hash = self._kb_hash(texts)
+        meta_path = self.prefix + ".json"
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("kb_hash") == kb_hash and os.path.exists(self.prefix + ".f32"):
+                self._open(meta)
+                return self
+
+        mat, mask = self.embed(texts)
+        kept = [t for t, ok in zip(texts, mask) if ok]
+        mat = mat[mask]
+        if len(kept) < len(texts):
+            print(f"[WARN] KB: {len(texts) - len(kept)} textos sin embedding (se omiten)")
+        if not kept:
+            self.texts, self.matrix = [], None
+            return self
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.prefix)), exist_ok=True)
+        tmp = self.prefix + ".f32.tmp"
+        mm = np.memmap(tmp, dtype=np.float32, mode="w+", shape=mat.shape)
+        mm[:] = mat
+        mm.flush()
+        del mm
+        os.replace(tmp, self.prefix + ".f32")
+
+        meta = {
+            "version": FORMAT_VERSION,
+            "model": self.model,
+            "dim": int(mat.shape[1]),
+            "count": len(kept),
+            "kb_hash": kb_hash,
+            "texts": kept,
+        }
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+        if os.path.exists(self.prefix + ".ivf.npz"):
+            os.remove(self.prefix + ".ivf.npz")
+        self._open(meta)
+        return self
+
+    def _open(self, meta):
+        self.texts = meta["texts"]
+        self.matrix = np.memmap(self.prefix + ".f32", dtype=np.float32, mode="r",
+                                shape=(meta["count"], meta["dim"]))
+        self._memo = {}
+        use_ivf = self.index == "ivf" or (self.index == "auto" and meta["count"] >= IVF_MIN_ROWS)
+        self.ivf = self._load_or_build_ivf(meta["kb_hash"]) if use_ivf else None
+
+    # --------------------------------------------------------
+    # IVF (listas invertidas sobre centroides k-means)
+    # --------------------------------------------------------
+    def _assign(self, centroids, block=65536):
+        out = np.empty(len(self.matrix), dtype=np.int32)
+        for i in range(0, len(self.matrix), block):
+            out[i:i + block] = np.argmax(self.matrix[i:i + block] @ centroids.T, axis=1)
+        return out
+
+    def _load_or_build_ivf(self, kb_hash, iters=10):
+        path = self.prefix + ".ivf.npz"
+        if os.path.exists(path):
+            data = np.load(path)
+            if str(data["kb_hash"]) == kb_hash:
+                return {k: data[k] for k in ("centroids", "order", "offsets")}
+
+        n = len(self.matrix)
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = np.array(self.matrix[np.sort(rng.choice(n, nlist, replace=False))])
+        for _ in range(iters):
+            assign = self._assign(centroids)
+            sums = np.zeros_like(centroids)
+            for i in range(0, n, 65536):
+                np.add.at(sums, assign[i:i + 65536], self.matrix[i:i + 65536])
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        assign = self._assign(centroids)
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1)).astype(np.int64)
+        np.savez(path, centroids=centroids, order=order, offsets=offsets, kb_hash=kb_hash)
+        return {"centroids": centroids, "order": order, "offsets": offsets}
+
+    # --------------------------------------------------------
+    # Búsqueda
+    # --------------------------------------------------------
+    def _topk(self, scores, idx, k):
+        if len(scores) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+        else:
+            part = np.arange(len(scores))
+        part = part[np.argsort(-scores[part])]
+        return [(self.texts[int(idx[j]) if idx is not None else int(j)], float(scores[j])) for j in part]
+
+    def search(self, queries, k=1, block=256):
+        """
+        [[(texto_kb, score coseno), ...top k], ...] por consulta (lista
+        vacía si la consulta no se pudo embeber o la KB está vacía).
+        """
+        results = [None] * len(queries)
+        todo = []
+        with self._lock:
+            for i, q in enumerate(queries):
+                hit = self._memo.get((q, k))
+                if hit is not None:
+                    results[i] = hit
+                else:
+                    todo.append(i)
+        if not todo:
+            return results
+        if self.matrix is None or not len(self.texts):
+            for i in todo:
+                results[i] = []
+            return results
+
+        qmat, mask = self.embed([queries[i] for i in todo])
+        if qmat.shape[1] != self.matrix.shape[1]:
+            # Ninguna consulta se pudo embeber (qmat sin columnas)
+            for i in todo:
+                results[i] = []
+            return results
+        for b in range(0, len(todo), block):
+            sub = qmat[b:b + block]
+            if self.ivf is None:
+                sims = sub @ self.matrix.T
+            for j in range(len(sub)):
+                i = todo[b + j]
+                if not mask[b + j]:
+                    results[i] = []
+                    continue
+                if self.ivf is None:
+                    results[i] = self._topk(sims[j], None, k)
+                else:
+                    lists = np.argsort(-(self.ivf["centroids"] @ sub[j]))[:self.nprobe]
+                    off = self.ivf["offsets"]
+                    cand = np.concatenate([self.ivf["order"][off[c]:off[c + 1]] for c in lists])
+                    results[i] = self._topk(self.matrix[cand] @ sub[j], cand, k) if len(cand) else []
+
+        with self._lock:
+            for i in todo:
+                self._memo[(queries[i], k)] = results[i]
+        return results
+
+    def best(self, query, min_score=None):
+        """
+        (texto, score) del mejor vecino o ("", 0.0).
+        """
+        res = self.search([query], k=1)[0]
+        if not res or (min_score is not None and res[0][1] < min_score):
+            return "", 0.0
+        return res[0]
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_PATH = os.getenv(
+    "VISION_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "vision_cache.sqlite"),
+)
+
+
+class VisionCache:
+    """
+    Caché persistente (SQLite) de respuestas Vision, compartida por todos
+    los scripts (renombradores, limpiadores, extractores).
+
+    Clave: (sha256 de la imagen, hash del prompt, modelo). La misma imagen
+    con el mismo prompt y modelo no se vuelve a pagar, sin importar qué
+    script, carpeta o nombre de archivo la traiga.
+
+        - Escrituras concurrentes seguras: WAL + una conexión por hilo
+          y por proceso; cada put es una transacción corta
+        - Estadísticas: aciertos/fallos de la sesión (stats()) y conteo de
+          aciertos por entrada en la base (hits)
+
+    Ruta por defecto: VISION_CACHE_PATH o ~/.cache/vision_cache.sqlite
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --------------------------------------------------------
+    # Conexión (una por hilo / proceso)
+    # --------------------------------------------------------
+    def _conn(self):
+        cnx = getattr(self._local, "cnx", None)
+        if cnx is None or self._local.pid != os.getpid():
+            d = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(d, exist_ok=True)
+            cnx = sqlite3.connect(self.path, timeout=30)
+            cnx.execute("PRAGMA journal_mode=WAL")
+            cnx.execute("""
+                CREATE TABLE IF NOT EXISTS vision_cache (
+                    image_sha   TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    model       TEXT NOT NULL,
+                    value       TEXT NOT NULL,
+                    created_at  REAL NOT NULL,
+                    hits        INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (image_sha, prompt_hash, model)
+                )
+            """)
+            cnx.commit()
+            self._local.cnx = cnx
+            self._local.pid = os.getpid()
+        return cnx
+
+    def __getstate__(self):
+        # Al enviarse a otro proceso viaja solo la ruta
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    # --------------------------------------------------------
+    # Hashes
+    # --------------------------------------------------------
+    @staticmethod
+    def hash_file(path):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def hash_prompt(prompt):
+        if not isinstance(prompt, str):
+            prompt = json.dumps(prompt, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    # --------------------------------------------------------
+    # Lectura / escritura
+    # --------------------------------------------------------
+    def get(self, image_sha, prompt, model, max_age=None):
+        """
+        max_age (segundos): las entradas más antiguas cuentan como fallo
+        y se vuelven a pedir (put las reemplaza).
+        """
+        cnx = self._conn()
+        key = (image_sha, self.hash_prompt(prompt), model)
+        row = cnx.execute(
+            "SELECT value, created_at FROM vision_cache WHERE image_sha=? AND prompt_hash=? AND model=?", key
+        ).fetchone()
+        if row is not None and max_age is not None and time.time() - row[1] > max_age:
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        cnx.execute(
+            "UPDATE vision_cache SET hits = hits + 1 WHERE image_sha=? AND prompt_hash=? AND model=?", key
+        )
+        cnx.commit()
+        return json.loads(row[0])
+
+    def put(self, image_sha, prompt, model, value):
+        cnx = self._conn()
+        cnx.execute(
+            "INSERT OR REPLACE INTO vision_cache(image_sha, prompt_hash, model, value, created_at) "
+            "VALUES (?,?,?,?,?)",
+            (image_sha, self.hash_prompt(prompt), model,
+             json.dumps(value, ensure_ascii=False), time.time())
+        )
+        cnx.commit()
+
+    def get_or_call(self, image_path, prompt, model, fn, image_sha=None):
+        """
+        Devuelve la respuesta cacheada para (imagen, prompt, modelo) o llama
+        fn() y la guarda. Respuestas vacías (None / "") no se guardan, así
+        un fallo de red no queda cacheado.
+        """
+        sha = image_sha or self.hash_file(image_path)
+        value = self.get(sha, prompt, model)
+        if value is None:
+            value = fn()
+            if value not in (None, ""):
+                self.put(sha, prompt, model, value)
+        return value
+
+    # --------------------------------------------------------
+    # Estadísticas
+    # --------------------------------------------------------
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return f"caché Vision: {s['hits']} aciertos, {s['misses']} fallos ({s['hit_rate']:.0%})"
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+
+class TokenBucket:
+    """
+    Cubeta de solicitudes (requests/minuto) que se ajusta con las
+    cabeceras de rate limit del proveedor:
+
+        x-ratelimit-remaining-requests / x-ratelimit-reset-requests
+        retry-after (en respuestas 429)
+
+    acquire() espera hasta tener una ficha; pause(seg) bloquea a todos los
+    trabajadores (p. ej. tras un 429 con retry-after).
+    """
+
+    def __init__(self, rpm=300, burst=None):
+        self.rate = rpm / 60.0
+        self.capacity = float(burst or max(1, rpm // 10))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + max(0.0, seconds))
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        h = {k.lower(): v for k, v in dict(headers).items()}
+        remaining = h.get("x-ratelimit-remaining-requests")
+        reset = parse_duration(h.get("x-ratelimit-reset-requests"))
+        if remaining is not None:
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                return
+            # El proveedor sabe mejor cuántas quedan: no prometer más que eso
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset:
+                self.pause(reset)
+        retry_after = parse_duration(h.get("retry-after"))
+        if retry_after:
+            self.pause(retry_after)
+
+
+def parse_duration(value):
+    """
+    "1s", "6m0s", "250ms", "2" → segundos (float) | None.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    found = False
+    for num, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        found = True
+        total += float(num) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if found else None
+
+
+class AsyncDispatcher:
+    """
+    Despachador asíncrono de llamadas Vision/LLM.
+
+        - `concurrency` llamadas en vuelo (la función de trabajo es
+          síncrona y corre en hilos vía asyncio.to_thread)
+        - TokenBucket compartido, adaptado a las cabeceras de rate limit
+        - Backoff exponencial con jitter en errores reintentables
+        - Resultados devueltos en el orden de entrada
+        - Checkpoint JSONL: cada resultado se anexa al terminar; al
+          reanudar se omiten las claves ya resueltas (la clave debe cambiar
+          si cambia el contenido, p. ej. incluir el hash del archivo)
+        - failed: [(clave, error)] de los ítems que no se resolvieron
+
+    Para pruebas basta apuntar el cliente a un servidor local
+    (OPENAI_BASE_URL, ver stub_openai_server.py) o pasar una función de
+    trabajo falsa.
+    """
+
+    def __init__(self, fn, concurrency=4, bucket=None, retry_on=(), max_retries=5,
+                 base_delay=0.5, max_delay=30.0, checkpoint_path=None, headers_fn=None):
+        """
+        fn(payload)  -> resultado JSON-serializable
+        headers_fn() -> cabeceras de la última respuesta del hilo actual (opcional)
+        """
+        self.fn = fn
+        self.concurrency = max(1, int(concurrency))
+        self.bucket = bucket or TokenBucket()
+        self.retry_on = tuple(retry_on)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.checkpoint_path = checkpoint_path
+        self.headers_fn = headers_fn
+        self.stats = {"ok": 0, "error": 0, "retries": 0, "resumed": 0}
+        self.failed = []
+
+    # --------------------------------------------------------
+    # Checkpoint
+    # --------------------------------------------------------
+    def load_checkpoint(self):
+        done = {}
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # línea truncada por un corte
+                    if rec.get("ok"):
+                        done[rec["key"]] = rec["result"]
+        return done
+
+    def _append_checkpoint(self, fh, key, ok, result):
+        if fh is None:
+            return
+        fh.write(json.dumps({"key": key, "ok": ok, "result": result}, ensure_ascii=False) + "\n")
+        fh.flush()
+
+    # --------------------------------------------------------
+    # Ejecución
+    # --------------------------------------------------------
+    def _call(self, payload):
+        result = self.fn(payload)
+        headers = self.headers_fn() if self.headers_fn else None
+        return result, headers
+
+    def _retry_after(self, exc):
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers:
+            return parse_duration(dict(headers).get("retry-after"))
+        return None
+
+    async def _one(self, key, payload):
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                result, headers = await asyncio.to_thread(self._call, payload)
+                self.bucket.update_from_headers(headers)
+                return True, result
+            except self.retry_on as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    print(f"[ERROR] {key}: reintentos agotados ({e})")
+                    return False, str(e)
+                self.stats["retries"] += 1
+                delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+                delay *= random.uniform(0.5, 1.5)
+                retry_after = self._retry_after(e)
+                if retry_after:
+                    self.bucket.pause(retry_after)
+                    delay = max(delay, retry_after)
+                print(f"[WAIT] {key}: reintento {attempt} en {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                print(f"[ERROR] Falló {key}: {e}")
+                return False, str(e)
+
+    async def _run(self, items):
+        done = self.load_checkpoint()
+        results = [None] * len(items)
+        oks = [False] * len(items)
+        pending = []
+        for i, (key, payload) in enumerate(items):
+            if key in done:
+                results[i], oks[i] = done[key], True
+                self.stats["resumed"] += 1
+            else:
+                pending.append(i)
+
+        fh = None
+        if self.checkpoint_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+            fh = open(self.checkpoint_path, "a", encoding="utf-8")
+
+        queue = asyncio.Queue()
+        for i in pending:
+            queue.put_nowait(i)
+
+        async def worker():
+            while True:
+                try:
+                    i = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                key, payload = items[i]
+                ok, res = await self._one(key, payload)
+                results[i], oks[i] = res, ok
+                self.stats["ok" if ok else "error"] += 1
+                if not ok:
+                    self.failed.append((key, res))
+                self._append_checkpoint(fh, key, ok, res)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)) or 1)))
+        finally:
+            if fh is not None:
+                fh.close()
+
+        return list(zip(oks, results))
+
+    def run(self, items):
+        """
+        items: [(clave, payload), ...]. Devuelve [(ok, resultado), ...] en el
+        mismo orden; con error, resultado es el mensaje.
+        """
+        return asyncio.run(self._run(items))
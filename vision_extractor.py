@@ -1,9 +1,9 @@
 import os
-import base64
-import json
 import time
 
 from openai import OpenAI
+from modules.vision_image import encode_for_vision
+from modules.json_stream import parse_llm_json
 
 
 class VisionExtractor:
@@ -12,9 +12,11 @@ class VisionExtractor:
     Devuelve un diccionario estructurado con campos estandarizados.
     """
 
-    def __init__(self, model="gpt-4o-mini", retries=2):
+    def __init__(self, model="gpt-4o-mini", retries=2, cache=None):
         self.model = model
         self.retries = retries
+        # VisionCache opcional: (sha256 imagen, prompt, modelo) → respuesta cruda
+        self.cache = cache
 
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -24,11 +26,11 @@ class VisionExtractor:
 
 
     # ---------------------------------------------------------
-    # Convertir imagen a base64
+    # Convertir imagen a base64 (reducida y recodificada para
+    # lectura de texto, ver vision_image.py) → (b64, mime)
     # ---------------------------------------------------------
     def load_image_b64(self, path):
-        with open(path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        return encode_for_vision(path, task="extract")
 
 
     # ---------------------------------------------------------
@@ -62,11 +64,11 @@ Reglas:
     # ---------------------------------------------------------
     # Llamada al modelo Vision
     # ---------------------------------------------------------
-    def query_model(self, prompt, img_b64):
+    def query_model(self, prompt, img_b64, mime="image/png"):
         payload = {
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/png;base64,{img_b64}"
+                "url": f"data:{mime};base64,{img_b64}"
             }
         }
 
@@ -89,16 +91,10 @@ Reglas:
 
 
     # ---------------------------------------------------------
-    # Limpiar/eliminar texto fuera del JSON
+    # Limpiar/eliminar texto fuera del JSON (y reparar si viene dañado)
     # ---------------------------------------------------------
     def clean_json(self, raw):
-        try:
-            start = raw.index("{")
-            end = raw.rindex("}") + 1
-            raw = raw[start:end]
-            return json.loads(raw)
-        except:
-            return {}
+        return parse_llm_json(raw, {})
 
 
     # ---------------------------------------------------------
@@ -118,14 +114,20 @@ Reglas:
     # Método principal: analiza una celda (un recorte)
     # ---------------------------------------------------------
     def analyze(self, image_path):
-        img_b64 = self.load_image_b64(image_path)
+        img_b64, mime = self.load_image_b64(image_path)
         prompt = self.build_prompt()
+        sha = self.cache.hash_file(image_path) if self.cache is not None else None
 
         for attempt in range(self.retries + 1):
             try:
-                raw = self.query_model(prompt, img_b64)
+                cached = self.cache.get(sha, prompt, self.model) if self.cache is not None else None
+                raw = cached if cached is not None else self.query_model(prompt, img_b64, mime)
                 data = self.clean_json(raw)
 
+                # Solo se cachea una respuesta que se pudo interpretar
+                if cached is None and data and self.cache is not None:
+                    self.cache.put(sha, prompt, self.model, raw)
+
                 # Normalizar precio
                 if "precio" in data:
                     data["precio"] = self.normalize_price(data.get("precio"))
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # sin Pillow se envía el archivo tal cual
+    Image = None
+
+
+PROFILE_VERSION = "1"
+
+# Perfiles por tarea. La API reduce del lado del servidor:
+#   detail="low"  → 512 px
+#   detail="high" → cabe en 2048 px y el lado corto queda en <= 768 px
+# Subir más resolución que eso solo cuesta ancho de banda y latencia.
+PROFILES = {
+    # Clasificación / descarte (maestra, basura, categoría)
+    "classify": {"max_side": 512, "short_side": None, "quality": 80, "detail": "low"},
+    # Identificación de producto (nombre SEO, ficha 360)
+    "identify": {"max_side": 2048, "short_side": 768, "quality": 85, "detail": "high"},
+    # Lectura de texto (códigos, precios, tablas): más calidad JPEG y, si
+    # pesa menos (line art, tablas), PNG sin pérdida
+    "extract": {"max_side": 2048, "short_side": 768, "quality": 92, "detail": "high",
+                "try_png": True},
+}
+
+FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+PAYLOAD_DIR = os.getenv(
+    "VISION_PAYLOAD_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "vision_payloads"),
+)
+
+_MEMO = OrderedDict()
+_MEMO_SIZE = 256
+_lock = threading.Lock()
+_warned = False
+
+
+# ------------------------------------------------------------
+# Reducción + recodificación
+# ------------------------------------------------------------
+def _target_size(w, h, profile):
+    scale = min(1.0, profile["max_side"] / float(max(w, h)))
+    if profile["short_side"]:
+        scale = min(scale, profile["short_side"] / float(min(w, h)))
+    return max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+
+
+def _reencode(data, profile, fmt):
+    """
+    Decodifica, corrige orientación EXIF, aplana transparencia sobre
+    blanco, reduce y recodifica. Los metadatos (EXIF, ICC, texto PNG)
+    no se copian a la salida.
+    """
+    img = Image.open(io.BytesIO(data))
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        bg = Image.new("RGB", img.size, (255, 255, 255))
+        bg.paste(img, mask=img.split()[-1])
+        img = bg
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    size = _target_size(img.width, img.height, profile)
+    if size != img.size:
+        img = img.resize(size, Image.LANCZOS)
+
+    out = io.BytesIO()
+    pil_fmt = FORMATS[fmt][0]
+    if pil_fmt == "JPEG":
+        img.save(out, pil_fmt, quality=profile["quality"], optimize=True, progressive=True)
+    else:
+        img.save(out, pil_fmt, quality=profile["quality"], method=4)
+    best = out.getvalue()
+
+    if profile.get("try_png"):
+        png = io.BytesIO()
+        img.save(png, "PNG", optimize=True)
+        if png.tell() < len(best):
+            best = png.getvalue()
+    return best
+
+
+def _sniff_mime(data):
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:3] == b"GIF":
+        return "image/gif"
+    return "image/jpeg"
+
+
+# ------------------------------------------------------------
+# API
+# ------------------------------------------------------------
+def prepare_image(path, task="extract", fmt="jpeg"):
+    """
+    Prepara una imagen para subirla a un modelo Vision según la tarea.
+
+    Devuelve {"b64", "mime", "detail", "bytes", "original_bytes"}.
+
+    El payload codificado se cachea en memoria (por ruta + mtime) y en
+    disco (VISION_PAYLOAD_DIR, por sha256 del archivo + tarea + formato),
+    así la misma imagen no se vuelve a decodificar entre corridas ni
+    entre scripts.
+    """
+    global _warned
+    profile = PROFILES[task]
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_mtime, st.st_size, task, fmt)
+    with _lock:
+        hit = _MEMO.get(memo_key)
+        if hit is not None:
+            _MEMO.move_to_end(memo_key)
+            return hit
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    payload = None
+    if Image is not None:
+        digest = hashlib.sha256(data).hexdigest()
+        disk = os.path.join(PAYLOAD_DIR, f"{digest}_{task}_{fmt}_v{PROFILE_VERSION}.bin")
+        if os.path.exists(disk):
+            with open(disk, "rb") as f:
+                payload = f.read()
+        else:
+            try:
+                payload = _reencode(data, profile, fmt)
+                w, h = Image.open(io.BytesIO(data)).size
+                if _target_size(w, h, profile) == (w, h) and len(payload) >= len(data):
+                    # El original ya cabía en el perfil y pesa menos
+                    payload = data
+                os.makedirs(PAYLOAD_DIR, exist_ok=True)
+                tmp = f"{disk}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, disk)
+            except Exception as e:
+                print(f"[WARN] No se pudo recodificar {os.path.basename(path)}: {e}")
+                payload = None
+    elif not _warned:
+        print("[WARN] Pillow no disponible: las imágenes se envían sin reducir")
+        _warned = True
+
+    if payload is None:
+        payload = data
+
+    result = {
+        "b64": base64.b64encode(payload).decode("utf-8"),
+        "mime": _sniff_mime(payload),
+        "detail": profile["detail"],
+        "bytes": len(payload),
+        "original_bytes": len(data),
+    }
+    with _lock:
+        _MEMO[memo_key] = result
+        if len(_MEMO) > _MEMO_SIZE:
+            _MEMO.popitem(last=False)
+    return result
+
+
+def encode_for_vision(path, task="extract", fmt="jpeg"):
+    """
+    Atajo: (b64, mime) listos para un data URL.
+    """
+    img = prepare_image(path, task, fmt)
+    return img["b64"], img["mime"]
+
+
+def image_content(path, task="extract", fmt="jpeg"):
+    """
+    Bloque {"type": "image_url", ...} de chat.completions con el detail
+    del perfil de la tarea.
+    """
+    img = prepare_image(path, task, fmt)
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:{img['mime']};base64,{img['b64']}",
+            "detail": img["detail"],
+        },
+    }